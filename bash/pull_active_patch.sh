@@ -21,7 +21,8 @@ cd "$PATCH_DIR" || exit 3
 echo "--- clearing changes"
 git restore .
 echo "Pulling latest changes for $PATCH_NAME..."
-git pull --recurse-submodules
+# fetch through the LAN patch cache if patches/patch_cache.txt names one, else from GitHub
+python3 "$PATCHES_DIR/../python/patchcache.py" pull "$PATCH_DIR"
 if [ $? -eq 0 ]; then
   echo "Successfully updated $PATCH_NAME."
   echo "--- setting permissions to allow PD write access"
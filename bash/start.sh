@@ -8,12 +8,8 @@
 # SOUNDCARD="IQaudIODAC"
 SOUNDCARD="DigiAMP"
 
-RND=$RANDOM
 MACADDRESS=$(cat /sys/class/net/wlan0/address)
 # MACADDRESS=$(cat /sys/class/net/eth0/address) # for wired connection, use eth0 instead of wlan0
-now=$(date --iso-8601=seconds)
-STARTDATE=$(date -d "$now" +%Y%m%d)
-STARTTIME=$(date -d "$now" +%H%M%S)
 
 
 # sleep 15
@@ -40,23 +36,6 @@ fi
 echo "------------------- Starting bopOS..."
 echo "SOUNDCARD: $SOUNDCARD"
 echo "MAC ADDRESS: $MACADDRESS"
-echo "RANDOM: $RND"
-echo "STARTDATE: $STARTDATE"
-echo "STARTTIME: $STARTTIME"
-
-# Determine active patch
-ACTIVE_PATCH=$(cat /home/pi/plantsOS/patches/active_patch.txt)
-PATCH_PATH="/home/pi/plantsOS/patches/$ACTIVE_PATCH"
-PATCH_ENTRYPOINT="$PATCH_PATH/main.pd" 
-
-# Print the current active patch clearly
-echo "====================="
-echo "ACTIVE PATCH: $ACTIVE_PATCH"
-echo "PATCH PATH: $PATCH_PATH"
-echo "PATCH ENTRYPOINT: $PATCH_ENTRYPOINT"
-echo "====================="
-
-
 
 # Start helper.py to manage system functions
 echo "------------------- Starting helper.py..."
@@ -96,17 +75,7 @@ else
 fi
 
 
-echo "------------------- Starting Pure Data..."
-# PUREDATA
-pd -nogui -jack -open "$PATCH_ENTRYPOINT" -send "; RANDOM $RND; STARTTIME $STARTTIME; STARTDATE $STARTDATE; ACTIVEPATCH $ACTIVE_PATCH" &
-
-
-# run active patch start script if it exists
-if [ -f "$PATCH_PATH/start.sh" ]; then
-    echo "------------------- Running patch start script..."
-    bash "$PATCH_PATH/start.sh"
-else
-    echo "------------------- No patch start script found, skipping..."
-fi  
+# Pure Data and the patch's start.sh (helper.py reruns this to switch patches)
+bash /home/pi/plantsOS/bash/start_pd.sh
 
 exit
\ No newline at end of file
@@ -0,0 +1,39 @@
+#!/bin/bash
+# Start Pure Data with the active patch, then the patch's own start.sh.
+# Used by start.sh at boot and by helper.py to switch patches without a reboot
+# (jackd and io/main.py keep running).
+
+PATCHES_DIR="$(dirname "$(dirname "$(realpath "$0")")")/patches"
+
+RND=$RANDOM
+now=$(date --iso-8601=seconds)
+STARTDATE=$(date -d "$now" +%Y%m%d)
+STARTTIME=$(date -d "$now" +%H%M%S)
+
+# Determine active patch
+ACTIVE_PATCH=$(cat "$PATCHES_DIR/active_patch.txt" | tr -d '\n')
+PATCH_PATH="$PATCHES_DIR/$ACTIVE_PATCH"
+PATCH_ENTRYPOINT="$PATCH_PATH/main.pd"
+
+# Print the current active patch clearly
+echo "====================="
+echo "ACTIVE PATCH: $ACTIVE_PATCH"
+echo "PATCH PATH: $PATCH_PATH"
+echo "PATCH ENTRYPOINT: $PATCH_ENTRYPOINT"
+echo "RANDOM: $RND"
+echo "STARTDATE: $STARTDATE"
+echo "STARTTIME: $STARTTIME"
+echo "====================="
+
+echo "------------------- Starting Pure Data..."
+# PUREDATA
+pd -nogui -jack -open "$PATCH_ENTRYPOINT" -send "; RANDOM $RND; STARTTIME $STARTTIME; STARTDATE $STARTDATE; ACTIVEPATCH $ACTIVE_PATCH" &
+
+
+# run active patch start script if it exists
+if [ -f "$PATCH_PATH/start.sh" ]; then
+    echo "------------------- Running patch start script..."
+    bash "$PATCH_PATH/start.sh"
+else
+    echo "------------------- No patch start script found, skipping..."
+fi
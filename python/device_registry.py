@@ -0,0 +1,237 @@
+# device_registry.py
+"""
+Fleet device registry (bopos.devices)
+Parses and validates bopos.devices once and indexes it by MAC, hostname and
+ID, re-reading the file only when its mtime or size changes. Used by helper.py
+and usable from any dashboard tooling:
+
+    registry = DeviceRegistry()
+    device = registry.by_mac("b8:27:eb:2c:73:80")   # Device or None
+    device.hostname, device.id, device.posl, device.posr
+    registry.by_hostname("spool1")
+    registry.by_id(1)                                # list: IDs may repeat across patches
+
+File format (CSV, spaces after commas are ignored):
+    # version 3                          optional, see snapshots below
+    MAC, hostname, ID,  POSL, POSR
+    b8:27:eb:2c:73:80, spool1, 1, 0 0, 0 100
+POSL/POSR are "x y" pairs and may be left out (0 0). Hostnames must be valid
+RFC 1123 labels (letters, digits and '-', up to 63). Bad rows are printed and
+skipped; a repeated MAC keeps the first row.
+
+Snapshots: registry.snapshot() is a flat OSC argument list
+    version digest count  mac hostname id lx ly rx ry  ...
+and registry.adopt(values) stores a received snapshot in bopos.devices.adopted
+if its version is higher, so one edited file can be spread over the network
+instead of pulling and rebooting every unit. Bump the version line when
+editing; digest is a short hash of the rows, for telling copies apart.
+bopos.devices.adopted is not tracked by git, so an update (git restore) keeps
+it; whichever of the two files has the higher version is used.
+A snapshot with any bad row is rejected as a whole: hostnames from it end up
+in root commands (hostnamectl), so nothing from the network is half-trusted.
+"""
+
+import hashlib
+import os
+import re
+from collections import namedtuple
+from csv import reader
+
+DEVICES_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../bopos.devices')
+ADOPTED_SUFFIX = '.adopted'  # snapshots received from other units, next to the tracked file
+HEADER = "MAC, hostname, ID,  POSL, POSR"
+
+_MAC = re.compile(r'^[0-9a-f]{2}(:[0-9a-f]{2}){5}$')
+_HOSTNAME = re.compile(r'[A-Za-z0-9-]{1,63}')  # RFC 1123 label, matched with fullmatch
+_VERSION = re.compile(r'^#\s*version\s+(\d+)', re.IGNORECASE)
+
+Device = namedtuple('Device', 'mac hostname id posl posr')
+
+
+def normalise_mac(mac):
+    return str(mac).strip().lower().replace('-', ':')
+
+
+def _position(text):
+    if not text or not text.strip():
+        return (0.0, 0.0)
+    x, y = (float(v) for v in text.split())
+    return (x, y)
+
+
+def _number(text):
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def parse(lines, source='bopos.devices'):
+    """Parse file lines. Returns (version, [Device, ...])."""
+    version = 0
+    devices = []
+    seen = set()
+    for line_number, row in enumerate(reader(lines, skipinitialspace=True), 1):
+        if not row or not ''.join(row).strip():
+            continue
+        match = _VERSION.match(row[0])
+        if match:
+            version = int(match.group(1))
+            continue
+        if row[0].startswith('#') or row[0].strip().upper() == 'MAC':
+            continue
+        try:
+            mac = normalise_mac(row[0])
+            if not _MAC.fullmatch(mac):
+                raise ValueError(f"bad MAC '{row[0]}'")
+            if mac in seen:
+                raise ValueError(f"{mac} listed twice")
+            hostname = row[1].strip()
+            if not _HOSTNAME.fullmatch(hostname):
+                raise ValueError(f"bad hostname '{hostname}'")
+            device = Device(mac, hostname, _number(row[2]),
+                            _position(row[3] if len(row) > 3 else ''),
+                            _position(row[4] if len(row) > 4 else ''))
+        except (IndexError, ValueError) as e:
+            print(f"{source} line {line_number}: skipping {row}: {e}")
+            continue
+        seen.add(mac)
+        devices.append(device)
+    return version, devices
+
+
+def digest(devices):
+    """Short hash of the rows, the same on every machine with the same content."""
+    text = '\n'.join(format_row(device) for device in devices)
+    return hashlib.sha1(text.encode()).hexdigest()[:8]
+
+
+def _format_number(value):
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def format_row(device):
+    posl = ' '.join(_format_number(v) for v in device.posl)
+    posr = ' '.join(_format_number(v) for v in device.posr)
+    return f"{device.mac}, {device.hostname}, {_format_number(device.id)}, {posl}, {posr}"
+
+
+def _stamp(path):
+    """(mtime_ns, size) of a file, or None if it cannot be read."""
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    return (info.st_mtime_ns, info.st_size)
+
+
+class DeviceRegistry:
+    """bopos.devices indexed by MAC, hostname and ID."""
+
+    def __init__(self, path=DEVICES_FILE):
+        self.path = path
+        self.adopted_path = path + ADOPTED_SUFFIX
+        self.source = None    # the file the devices were loaded from
+        self.stamp = None     # (mtime_ns, size) or None for both files, as loaded
+        self.version = 0
+        self.digest = digest([])
+        self.devices = []
+        self.macs = {}        # mac -> Device
+        self.hostnames = {}   # hostname -> Device
+        self.ids = {}         # id -> [Device, ...]
+        self.refresh()
+
+    def refresh(self):
+        """
+        Re-read the files if either changed since the last load, keeping the one
+        with the higher version (bopos.devices on a tie). Returns True if reloaded.
+        """
+        stamp = (_stamp(self.path), _stamp(self.adopted_path))
+        if stamp == self.stamp:
+            return False
+        if stamp == (None, None):
+            if self.stamp is not None:
+                print(f"Cannot read {self.path}")
+                self.stamp = None
+            return False
+        loaded = []
+        for path, file_stamp in zip((self.path, self.adopted_path), stamp):
+            if file_stamp is not None:
+                with open(path) as f:
+                    loaded.append(parse(f, os.path.basename(path)) + (path,))
+        version, devices, self.source = max(loaded, key=lambda entry: entry[0])
+        self.stamp = stamp
+        self._index(version, devices)
+        return True
+
+    def _index(self, version, devices):
+        self.version = version
+        self.devices = devices
+        self.digest = digest(devices)
+        self.macs = {device.mac: device for device in devices}
+        self.hostnames = {}
+        self.ids = {}
+        for device in devices:
+            self.hostnames.setdefault(device.hostname, device)
+            self.ids.setdefault(device.id, []).append(device)
+
+    # --- Lookups (each picks up edits to the file first) ---
+    def by_mac(self, mac):
+        self.refresh()
+        return self.macs.get(normalise_mac(mac))
+
+    def by_hostname(self, hostname):
+        self.refresh()
+        return self.hostnames.get(hostname)
+
+    def by_id(self, device_id):
+        self.refresh()
+        return list(self.ids.get(_number(device_id), []))
+
+    # --- Snapshots ---
+    def snapshot(self):
+        """Flat OSC argument list: version digest count, then mac hostname id lx ly rx ry per device."""
+        self.refresh()
+        values = [self.version, self.digest, len(self.devices)]
+        for device in self.devices:
+            values += [device.mac, device.hostname, float(device.id),
+                       float(device.posl[0]), float(device.posl[1]),
+                       float(device.posr[0]), float(device.posr[1])]
+        return values
+
+    def adopt(self, values):
+        """
+        Store a received snapshot in the adopted file if its version is newer.
+        Returns True if it was adopted. Raises ValueError on a malformed snapshot.
+        """
+        self.refresh()
+        try:
+            version, count = int(values[0]), int(values[2])
+            fields = values[3:]
+            if len(fields) != 7 * count:
+                raise ValueError(f"expected {count} devices, got {len(fields) / 7:g}")
+            lines = [f"# version {version}", HEADER]
+            for value in fields:
+                if isinstance(value, str) and (',' in value or '\n' in value or '\r' in value):
+                    raise ValueError(f"bad field {value!r}")
+            for i in range(0, len(fields), 7):
+                mac, hostname, device_id, lx, ly, rx, ry = fields[i:i + 7]
+                lines.append(format_row(Device(normalise_mac(mac), str(hostname), _number(device_id),
+                                               (float(lx), float(ly)), (float(rx), float(ry)))))
+        except (IndexError, TypeError) as e:
+            raise ValueError(f"malformed snapshot: {e}")
+        # every row must survive parse(), which checks MACs and hostnames
+        _, devices = parse(lines, 'snapshot')
+        if len(devices) != count:
+            raise ValueError(f"rejected snapshot: {count - len(devices)} bad rows")
+        if version <= self.version:
+            if version == self.version and str(values[1]) != self.digest:
+                print(f"Registry version {version} differs from ours ({values[1]} vs {self.digest}), keeping ours")
+            return False
+
+        temporary = self.adopted_path + '.tmp'
+        with open(temporary, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temporary, self.adopted_path)
+        self.stamp = None
+        self.refresh()
+        print(f"Registry updated to version {self.version} ({len(self.devices)} devices)")
+        return True
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# dispatch.py
+"""
+Reliable fleet commands
+Sends a helper.py command to every unit directly (UDP unicast to 7770)
+instead of one broadcast on 6660, and keeps at it until each unit has
+answered, so a Pi that missed the message over venue WiFi gets it again
+instead of being found by walking the room.
+
+Each unit gets
+    /cmd <id> <token> <command> [args...]
+and helper.py answers
+    /ack <id> <token> <hostname>                   straight away
+    /done <id> <token> <state> <seconds> [error]   when the command has finished
+Units that have not acked within ACK_TIMEOUT are sent the same /cmd again,
+with the wait doubling each time (plus jitter), up to --retries times. The id
+stays the same, so a unit whose ack was lost answers again without running
+the command twice. Acked units are sent it every POLL_INTERVAL until their
+/done arrives, which the unit repeats if it has finished.
+
+At most --parallel units are being worked on at once (sent but not finished),
+so 50 Pis never all fetch updates or samples together and replies never
+arrive as one burst. Commands that end in a reboot (update, checkout,
+shutdown, reboot) only wait for the ack by default.
+
+Usage:
+    python dispatch.py getsamples --devices                 # every unit in bopos.devices (<hostname>.local)
+    python dispatch.py patch voices2 --target 10.0.0.11 --target voice3.local
+    python dispatch.py update --devices --parallel 5
+    python dispatch.py jobs --target 127.0.0.1:7771 --target 127.0.0.1:7772   # helpers run with --port
+
+Exit status is 0 only if every unit finished (or acked, with --wait ack).
+"""
+
+import argparse
+import json
+import random
+import select
+import socket
+import sys
+import time
+import uuid
+
+from pyOSC3 import OSCMessage, decodeOSC
+
+HELPER_PORT = 7770
+ACK_TIMEOUT = 1.0      # seconds before the first resend
+MAX_ACK_TIMEOUT = 8.0  # longest wait between resends
+RETRIES = 6            # resends per unit before giving up
+PARALLEL = 10          # units worked on at once
+DONE_TIMEOUT = 600.0   # seconds to wait for /done after the ack
+POLL_INTERVAL = 5.0    # seconds between repeats of an acked /cmd, in case its /done was lost
+REBOOTING_COMMANDS = {'update', 'checkout', 'shutdown', 'reboot'}
+
+
+class Target:
+    """One unit and where its command has got to."""
+
+    def __init__(self, token, label, address):
+        self.token = token
+        self.label = label        # as given: host, host:port or hostname from bopos.devices
+        self.address = address    # (ip, port), or None if it did not resolve
+        self.hostname = ''
+        self.state = 'waiting'    # waiting, sent, acked, then done/failed/refused/unknown/timeout/unreachable
+        self.attempts = 0
+        self.sent_at = 0.0        # first send
+        self.next_send = 0.0      # when to resend if still not acked
+        self.acked_at = None
+        self.finished_at = None
+        self.seconds = None       # time the unit reported the command took
+        self.detail = ''
+
+    def result(self):
+        return {"target": self.label, "hostname": self.hostname, "state": self.state,
+                "attempts": self.attempts,
+                "ack_ms": round((self.acked_at - self.sent_at) * 1000, 1) if self.acked_at else None,
+                "seconds": self.seconds,
+                "total": round(self.finished_at - self.sent_at, 2) if self.finished_at and self.sent_at else None,
+                "detail": self.detail}
+
+
+def parse_target(text, port=HELPER_PORT):
+    """'voice3.local', '10.0.0.11' or '127.0.0.1:7771' -> (host, port)."""
+    host, _, port_text = text.rpartition(':') if text.count(':') == 1 else (text, '', '')
+    return (host or text), int(port_text) if port_text else port
+
+
+def device_targets(path=None):
+    """<hostname>.local for every unit in bopos.devices."""
+    from device_registry import DeviceRegistry
+    registry = DeviceRegistry(path) if path else DeviceRegistry()
+    return [f"{device.hostname}.local" for device in registry.devices]
+
+
+def _message(address, values):
+    msg = OSCMessage(address)
+    for value in values:
+        msg.append(value)
+    return msg.getBinary()
+
+
+def dispatch(targets, command, args=(), parallel=PARALLEL, retries=RETRIES, wait='done',
+             ack_timeout=ACK_TIMEOUT, done_timeout=DONE_TIMEOUT, progress=print):
+    """
+    Send command to every target ('host' or 'host:port') until each has answered.
+    wait is 'done' (wait for /done) or 'ack'. Returns a list of result dicts,
+    one per target, in the order given.
+    """
+    command_id = uuid.uuid4().hex[:12]
+    units = []
+    for token, label in enumerate(targets):
+        host, port = parse_target(label)
+        try:
+            address = (socket.gethostbyname(host), port)
+        except OSError:
+            address = None
+        unit = Target(token, label, address)
+        if address is None:
+            unit.state, unit.detail = 'unreachable', f"cannot resolve {host}"
+        units.append(unit)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('', 0))
+    waiting = [u for u in units if u.state == 'waiting']
+    active = {}  # token -> Target being worked on
+
+    def finish(unit, state, detail=''):
+        unit.state, unit.detail = state, detail or unit.detail
+        unit.finished_at = time.monotonic()
+        active.pop(unit.token, None)
+        progress(f"{unit.label:24} {state:8} {unit.hostname} {unit.detail}".rstrip())
+
+    def send(unit, now):
+        unit.attempts += 1
+        if unit.attempts == 1:
+            unit.sent_at = now
+        backoff = min(MAX_ACK_TIMEOUT, ack_timeout * 2 ** (unit.attempts - 1))
+        unit.next_send = now + backoff * random.uniform(1.0, 1.25)
+        try:
+            sock.sendto(_message("/cmd", [command_id, unit.token, command] + list(args)), unit.address)
+        except OSError as e:
+            unit.detail = str(e)
+
+    def poll(unit):
+        try:
+            sock.sendto(_message("/cmd", [command_id, unit.token, command] + list(args)), unit.address)
+        except OSError:
+            pass
+
+    try:
+        while waiting or active:
+            now = time.monotonic()
+            # start more units, up to the parallel limit
+            while waiting and len(active) < parallel:
+                unit = waiting.pop(0)
+                unit.state = 'sent'
+                active[unit.token] = unit
+                send(unit, now)
+            # resend to units that have not acked; give up on the ones that never answer
+            for unit in list(active.values()):
+                if unit.state == 'sent' and now >= unit.next_send:
+                    if unit.attempts > retries:
+                        finish(unit, 'unreachable', f"no ack after {unit.attempts} tries")
+                    else:
+                        send(unit, now)
+                elif unit.state == 'acked' and now - unit.acked_at > done_timeout:
+                    finish(unit, 'timeout', f"no result after {done_timeout:g} s")
+                elif unit.state == 'acked' and now >= unit.next_send:
+                    unit.next_send = now + POLL_INTERVAL
+                    poll(unit)
+            if not active and not waiting:
+                break
+            deadline = min([u.next_send for u in active.values()] + [now + 1.0])
+            ready, _, _ = select.select([sock], [], [], max(0.0, deadline - time.monotonic()))
+            if not ready:
+                continue
+            data, _ = sock.recvfrom(65536)
+            try:
+                message = decodeOSC(data)
+                address, values = message[0], message[2:]
+                if str(values[0]) != command_id:
+                    continue  # left over from an earlier dispatch
+                unit = active.get(int(values[1]))
+            except (IndexError, TypeError, ValueError):
+                continue
+            if unit is None:
+                continue
+            if address == '/ack' and unit.state == 'sent':
+                unit.state, unit.acked_at, unit.hostname = 'acked', time.monotonic(), str(values[2])
+                unit.next_send = unit.acked_at + POLL_INTERVAL
+                if wait == 'ack':
+                    unit.state = 'acked'
+                    unit.finished_at = unit.acked_at
+                    active.pop(unit.token, None)
+                    progress(f"{unit.label:24} acked    {unit.hostname}")
+            elif address == '/done':
+                if unit.acked_at is None:  # the ack was lost but the result arrived
+                    unit.acked_at = time.monotonic()
+                unit.seconds = round(float(values[3]), 2)
+                finish(unit, str(values[2]), str(values[4]) if len(values) > 4 else '')
+    finally:
+        sock.close()
+    return [unit.result() for unit in units]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send a helper.py command to every unit, with acks and retries")
+    parser.add_argument('command', help="helper command, e.g. update, getsamples, patch, pullpatch, config")
+    parser.add_argument('args', nargs='*', help="command arguments")
+    parser.add_argument('--target', action='append', default=[], help="host[:port] of a unit (repeatable)")
+    parser.add_argument('--devices', nargs='?', const='', metavar='FILE',
+                        help="every unit in bopos.devices (or FILE), as <hostname>.local")
+    parser.add_argument('--parallel', type=int, default=PARALLEL, help="units worked on at once")
+    parser.add_argument('--retries', type=int, default=RETRIES, help="resends per unit")
+    parser.add_argument('--wait', choices=('ack', 'done'), help="wait for the ack only, or for the result "
+                        "(default: done, ack for commands that reboot)")
+    parser.add_argument('--timeout', type=float, default=DONE_TIMEOUT, help="seconds to wait for a result")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    options = parser.parse_args()
+
+    targets = list(options.target)
+    if options.devices is not None:
+        targets += device_targets(options.devices or None)
+    if not targets:
+        parser.error("no units: give --target host[:port] or --devices")
+    wait = options.wait or ('ack' if options.command in REBOOTING_COMMANDS else 'done')
+
+    started = time.monotonic()
+    results = dispatch(targets, options.command, options.args, options.parallel, options.retries,
+                       wait, done_timeout=options.timeout,
+                       progress=(lambda text: None) if options.json else print)
+    ok = [r for r in results if r["state"] in (('done', 'acked') if wait == 'ack' else ('done',))]
+
+    if options.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"\n{'target':24} {'hostname':16} {'state':11} {'tries':>5} {'ack ms':>8} {'took s':>8}")
+        for r in results:
+            print(f"{r['target']:24} {r['hostname']:16} {r['state']:11} {r['attempts']:5} "
+                  f"{r['ack_ms'] if r['ack_ms'] is not None else '-':>8} "
+                  f"{r['seconds'] if r['seconds'] is not None else '-':>8}  {r['detail']}")
+        print(f"\n{len(ok)}/{len(results)} units {'acked' if wait == 'ack' else 'done'} "
+              f"in {time.monotonic() - started:.1f} s")
+    sys.exit(0 if len(ok) == len(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
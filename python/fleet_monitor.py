@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# fleet_monitor.py
+"""
+Fleet monitor
+Runs on the laptop next to DASHBOARD.pd. Listens for the units' broadcasts on
+5550 and keeps a time series per unit and metric, so you can ask what a unit
+did over the last ten minutes, or which units fell below their sensor rate,
+instead of only seeing the latest value.
+
+Metrics come from
+    /telemetry <hostname> <metric> <value> ...   helper.py: cpu temp mem pd jack
+                                                 io/main.py: io_rate io_target io_jitter_p99 ...
+    /<name> <number>                             any other one-number message (/id, /version, ...)
+Anything else only marks the unit as seen. Units are named by hostname once a
+/telemetry has arrived from their address, by IP until then.
+
+Memory is fixed: each series is two array('d') rings, RAW_SAMPLES raw points
+and COARSE_SAMPLES min/mean/max rows of COARSE_STEP seconds, and there are at
+most MAX_DEVICES units (the longest silent one makes room) with MAX_METRICS
+metrics each. At the default 10 s telemetry interval that is 1 h raw and
+3 days coarse in about 36 kB per series - 20 MB for 50 units sending the 11
+standard metrics, however long the show runs.
+
+Queries (HTTP, JSON) on --http-port:
+    /devices                                    every unit: address, age (s), latest value of each metric
+    /device?name=voice3&minutes=10              every metric of one unit
+    /series?name=voice3&metric=temp&minutes=10  one metric
+    /below?metric=io_rate&value=45&minutes=1    units whose mean over the window is below value
+    /below?metric=io_rate&of=io_target&fraction=0.9
+                                                ...below 90% of their own io_target
+    /silent?seconds=30                          units not heard from for 30 s
+Points are [time, value] inside the raw history and [time, min, mean, max]
+beyond it. Times are Unix seconds.
+
+Usage:
+    python fleet_monitor.py [--port 5550] [--http-port 8767]
+    python fleet_sim.py --devices 50               # simulated fleet to try it on
+    curl 'localhost:8767/below?metric=io_rate&of=io_target&fraction=0.9'
+"""
+
+import argparse
+import json
+import socket
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from pyOSC3 import decodeOSC
+
+LISTEN_PORT = 5550
+HTTP_PORT = 8767
+RAW_SAMPLES = 360       # raw points per series (1 h at 10 s)
+COARSE_STEP = 300       # seconds per coarse row
+COARSE_SAMPLES = 864    # coarse rows per series (3 days)
+MAX_DEVICES = 128
+MAX_METRICS = 32        # per device
+
+
+class Ring:
+    """Fixed number of (time, value...) rows in one preallocated array('d')."""
+
+    def __init__(self, capacity, width=1):
+        self.capacity = capacity
+        self.stride = width + 1
+        self.data = array('d', bytes(8 * capacity * self.stride))
+        self.start = 0  # row index of the oldest row
+        self.count = 0
+
+    def append(self, t, *values):
+        if self.count == self.capacity:
+            row = self.start
+            self.start = (self.start + 1) % self.capacity
+        else:
+            row = (self.start + self.count) % self.capacity
+            self.count += 1
+        base = row * self.stride
+        self.data[base] = t
+        for i, value in enumerate(values, 1):
+            self.data[base + i] = value
+
+    def full(self):
+        return self.count == self.capacity
+
+    def _time(self, k):
+        return self.data[((self.start + k) % self.capacity) * self.stride]
+
+    def oldest(self):
+        return self._time(0) if self.count else None
+
+    def rows(self, since=None):
+        """Rows with time >= since, oldest first, as lists."""
+        lo, hi = 0, self.count
+        if since is not None:
+            while lo < hi:  # first row at or after since (rows are in time order)
+                mid = (lo + hi) // 2
+                if self._time(mid) < since:
+                    lo = mid + 1
+                else:
+                    hi = mid
+        rows = []
+        for k in range(lo, self.count):
+            base = ((self.start + k) % self.capacity) * self.stride
+            rows.append([round(v, 3) for v in self.data[base:base + self.stride]])
+        return rows
+
+
+class Series:
+    """One metric of one unit: raw ring plus min/mean/max rows per COARSE_STEP."""
+
+    def __init__(self, raw=RAW_SAMPLES, coarse=COARSE_SAMPLES, step=COARSE_STEP):
+        self.raw = Ring(raw)
+        self.coarse = Ring(coarse, 3)
+        self.step = step
+        self.bucket = None  # start of the coarse row being filled
+        self.low = self.high = self.total = 0.0
+        self.n = 0
+        self.last = None    # (time, value)
+
+    def add(self, t, value):
+        self.raw.append(t, value)
+        self.last = (t, value)
+        bucket = t - t % self.step
+        if self.n and bucket != self.bucket:
+            self.coarse.append(self.bucket, self.low, self.total / self.n, self.high)
+            self.n = 0
+        if not self.n:
+            self.bucket, self.low, self.high, self.total = bucket, value, value, 0.0
+        self.low = min(self.low, value)
+        self.high = max(self.high, value)
+        self.total += value
+        self.n += 1
+
+    def covered_raw(self, since):
+        """True if the raw ring reaches back to since."""
+        return not self.raw.full() or since >= self.raw.oldest()
+
+    def points(self, since):
+        if self.covered_raw(since):
+            return self.raw.rows(since)
+        rows = self.coarse.rows(since)
+        if self.n:
+            rows.append([round(v, 3) for v in (self.bucket, self.low, self.total / self.n, self.high)])
+        return rows
+
+    def mean(self, since):
+        """Mean since the given time, or None without data in the window."""
+        if self.covered_raw(since):
+            values = [row[1] for row in self.raw.rows(since)]
+        else:
+            values = [row[2] for row in self.coarse.rows(since)]
+        return sum(values) / len(values) if values else None
+
+
+class Device:
+    def __init__(self, name, address):
+        self.name = name
+        self.address = address
+        self.last_seen = 0.0
+        self.series = {}  # metric -> Series
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+class Fleet:
+    """Per-unit series, fed by received OSC messages. Safe to query from other threads."""
+
+    def __init__(self, max_devices=MAX_DEVICES, max_metrics=MAX_METRICS):
+        self.max_devices = max_devices
+        self.max_metrics = max_metrics
+        self.devices = {}    # name -> Device
+        self.addresses = {}  # ip -> name
+        self.lock = threading.Lock()
+
+    # --- Recording ---
+    def receive(self, message, ip, t=None):
+        """Record one decoded OSC message (or bundle) sent from ip."""
+        if t is None:
+            t = time.time()
+        if not message:
+            return
+        if message[0] == '#bundle':
+            for element in message[2:]:
+                self.receive(element, ip, t)
+            return
+        address, args = message[0], message[2:]
+        with self.lock:
+            if address == '/telemetry' and args:
+                device = self._device(ip, str(args[0]), t)
+                for metric, value in zip(args[1::2], args[2::2]):
+                    self._record(device, str(metric), _number(value), t)
+            else:
+                device = self._device(ip, None, t)
+                if len(args) == 1:
+                    self._record(device, address.strip('/').replace('/', '_'), _number(args[0]), t)
+
+    def _device(self, ip, hostname, t):
+        name = self.addresses.get(ip)
+        if hostname and name != hostname:
+            if name == ip and ip in self.devices:  # known by IP until now: keep its history
+                device = self.devices.pop(ip)
+                device.name = hostname
+                self.devices.setdefault(hostname, device)
+            name = self.addresses[ip] = hostname
+        elif name is None:
+            name = self.addresses[ip] = ip
+        device = self.devices.get(name)
+        if device is None:
+            if len(self.devices) >= self.max_devices:
+                silent = min(self.devices.values(), key=lambda d: d.last_seen)
+                print(f"Fleet full, forgetting {silent.name}")
+                self._forget(silent)
+            device = self.devices[name] = Device(name, ip)
+        device.address = ip
+        device.last_seen = t
+        return device
+
+    def _forget(self, device):
+        del self.devices[device.name]
+        for ip in [ip for ip, name in self.addresses.items() if name == device.name]:
+            del self.addresses[ip]
+
+    def _record(self, device, metric, value, t):
+        if value is None:
+            return
+        series = device.series.get(metric)
+        if series is None:
+            if len(device.series) >= self.max_metrics:
+                return
+            series = device.series[metric] = Series()
+        series.add(t, value)
+
+    # --- Queries ---
+    def summary(self, now=None):
+        now = now or time.time()
+        with self.lock:
+            return {d.name: {"address": d.address, "age": round(now - d.last_seen, 1),
+                             "metrics": {m: round(s.last[1], 3) for m, s in d.series.items() if s.last}}
+                    for d in self.devices.values()}
+
+    def device(self, name, minutes, now=None):
+        since = (now or time.time()) - minutes * 60
+        with self.lock:
+            device = self.devices.get(name)
+            if device is None:
+                return None
+            return {metric: series.points(since) for metric, series in device.series.items()}
+
+    def series(self, name, metric, minutes, now=None):
+        since = (now or time.time()) - minutes * 60
+        with self.lock:
+            device = self.devices.get(name)
+            series = device.series.get(metric) if device else None
+            return series.points(since) if series else None
+
+    def below(self, metric, minutes=1.0, value=None, of=None, fraction=1.0, now=None):
+        """
+        Units whose mean of metric over the window is below value, or below
+        fraction * their own mean of metric 'of'. Units with the metric but no
+        data in the window are included with mean None.
+        """
+        since = (now or time.time()) - minutes * 60
+        found = []
+        with self.lock:
+            for device in self.devices.values():
+                series = device.series.get(metric)
+                if series is None:
+                    continue
+                mean = series.mean(since)
+                if of is not None:
+                    reference = device.series.get(of)
+                    reference = reference.mean(since) if reference else None
+                    threshold = None if reference is None else reference * fraction
+                else:
+                    threshold = value
+                if threshold is None:
+                    continue
+                if mean is None or mean < threshold:
+                    found.append({"name": device.name, "mean": None if mean is None else round(mean, 3),
+                                  "threshold": round(threshold, 3)})
+        return sorted(found, key=lambda entry: entry["name"])
+
+    def silent(self, seconds, now=None):
+        now = now or time.time()
+        with self.lock:
+            return sorted(d.name for d in self.devices.values() if now - d.last_seen > seconds)
+
+
+# --- HTTP queries ---
+
+class _Handler(BaseHTTPRequestHandler):
+    fleet = None  # set by make_server
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            minutes = float(query.get('minutes', 10))
+            if url.path == '/devices':
+                result = self.fleet.summary()
+            elif url.path == '/device':
+                result = self.fleet.device(query['name'], minutes)
+            elif url.path == '/series':
+                result = self.fleet.series(query['name'], query['metric'], minutes)
+            elif url.path == '/below':
+                value = float(query['value']) if 'value' in query else None
+                if value is None and 'of' not in query:
+                    raise KeyError('value or of')
+                result = self.fleet.below(query['metric'], float(query.get('minutes', 1)), value,
+                                          query.get('of'), float(query.get('fraction', 1)))
+            elif url.path == '/silent':
+                result = self.fleet.silent(float(query.get('seconds', 30)))
+            else:
+                return self._send(404, {"error": "unknown query", "path": url.path})
+        except KeyError as e:
+            return self._send(400, {"error": f"missing parameter {e}"})
+        except ValueError as e:
+            return self._send(400, {"error": str(e)})
+        if result is None:
+            return self._send(404, {"error": "no such device or metric"})
+        self._send(200, result)
+
+    def _send(self, status, result):
+        data = json.dumps(result).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(fleet, port=HTTP_PORT):
+    handler = type('Handler', (_Handler,), {'fleet': fleet})
+    return ThreadingHTTPServer(('', port), handler)
+
+
+# --- OSC listener ---
+
+def listen(fleet, port=LISTEN_PORT):
+    """Receive broadcasts forever. Shares the port with DASHBOARD.pd on the same machine."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, 'SO_REUSEPORT'):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(('', port))
+    while True:
+        data, (ip, _) = sock.recvfrom(65536)
+        try:
+            fleet.receive(decodeOSC(data), ip)
+        except Exception as e:
+            print(f"Bad packet from {ip}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect fleet telemetry and answer queries over HTTP")
+    parser.add_argument("--port", type=int, default=LISTEN_PORT, help="UDP port the units broadcast to")
+    parser.add_argument("--http-port", type=int, default=HTTP_PORT, help="port for JSON queries")
+    args = parser.parse_args()
+
+    fleet = Fleet()
+    server = make_server(fleet, args.http_port)
+    threading.Thread(target=server.serve_forever, name="http", daemon=True).start()
+    print(f"Listening for units on UDP {args.port}, queries on http://localhost:{args.http_port}/devices "
+          f"(Ctrl+C to quit)")
+    try:
+        listen(fleet, args.port)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
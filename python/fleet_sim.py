@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# fleet_sim.py
+"""
+Simulated fleet for fleet_monitor.py
+Sends the /telemetry that helper.py and io/main.py broadcast, for any number
+of made-up units, so the monitor can be tried without a room full of Pis.
+
+Each unit drifts its CPU and temperature, and reads its sensors close to its
+target rate. A few misbehave: --slow units fall to a fraction of their target
+rate, and --silent units stop reporting after --silent-after seconds.
+
+Usage:
+    python fleet_sim.py                              # 50 units to localhost:5550 every 10 s
+    python fleet_sim.py --devices 20 --interval 1 --slow 3 --silent 2
+    python fleet_sim.py --host 255.255.255.255       # broadcast, like real units
+"""
+
+import argparse
+import random
+import socket
+import time
+
+from pyOSC3 import OSCMessage
+
+TARGETS = (50.0, 100.0, 200.0)  # io_target Hz the simulated patches ask for
+
+
+class SimUnit:
+    def __init__(self, index, slow=False, silent_after=None):
+        self.hostname = f"sim{index:02d}"
+        self.target = random.choice(TARGETS)
+        self.slow = slow
+        self.silent_after = silent_after  # seconds, None = never
+        self.cpu = random.uniform(10, 30)
+        self.temp = random.uniform(45, 55)
+
+    def helper_values(self):
+        self.cpu = min(100.0, max(1.0, self.cpu + random.gauss(0, 3)))
+        self.temp = min(85.0, max(35.0, self.temp + random.gauss(0, 0.5) + (self.cpu - 30) * 0.01))
+        return [self.hostname, 'cpu', round(self.cpu, 1), 'temp', round(self.temp, 1),
+                'mem', round(random.uniform(20, 30), 1), 'pd', 1, 'jack', 1]
+
+    def io_values(self):
+        rate = self.target * (random.uniform(0.3, 0.6) if self.slow else random.uniform(0.97, 1.0))
+        jitter = random.uniform(0.2, 1.5) * (5 if self.slow else 1)
+        return [self.hostname, 'io_rate', round(rate, 2), 'io_target', self.target,
+                'io_jitter_p99', round(jitter, 3), 'io_jitter_max', round(jitter * 2, 3),
+                'io_errors', 0, 'io_faulted', 1 if self.slow else 0]
+
+
+def message(values):
+    msg = OSCMessage("/telemetry")
+    msg.append(values)
+    return msg.getBinary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send telemetry from simulated units")
+    parser.add_argument("--host", default="127.0.0.1", help="where to send (255.255.255.255 to broadcast)")
+    parser.add_argument("--port", type=int, default=5550)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds between reports per unit")
+    parser.add_argument("--slow", type=int, default=2, help="units reading well below their target rate")
+    parser.add_argument("--silent", type=int, default=1, help="units that stop reporting")
+    parser.add_argument("--silent-after", type=float, default=60.0, help="seconds before they stop")
+    args = parser.parse_args()
+
+    units = [SimUnit(i, slow=i < args.slow,
+                     silent_after=args.silent_after if args.slow <= i < args.slow + args.silent else None)
+             for i in range(1, args.devices + 1)]
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    print(f"Sending telemetry for {len(units)} units to {args.host}:{args.port} every {args.interval} s "
+          f"(slow: {', '.join(u.hostname for u in units if u.slow) or 'none'}; "
+          f"silent after {args.silent_after:g} s: "
+          f"{', '.join(u.hostname for u in units if u.silent_after is not None) or 'none'})")
+
+    start = time.monotonic()
+    next_round = start
+    try:
+        while True:
+            elapsed = time.monotonic() - start
+            for unit in units:
+                if unit.silent_after is not None and elapsed > unit.silent_after:
+                    continue
+                sock.sendto(message(unit.helper_values()), (args.host, args.port))
+                sock.sendto(message(unit.io_values()), (args.host, args.port))
+                time.sleep(args.interval / len(units) / 4)  # spread the units over the interval
+            next_round += args.interval
+            time.sleep(max(0.0, next_round - time.monotonic()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -5,47 +5,205 @@ import re
 
 
 import os, sys
+import random
+import socket
+import time
+import threading
+from collections import OrderedDict
 from time import sleep
-from csv import reader
 from pyOSC3 import OSCServer, OSCClient, OSCMessage
 import atexit
-
-server = OSCServer( ('', 7770) )
+import jobs
+import patchcache
+import samplesync
+from device_registry import DeviceRegistry
+
+PORT = 7770     # commands from PD, other helpers and dispatch.py
+MAC = None      # this unit's MAC address (first command line argument)
+server = None   # OSCServer, see make_server()
+sample_server = None  # samplesync HTTP server for the active patch's samples, see serve_samples()
 client = OSCClient()
 client.connect( ('127.0.0.1', 6661) )
 
 
+def send(address, values):
+    """Send one message to PD (safe from the job thread)."""
+    msg = OSCMessage(address)
+    for value in values:
+        msg.append(value)
+    try:
+        client.send(msg)
+    except Exception as e:
+        print(f"Error sending {address}: {e}")
+
+
+job_queue = jobs.JobQueue(send)
+registry = DeviceRegistry()
+
+
+def background(name, callback):
+    """OSC handler that runs callback as a job instead of blocking the server."""
+    def handler(path='', tags='', args='', source=''):
+        job_queue.submit(name, lambda: callback(path, tags, args, source), key=(name, tuple(args)))
+    return handler
+
+
+def log_progress(text):
+    """Print a job's progress and report it to PD."""
+    print(text)
+    jobs.progress(text)
+
+
+def jobs_callback(path='', tags='', args='', source=''):
+    """Reply /jobs <id> <name> <state> ... for the running and waiting jobs."""
+    listing = job_queue.jobs()
+    print("Jobs: " + (", ".join(f"{job.id} {job.name} {job.state}" for job in listing) or "none"))
+    send("/jobs", [value for job in listing for value in (job.id, job.name, job.state)])
+
+
 def config_callback(path='', tags='', args='', source=''):
-    directory = os.path.dirname(os.path.realpath(__file__))
-    config_file = os.path.join(directory, "../bopos.devices")
-    print("loading: ", config_file)
+    print("loading: ", registry.path)
 
-    import socket
     current_hostname = socket.gethostname()
 
-    with open(config_file, 'r') as read_obj:
-        csv_reader = reader(read_obj, skipinitialspace=True)
-        macfound = False
-        for row in csv_reader:
-            if row[0] == sys.argv[1]:
-                print('MAC address found in bopos.devices')
-                macfound = True
-                hostname = row[1]
-
-                if current_hostname != hostname:
-                    print(f"Hostname change: {current_hostname} -> {hostname}")
-                    os.system(f'sudo hostnamectl set-hostname {hostname}')
-                    os.system(f"sudo sed -i 's/^127.0.1.1.*/127.0.1.1   {hostname}/' /etc/hosts")
-                    os.system('sudo systemctl restart avahi-daemon')
-
-                id = row[2]
-                print('setting ID to ' + id)
-                msg = OSCMessage("/id")
-                msg.append(id, 'f')
-                client.send(msg)
-                break
-        if not macfound:
-            print('MAC address not found in bopos.devices.csv')
+    if MAC is None:
+        print('No MAC address given on the command line')
+        return
+    device = registry.by_mac(MAC)
+    if device is None:
+        print('MAC address not found in bopos.devices')
+        return
+
+    print('MAC address found in bopos.devices')
+    hostname = device.hostname
+    if current_hostname != hostname:
+        print(f"Hostname change: {current_hostname} -> {hostname}")
+        subprocess.run(['sudo', 'hostnamectl', 'set-hostname', hostname])
+        subprocess.run(['sudo', 'sed', '-i', f's/^127.0.1.1.*/127.0.1.1   {hostname}/', '/etc/hosts'])
+        subprocess.run(['sudo', 'systemctl', 'restart', 'avahi-daemon'])
+
+    print(f'setting ID to {device.id}, positions {device.posl} {device.posr}')
+    send("/id", [float(device.id)])
+    send("/posl", [float(v) for v in device.posl])
+    send("/posr", [float(v) for v in device.posr])
+
+
+DASHBOARD_PORT = 5550  # dashboards listen for broadcasts from every unit here
+
+
+def broadcast(address, values, port=7770):
+    """Send one message to every helper.py on the LAN."""
+    msg = OSCMessage(address)
+    for value in values:
+        msg.append(value)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.sendto(msg.getBinary(), ('255.255.255.255', port))
+    except OSError as e:
+        print(f"Error broadcasting {address}: {e}")
+    finally:
+        sock.close()
+
+
+TELEMETRY_INTERVAL = 10  # seconds between /telemetry broadcasts to the fleet monitor
+
+
+def cpu_times():
+    """(busy, total) jiffies from /proc/stat."""
+    with open('/proc/stat') as f:
+        values = [int(v) for v in f.readline().split()[1:]]
+    idle = values[3] + (values[4] if len(values) > 4 else 0)  # idle + iowait
+    return sum(values) - idle, sum(values)
+
+
+def system_telemetry(previous):
+    """Metric name/value pairs for this unit. previous is the last cpu_times() (updated in place)."""
+    values = []
+    try:
+        busy, total = cpu_times()
+        if previous and total > previous[1]:
+            values += ['cpu', round(100.0 * (busy - previous[0]) / (total - previous[1]), 1)]
+        previous[:] = [busy, total]
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        with open('/sys/class/thermal/thermal_zone0/temp') as f:
+            values += ['temp', int(f.read()) / 1000.0]
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/proc/meminfo') as f:
+            info = {line.split(':')[0]: int(line.split()[1]) for line in f if len(line.split()) > 1}
+        values += ['mem', round(100.0 * (1 - info['MemAvailable'] / info['MemTotal']), 1)]
+    except (OSError, ValueError, KeyError, ZeroDivisionError):
+        pass
+    jackd = subprocess.run(["pgrep", "-x", "jackd"], stdout=subprocess.DEVNULL).returncode == 0
+    values += ['pd', int(pd_running()), 'jack', int(jackd)]
+    return values
+
+
+def telemetry_loop(interval=TELEMETRY_INTERVAL):
+    """
+    Broadcast /telemetry <hostname> cpu <%> temp <C> mem <%> pd <0|1> jack <0|1>
+    to the fleet monitor every interval seconds (io/main.py adds its own io_* metrics).
+    """
+    previous = []
+    while True:
+        try:
+            broadcast("/telemetry", [socket.gethostname()] + system_telemetry(previous), port=DASHBOARD_PORT)
+        except Exception as e:
+            print(f"Telemetry error: {e}")
+        sleep(interval)
+
+
+REGISTRY_HOLDOFF = 3.0  # max seconds to wait before answering an older snapshot
+registry_lock = threading.Lock()
+registry_reply = None   # threading.Timer of our pending answer to an older snapshot
+
+
+def answer_registry():
+    """Broadcast our snapshot to bring an older unit up to date, unless another unit already did."""
+    global registry_reply
+    with registry_lock:
+        if registry_reply is None:
+            return
+        registry_reply = None
+    print(f"Broadcasting registry version {registry.version} to an older unit")
+    broadcast("/registry", registry.snapshot())
+
+
+def registry_callback(path='', tags='', args='', source=''):
+    """
+    /registry             broadcast our bopos.devices snapshot to every unit
+    /registry <snapshot>  adopt a received snapshot if its version is newer
+
+    Every unit with a newer registry hears an older snapshot, so each waits a
+    random holdoff before answering and stays quiet if one of them (or an
+    even newer snapshot) was broadcast meanwhile: one answer instead of one
+    per unit.
+    """
+    global registry_reply
+    if args:
+        try:
+            adopted = registry.adopt(args)
+        except ValueError as e:
+            print(f"Ignoring registry snapshot from {source}: {e}")
+            return
+        with registry_lock:
+            if int(args[0]) >= registry.version and registry_reply is not None:
+                registry_reply.cancel()  # someone answered with ours or a newer one
+                registry_reply = None
+            elif int(args[0]) < registry.version and registry_reply is None:
+                registry_reply = threading.Timer(random.uniform(0, REGISTRY_HOLDOFF), answer_registry)
+                registry_reply.daemon = True
+                registry_reply.start()
+        if adopted:
+            config_callback()  # hostname, ID or positions may have changed
+    else:
+        print(f"Broadcasting registry version {registry.version} ({len(registry.devices)} devices)")
+        broadcast("/registry", registry.snapshot())
+    send("/registry", [registry.version, len(registry.devices)])
 
 
 def update_callback(path='', tags='', args='', source=''):
@@ -54,15 +212,15 @@ def update_callback(path='', tags='', args='', source=''):
     msg = OSCMessage("/update")
     client.send(msg)
     print("UPDATE!")
-    os.system(update_script)
+    if os.system(update_script) != 0:
+        return False
 
 def getsamples_callback(path='', tags='', args='', source=''):
-    directory = os.path.dirname(os.path.realpath(__file__))
-    update_script = os.path.join(directory, "../bash/getsamples.sh")
+    """/getsamples [peer ...]: fetch only the samples that changed (samplesync.py)."""
     msg = OSCMessage("/getsamples")
     client.send(msg)
     print("UPDATE SAMPLES!")
-    os.system(update_script)        
+    return samplesync.sync_active_patch(peers=[str(peer) for peer in args], progress=log_progress)
 
 def shutdown_callback(path='', tags='', args='', source=''):
     msg = OSCMessage("/shutdown")
@@ -92,55 +250,170 @@ def checkout_callback(path, tags, args, source):
     print("UPDATE!")
     os.system(update_script)
 
+PD_PORT = 6661            # PD's [netreceive] for helper.py; bound once main.pd has loaded
+PD_STOP_TIMEOUT = 5       # seconds for PD to exit before it is killed
+PD_READY_TIMEOUT = 20     # seconds for the new patch to load
+IO_PORT = 8880            # io/main.py commands
+io_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+
+def send_io(address, values):
+    """Send one command to io/main.py."""
+    msg = OSCMessage(address)
+    for value in values:
+        msg.append(value)
+    try:
+        io_socket.sendto(msg.getBinary(), ('127.0.0.1', IO_PORT))
+    except OSError as e:
+        print(f"Error sending {address} to io: {e}")
+
+
+def pd_running():
+    return subprocess.run(["pgrep", "-x", "pd"], stdout=subprocess.DEVNULL).returncode == 0
+
+
+def udp_port_bound(port):
+    """True if some process listens on UDP port (read from /proc, so PD's own bind is never disturbed)."""
+    for table in ('/proc/net/udp', '/proc/net/udp6'):
+        try:
+            with open(table) as f:
+                next(f)
+                if any(int(line.split()[1].rsplit(':', 1)[1], 16) == port for line in f):
+                    return True
+        except (OSError, StopIteration, IndexError, ValueError):
+            continue
+    return False
+
+
+def stop_pd(patch_path):
+    """Run the patch's stop.sh if it has one, then stop PD (jackd and io/main.py keep running)."""
+    stop_script = os.path.join(patch_path, 'stop.sh')
+    if os.path.isfile(stop_script):
+        subprocess.run(["bash", stop_script], timeout=30)
+    os.system("pkill -x pd")
+    deadline = time.time() + PD_STOP_TIMEOUT
+    while pd_running() and time.time() < deadline:
+        sleep(0.1)
+    if pd_running():
+        print("PD did not exit, killing it")
+        os.system("pkill -9 -x pd")
+        sleep(0.5)
+
+
+def start_pd():
+    """Start PD with the active patch through start_pd.sh, as the user that owns the install."""
+    directory = os.path.dirname(os.path.realpath(__file__))
+    script = os.path.realpath(os.path.join(directory, "../bash/start_pd.sh"))
+    command = ["bash", script]
+    if os.geteuid() == 0:  # helper.py runs under sudo; PD must join the user's jackd
+        import pwd
+        owner = pwd.getpwuid(os.stat(script).st_uid).pw_name
+        if owner != 'root':
+            command = ["sudo", "-u", owner] + command
+    subprocess.Popen(command, start_new_session=True)
+
+
+def wait_for_pd(timeout=None):
+    """Wait until PD has loaded the patch and listens on PD_PORT. Returns True if it did."""
+    deadline = time.time() + (timeout or PD_READY_TIMEOUT)
+    while time.time() < deadline:
+        if udp_port_bound(PD_PORT):
+            return True
+        sleep(0.1)
+    return False
+
+
+def serve_samples(patch_path):
+    """Serve a patch's samples to peers on samplesync.SERVE_PORT, re-rooting the running server."""
+    global sample_server
+    root = samplesync.samples_dir(patch_path)
+    if sample_server is None:
+        sample_server = samplesync.serve_in_background(root)
+    else:
+        samplesync.set_root(sample_server, root)
+
+
 def switch_patch_callback(path='', tags='', args='', source=''):
+    """
+    /patch <name> [reboot]
+    Restarts only PD with the new patch; jackd and io/main.py keep running,
+    io/main.py swaps its peripherals for the new patch's io.json (/reload).
+    Broadcasts /patchready <name> <seconds> (or /patchfailed <name> <reason>)
+    to the dashboard on 5550 and sends it to PD. 'reboot' (or no jackd)
+    switches the old way, with a full reboot.
+    """
     directory = os.path.dirname(os.path.realpath(__file__))
     patches_dir = os.path.join(directory, '../patches')
     active_patch_file = os.path.realpath(os.path.join(patches_dir, 'active_patch.txt'))
 
     if not args or not args[0]:
         print("No patch name provided to /patch")
-        return
+        return False
 
     patch_name = args[0].strip()
     patch_path = os.path.join(patches_dir, patch_name)
+    reboot = len(args) > 1 and str(args[1]) == 'reboot'
 
     if not os.path.isdir(patch_path):
         print(f"Patch '{patch_name}' not found in {patches_dir}")
-        return
+        return False
 
     if not os.path.isfile(os.path.join(patch_path, 'main.pd')):
         print(f"Patch '{patch_name}' has no main.pd — cannot switch")
-        return
+        return False
 
     current = open(active_patch_file).read().strip() if os.path.exists(active_patch_file) else 'None'
     print(f"Switching patch: {current} -> {patch_name}")
 
+    # Pull latest for the new patch repo if it has a git repo (the old patch keeps playing meanwhile)
+    if os.path.isdir(os.path.join(patch_path, '.git')):
+        print(f"Pulling latest for {patch_name}...")
+        jobs.progress(f"pulling {patch_name}")
+        result = patchcache.pull(patch_path)
+        print(result.stdout.decode())
+        if result.returncode != 0:
+            print(f"git pull failed: {result.stderr.decode()}")
+
     try:
         with open(active_patch_file, 'w') as f:
             f.write(patch_name + '\n')
         print(f"Active patch set to: {patch_name}")
     except Exception as e:
         print(f"Failed to write active_patch.txt: {e}")
+        return False
+
+    jackd_running = subprocess.run(["pgrep", "-x", "jackd"], stdout=subprocess.DEVNULL).returncode == 0
+    if reboot or not jackd_running:
+        if not reboot:
+            print("jackd is not running, switching with a reboot")
+        os.system("pkill pd; pkill jackd")
+        print("Rebooting...")
+        jobs.progress("rebooting")
+        os.system("systemctl reboot")
         return
 
-    # Stop the running patch
-    os.system("pkill pd; pkill jackd")
-
-    # Pull latest for the new patch repo if it has a git repo
-    if os.path.isdir(os.path.join(patch_path, '.git')):
-        print(f"Pulling latest for {patch_name}...")
-        result = subprocess.run(
-            ["git", "pull", "--recurse-submodules"],
-            cwd=patch_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=120
-        )
-        print(result.stdout.decode())
-        if result.returncode != 0:
-            print(f"git pull failed: {result.stderr.decode()}")
-
-    print("Rebooting...")
-    os.system("systemctl reboot")
-
-
+    started = time.time()
+    # io/main.py only reads io.json at startup: have it drop the old patch's
+    # peripherals and create the new ones while PD restarts
+    jobs.progress("reloading io")
+    send_io("/reload", [])
+    # Peers running /getsamples must get the new patch's pack, not the old one
+    serve_samples(patch_path)
+    jobs.progress(f"stopping {current}")
+    stop_pd(os.path.join(patches_dir, current))
+    jobs.progress(f"starting {patch_name}")
+    start_pd()
+    if not wait_for_pd():
+        reason = "PD running but not listening" if pd_running() else "PD exited"
+        print(f"Patch {patch_name} failed to start: {reason}")
+        broadcast("/patchfailed", [patch_name, reason], port=DASHBOARD_PORT)
+        send("/patchfailed", [patch_name, reason])
+        return False
+
+    seconds = round(time.time() - started, 1)
+    print(f"Patch {patch_name} ready after {seconds} s")
+    broadcast("/patchready", [patch_name, seconds], port=DASHBOARD_PORT)
+    send("/patchready", [patch_name, seconds])  # main.pd asks for /config itself on load
 
 
 def add_patch_callback(path='', tags='', args='', source=''):
@@ -148,26 +421,23 @@ def add_patch_callback(path='', tags='', args='', source=''):
     patches_dir = os.path.join(directory, '../patches')
     if not args or len(args) < 2:
         print("/addpatch requires two arguments: user and repo")
-        return
+        return False
     user = str(args[0]).strip()
     repo = str(args[1]).strip()
     if not re.match(r'^[\w-]+$', user):
         print(f"Invalid user: {user}")
-        return
+        return False
     if not re.match(r'^[\w.-]+$', repo):
         print(f"Invalid repo: {repo}")
-        return
+        return False
     repo_url = f"https://github.com/{user}/{repo}.git"
     dest_dir = os.path.join(patches_dir, repo)
-    # Check if repo exists on GitHub
-    try:
-        result = subprocess.run(["git", "ls-remote", repo_url], stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=10)
-        if result.returncode != 0:
-            print(f"GitHub repo not found or not accessible: {repo_url}")
-            return
-    except Exception as e:
-        print(f"Error checking repo: {e}")
-        return
+    # Check if repo exists (through the LAN patch cache if there is one, see patchcache.py)
+    jobs.progress(f"checking {user}/{repo}")
+    result = patchcache.ls_remote(repo_url)
+    if result.returncode != 0:
+        print(f"GitHub repo not found or not accessible: {repo_url}")
+        return False
     # Remove existing folder if it exists
     if os.path.isdir(dest_dir):
         try:
@@ -175,24 +445,15 @@ def add_patch_callback(path='', tags='', args='', source=''):
             shutil.rmtree(dest_dir)
         except Exception as e:
             print(f"Failed to remove existing patch folder: {e}")
-            return
-    # Clone repo recursively (120s timeout to handle slow networks)
-    try:
-        print(f"Cloning {repo_url} into {dest_dir}...")
-        result = subprocess.run(
-            ["git", "clone", "--recursive", repo_url, dest_dir],
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=120
-        )
-        if result.returncode != 0:
-            print(f"Failed to clone repo: {result.stderr.decode().strip()}")
-            return
-        print(f"Cloned {repo_url} into {dest_dir}")
-    except subprocess.TimeoutExpired:
-        print(f"Clone timed out after 120s — check network connection")
-        return
-    except Exception as e:
-        print(f"Error cloning repo: {e}")
-        return
+            return False
+    # Clone repo recursively, from the patch cache first (120s timeout per attempt for slow networks)
+    print(f"Cloning {repo_url} into {dest_dir}...")
+    jobs.progress(f"cloning {user}/{repo}")
+    result = patchcache.clone(repo_url, dest_dir)
+    if result.returncode != 0:
+        print(f"Failed to clone repo: {result.stderr.decode().strip()}")
+        return False
+    print(f"Cloned {repo_url} into {dest_dir}")
 
     # Validate patch has a main.pd entrypoint
     if not os.path.isfile(os.path.join(dest_dir, 'main.pd')):
@@ -215,32 +476,139 @@ def pull_active_patch_callback(path='', tags='', args='', source=''):
         result = subprocess.run(["bash", script_path], timeout=120)
         if result.returncode != 0:
             print(f"pull_active_patch.sh exited with code {result.returncode}")
+            return False
     except Exception as e:
         print(f"[pull_active_patch_callback] Exception: {e}")
+        return False
 
 
 def exit_handler():
     print("exiting.  closing server...")
-    server.close()
+    if server is not None:
+        server.close()
+
+
+# address -> (callback, job name); commands with a job name run in the background (jobs.py)
+COMMANDS = {
+    "/config": (config_callback, None),
+    "/update": (update_callback, "update"),
+    "/getsamples": (getsamples_callback, "getsamples"),
+    "/shutdown": (shutdown_callback, None),
+    "/reboot": (reboot_callback, None),
+    "/checkout": (checkout_callback, "checkout"),
+    "/patch": (switch_patch_callback, "patch"),
+    "/addpatch": (add_patch_callback, "addpatch"),  # expects two arguments: user, repo
+    "/pullpatch": (pull_active_patch_callback, "pullpatch"),  # pulls the current active patch repo
+    "/jobs": (jobs_callback, None),  # lists running and queued jobs
+    "/registry": (registry_callback, None),  # broadcast / adopt bopos.devices snapshots
+}
+
+RECENT_COMMANDS = 256  # /cmd ids remembered so a retried command is not run twice
+recent_commands = OrderedDict()  # id -> {"done": /done values or None}
+reply_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+
+def reply(source, address, values):
+    """Send one message back to whoever sent a command (e.g. dispatch.py)."""
+    msg = OSCMessage(address)
+    for value in values:
+        msg.append(value)
+    try:
+        reply_socket.sendto(msg.getBinary(), source)
+    except OSError as e:
+        print(f"Error replying {address} to {source}: {e}")
+
+
+def cmd_callback(path='', tags='', args='', source=''):
+    """
+    /cmd <id> <token> <command> [args...]
+    Run a command for dispatch.py and answer the sender with
+        /ack <id> <token> <hostname>                 as soon as it arrives
+        /done <id> <token> <state> <seconds> [error]  when it has finished
+    state is done, failed, refused (job queue full) or unknown. A repeated id
+    (a retry whose ack was lost) is answered again but not run again.
+    """
+    if len(args) < 3:
+        print(f"/cmd needs an id, a token and a command, got {args}")
+        return
+    command_id, token, command, rest = str(args[0]), args[1], str(args[2]), list(args[3:])
+    entry = recent_commands.get(command_id)
+    if entry is not None:
+        reply(source, "/ack", [command_id, token, socket.gethostname()])
+        if entry["done"]:
+            reply(source, "/done", entry["done"])
+        return
+    entry = recent_commands[command_id] = {"done": None}
+    while len(recent_commands) > RECENT_COMMANDS:
+        recent_commands.popitem(last=False)
+    reply(source, "/ack", [command_id, token, socket.gethostname()])
+
+    started = time.time()
+
+    def finish(state, detail=''):
+        values = [command_id, token, state, round(time.time() - started, 2)]
+        if detail:
+            values.append(str(detail))
+        entry["done"] = values
+        reply(source, "/done", values)
+
+    address = '/' + command.strip('/')
+    if address not in COMMANDS:
+        print(f"/cmd {command_id}: unknown command {command}")
+        finish('unknown', command)
+        return
+    print(f"/cmd {command_id}: {command} {' '.join(str(a) for a in rest)}")
+    callback, job = COMMANDS[address]
+    if job:
+        job_id = job_queue.submit(job, lambda: callback(address, '', rest, source),
+                                  key=(job, tuple(rest)), on_done=lambda j: finish(j.state, j.detail))
+        if job_id is None:
+            finish('refused', 'queue full')
+        return
+    try:
+        ok = callback(address, '', rest, source) is not False
+    except Exception as e:
+        print(f"/cmd {command_id}: {command} failed: {e}")
+        finish('failed', e)
+        return
+    finish('done' if ok else 'failed')
 
 
-server.addMsgHandler( "/config", config_callback )
-server.addMsgHandler( "/update", update_callback )
-server.addMsgHandler( "/getsamples", getsamples_callback )
-server.addMsgHandler( "/shutdown", shutdown_callback )
-server.addMsgHandler( "/reboot", reboot_callback )
-server.addMsgHandler( "/checkout", checkout_callback )
-server.addMsgHandler( "/patch", switch_patch_callback )
-server.addMsgHandler( "/addpatch", add_patch_callback )  # expects two arguments: user, repo
-server.addMsgHandler( "/pullpatch", pull_active_patch_callback )  # pulls the current active patch repo
+def make_server(port=PORT):
+    """OSC server with every command, /cmd and the background job wrappers registered."""
+    osc_server = OSCServer( ('', port) )
+    for address, (callback, job) in COMMANDS.items():
+        osc_server.addMsgHandler( address, background(job, callback) if job else callback )
+    osc_server.addMsgHandler( "/cmd", cmd_callback )  # acknowledged commands from dispatch.py
+    return osc_server
+
 
 atexit.register(exit_handler)
 
 #ARG 1 MAC Address
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="plantsOS admin helper")
+    parser.add_argument("mac", nargs="?", help="this unit's MAC address (looked up in bopos.devices)")
+    parser.add_argument("--port", type=int, default=PORT, help="OSC port to listen on")
+    options = parser.parse_args()
+    MAC = options.mac
+    server = make_server(options.port)
+    print(f"helper.py listening on {options.port}")
 
     # config_callback()
 
-    while True:
-        sleep(1)
-        server.handle_request()
+    # Other units can fetch our samples instead of all hitting the origin
+    try:
+        serve_samples(samplesync.active_patch_dir())
+    except OSError as e:
+        print(f"Sample server not started: {e}")
+
+    # System metrics for the fleet monitor (python/fleet_monitor.py)
+    threading.Thread(target=telemetry_loop, name="telemetry", daemon=True).start()
+
+    # Let units with an older bopos.devices catch up with ours (and vice versa)
+    broadcast("/registry", registry.snapshot())
+
+    # Handle each command as soon as it arrives; long ones run as jobs (jobs.py)
+    server.serve_forever()
@@ -0,0 +1,163 @@
+# aio.py
+"""
+asyncio mode for IOManager (python main.py --async)
+
+One event loop owns the command socket and the poll schedule; nothing blocking
+ever runs on it:
+    - Commands arrive on a datagram endpoint and are handled as soon as the
+      packet lands. Commands that touch I2C (/create, /<name>/<command>) are
+      queued on that bus's worker thread, so they wait behind at most the read
+      in progress on that bus. Everything else (/poll, /<name>/rate, /stats, ...)
+      only changes state and runs on the loop.
+    - Every I2C bus has its own poll task. It sleeps until the next deadline of
+      its own peripherals, hands their reads to the bus's worker thread
+      (buses.py) and sends what they returned as a bundle, so a slow or stuck
+      bus never holds up the others.
+    - SIGINT/SIGTERM stop the loop directly, no KeyboardInterrupt needed.
+"""
+
+import asyncio
+import signal
+import time
+
+from pyOSC3 import decodeOSC
+
+import buses
+from scheduler import MAX_SLEEP
+
+LOCAL_PERIPHERAL_COMMANDS = {'rate', 'deadband', 'filter', 'budget'}
+
+
+def _messages(decoded):
+    """Yield (address, tags, args) for a decoded message or (nested) bundle."""
+    if decoded and decoded[0] == '#bundle':
+        for element in decoded[2:]:
+            yield from _messages(element)
+    elif decoded:
+        yield decoded[0], decoded[1].lstrip(','), decoded[2:]
+
+
+def _report(future, address):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Error handling {address}: {future.exception()}")
+
+
+class CommandProtocol(asyncio.DatagramProtocol):
+    """Decodes OSC packets on the command port and hands them to the bridge."""
+
+    def __init__(self, bridge):
+        self.bridge = bridge
+
+    def datagram_received(self, data, source):
+        try:
+            decoded = decodeOSC(data)
+        except Exception as e:
+            print(f"Bad OSC packet from {source}: {e}")
+            return
+        for address, tags, args in _messages(decoded):
+            self.bridge.dispatch(address, tags, args, source)
+
+
+class AsyncBridge:
+    """Runs an IOManager on an asyncio event loop."""
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def _bus_for(self, parts, args):
+        """Bus whose worker should run this command, or None to run it on the loop."""
+        manager = self.manager
+        if parts[0] == 'create':
+            return buses.bus_id(manager.parse_create(args)[4])
+        if (len(parts) >= 2 and parts[0] in manager.peripherals
+                and parts[1] not in LOCAL_PERIPHERAL_COMMANDS):
+            return buses.bus_id(getattr(manager.peripherals[parts[0]], 'bus', None))
+        return None
+
+    def dispatch(self, address, tags, args, source):
+        """Handle one command without ever blocking the loop on I2C."""
+        parts = address.strip('/').split('/')
+        try:
+            bus = self._bus_for(parts, args)
+        except (IndexError, TypeError, ValueError) as e:
+            print(f"Bad command {address} {args}: {e}")
+            return
+
+        loop = asyncio.get_running_loop()
+        if parts[0] in ('scan', 'reload'):
+            # Probe/clean up/create on several bus workers and wait for them
+            future = loop.run_in_executor(None, self.manager.handle_command, address, tags, args, source)
+            future.add_done_callback(lambda f: _report(f, address))
+            return
+
+        if bus is None:
+            try:
+                self.manager.handle_command(address, tags, args, source)
+            except Exception as e:
+                print(f"Error handling {address}: {e}")
+            return
+
+        future = loop.run_in_executor(buses.get_worker(bus), self.manager.handle_command,
+                                      address, tags, args, source)
+        future.add_done_callback(lambda f: _report(f, address))
+
+    async def poll_bus(self, bus):
+        """Poll one bus's peripherals at their own deadlines until stopped."""
+        manager = self.manager
+        while manager.running:
+            now = time.monotonic()
+            names = manager.due_on_bus(bus, now)
+            if names:
+                future = buses.get_worker(bus).submit(manager._read_group, names, bus)
+                wrapped = asyncio.wrap_future(future)
+                start = time.perf_counter()
+                done, _ = await asyncio.wait({wrapped}, timeout=manager.read_timeout(names))
+                if done:
+                    manager.stats.record_round(time.perf_counter() - start)
+                    manager.send_results(wrapped.result(), now)
+                else:
+                    manager.read_timed_out(bus, future)  # left out until the read returns
+            await asyncio.sleep(manager.scheduler.delay(manager.bus_names.get(bus, ())))
+
+    async def poll(self):
+        """Run a poll task per bus (starting one when a peripheral appears on a new bus) until stopped."""
+        manager = self.manager
+        tasks = {}
+        try:
+            while manager.running:
+                for bus in manager.bus_ids - set(tasks):
+                    tasks[bus] = asyncio.create_task(self.poll_bus(bus))
+                for bus, task in list(tasks.items()):
+                    if task.done():
+                        del tasks[bus]  # restarted on the next pass
+                        _report(task, f"bus {bus} poll task")
+                manager.housekeeping()
+                await asyncio.sleep(MAX_SLEEP)
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    def stop(self):
+        self.manager.running = False
+
+    async def main(self, port):
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.stop)
+
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: CommandProtocol(self), local_addr=("127.0.0.1", port))
+        try:
+            await self.poll()
+        finally:
+            print("\n\nShutting down...")
+            transport.close()
+            self.manager.cleanup()
+
+
+def run(manager, port):
+    """Run the bridge on an asyncio event loop until SIGINT/SIGTERM."""
+    manager.print_banner()
+    print("(asyncio mode)\n")
+    asyncio.run(AsyncBridge(manager).main(port))
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+IOManager Benchmark (no hardware needed)
+Drives IOManager with simulated MPR121 / ADS1x15 / LIS3DH devices (sim_i2c.py)
+and a local UDP sink standing in for Pure Data, then reports achieved rate,
+tick time (one bus loop's reads), CPU use and bytes sent at each target rate.
+
+Usage:
+    python bench.py                                    # 2x mpr121, ads1115, lis3dh at 10-1000 Hz
+    python bench.py --devices mpr121=4,ads1015=2 --rates 50 100 --khz 100
+    python bench.py --buses 2                          # spread devices over buses 1 and 3
+    python bench.py --out bench.json                   # save results to compare commits
+    python bench.py --compare before.json after.json   # print two saved runs side by side
+
+Needs the Adafruit MPR121/ADS1x15 libraries (pip install -r ../requirements-laptop.txt).
+"""
+
+import argparse
+import json
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import sim_i2c
+
+DEFAULT_DEVICES = "mpr121=2,ads1115=1,lis3dh=1"
+DEFAULT_RATES = [10, 50, 100, 250, 500, 1000]
+
+# Simulated chip and usable addresses per device type
+SIM_DEVICES = {
+    'mpr121': (sim_i2c.SimMPR121, {}, [0x5A, 0x5B, 0x5C, 0x5D]),
+    'ads1015': (sim_i2c.SimADS1x15, {'bits': 12}, [0x48, 0x49, 0x4A, 0x4B]),
+    'ads1115': (sim_i2c.SimADS1x15, {'bits': 16}, [0x48, 0x49, 0x4A, 0x4B]),
+    'lis3dh': (sim_i2c.SimLIS3DH, {}, [0x19, 0x18]),
+}
+SIM_BUS_IDS = [1, 3, 4, 5]
+
+
+class UDPSink:
+    """Counts packets and bytes arriving where Pure Data would listen."""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.2)
+        self.address = self.sock.getsockname()
+        self.packets = 0
+        self.bytes = 0
+        self.running = True
+        threading.Thread(target=self._receive, daemon=True).start()
+
+    def _receive(self):
+        while self.running:
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                continue
+            self.packets += 1
+            self.bytes += len(data)
+
+    def reset(self):
+        self.packets = 0
+        self.bytes = 0
+
+    def close(self):
+        self.running = False
+
+
+def parse_devices(spec):
+    """'mpr121=2,lis3dh=1' -> [('mpr121', 2), ('lis3dh', 1)]"""
+    devices = []
+    for part in spec.split(','):
+        device_type, _, count = part.partition('=')
+        if device_type not in SIM_DEVICES:
+            raise SystemExit(f"Unknown device type '{device_type}', choose from {list(SIM_DEVICES)}")
+        devices.append((device_type, int(count or 1)))
+    return devices
+
+
+def attach_devices(devices, bus_count):
+    """Put simulated chips on the buses; returns [(name, type, address, bus), ...]."""
+    layout = []
+    used = {}  # (bus, type family) -> addresses taken
+    index = 0
+    for device_type, count in devices:
+        chip, kwargs, addresses = SIM_DEVICES[device_type]
+        for n in range(count):
+            bus = SIM_BUS_IDS[index % bus_count]
+            index += 1
+            taken = used.setdefault((bus, chip), 0)
+            if taken >= len(addresses):
+                raise SystemExit(f"Too many {device_type} on bus {bus}, use more --buses")
+            used[(bus, chip)] = taken + 1
+            address = addresses[taken]
+            sim_i2c.add_device(chip(address, **kwargs), bus=bus)
+            layout.append((f"{device_type}{n + 1}", device_type, address, bus))
+    return layout
+
+
+def run_once(layout, rate, duration, sink):
+    """Run IOManager at one target rate and measure it."""
+    from main import IOManager
+
+    manager = IOManager(pd_address=sink.address)
+    try:
+        for name, device_type, address, bus in layout:
+            manager.create_peripheral(name, device_type, address, rate, bus)
+
+        manager.stats.reset()
+        sink.reset()
+        cpu_start = time.process_time()
+        start = time.monotonic()
+
+        # The real loop: one deadline loop per bus plus the sender, stopped after 'duration'
+        runner = threading.Thread(target=manager.loop, daemon=True)
+        runner.start()
+        time.sleep(duration)
+        manager.running = False
+        runner.join()
+
+        wall = time.monotonic() - start
+        cpu = time.process_time() - cpu_start
+        ticks = manager.stats.rounds
+        rates = {name: manager.scheduler.rate(name) for name in manager.peripherals}
+        missed = {name: s.missed for name, s in manager.scheduler.schedules.items()}
+        per_peripheral, loop = manager.stats.report(rates, missed)
+    finally:
+        manager.cleanup()  # peripherals, bus workers, encoder/OSC/subscriber sockets
+
+    achieved = [values[1] for values in per_peripheral.values()]
+    p50, p95, p99, tick_max = ticks.summary_ms()
+    return {
+        'target_hz': rate,
+        'achieved_hz_mean': round(sum(achieved) / len(achieved), 2),
+        'achieved_hz_min': min(achieved),
+        'tick_ms': {'p50': p50, 'p95': p95, 'p99': p99, 'max': tick_max},
+        'cpu_percent': round(100 * cpu / wall, 1),
+        'bytes_per_s': round(sink.bytes / wall),
+        'packets_per_s': round(sink.packets / wall, 1),
+        'missed': sum(missed.values()),
+        'peripherals': {name: {'achieved_hz': v[1], 'read_ms_p50': v[2], 'read_ms_p99': v[4]}
+                        for name, v in per_peripheral.items()},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, timeout=5).stdout.decode().strip()
+    except Exception:
+        return ""
+
+
+def print_run(run):
+    tick = run['tick_ms']
+    print(f"  {run['target_hz']:>6} Hz  achieved {run['achieved_hz_mean']:>8} (min {run['achieved_hz_min']:>8})"
+          f"  tick p50 {tick['p50']:>7} ms  p95 {tick['p95']:>7} ms"
+          f"  cpu {run['cpu_percent']:>5}%  {run['bytes_per_s']:>8} B/s  missed {run['missed']}")
+
+
+def compare(before_path, after_path):
+    """Print two saved result files side by side."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"before: {before['commit']} ({before['timestamp']})   after: {after['commit']} ({after['timestamp']})\n")
+    print(f"{'rate':>6}  {'achieved Hz':>20}  {'tick p95 ms':>20}  {'cpu %':>16}  {'bytes/s':>20}")
+    old_runs = {run['target_hz']: run for run in before['runs']}
+    for run in after['runs']:
+        old = old_runs.get(run['target_hz'])
+        if old is None:
+            continue
+        print(f"{run['target_hz']:>6}  {old['achieved_hz_mean']:>9} -> {run['achieved_hz_mean']:<7}"
+              f"  {old['tick_ms']['p95']:>9} -> {run['tick_ms']['p95']:<7}"
+              f"  {old['cpu_percent']:>7} -> {run['cpu_percent']:<5}"
+              f"  {old['bytes_per_s']:>9} -> {run['bytes_per_s']:<7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IOManager against simulated I2C devices")
+    parser.add_argument("--devices", default=DEFAULT_DEVICES, help="e.g. mpr121=2,ads1115=1,lis3dh=1")
+    parser.add_argument("--rates", type=float, nargs="+", default=DEFAULT_RATES, help="target rates in Hz")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per rate")
+    parser.add_argument("--khz", type=int, default=400, help="simulated I2C clock (100 or 400)")
+    parser.add_argument("--buses", type=int, default=1, choices=range(1, len(SIM_BUS_IDS) + 1))
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two JSON results")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    sim_i2c.install(frequency=args.khz * 1000)
+    layout = attach_devices(parse_devices(args.devices), args.buses)
+    sink = UDPSink()
+
+    print(f"\nBenchmark: {args.devices} on {args.buses} bus(es) at {args.khz} kHz, {args.duration} s per rate\n")
+    runs = []
+    for rate in args.rates:
+        run = run_once(layout, rate, args.duration, sink)
+        runs.append(run)
+        print_run(run)
+    sink.close()
+
+    if args.out:
+        result = {
+            'commit': git_commit(),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': sys.version.split()[0],
+            'machine': platform.machine(),
+            'config': {'devices': args.devices, 'khz': args.khz, 'buses': args.buses,
+                       'duration': args.duration},
+            'runs': runs,
+        }
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
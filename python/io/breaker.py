@@ -0,0 +1,88 @@
+# breaker.py
+"""
+Per-peripheral circuit breakers
+Keeps one failing sensor from slowing down the others. A read that raises, or
+that takes longer than the peripheral's read budget, counts as a failure. After
+FAILURE_THRESHOLD failures in a row the breaker opens and the peripheral is no
+longer read every tick; instead it gets one probe read after MIN_BACKOFF
+seconds, then after twice as long each time it fails again (up to MAX_BACKOFF).
+The first read that succeeds closes the breaker.
+
+IOManager tells PD about both transitions:
+    /io/fault <name>
+    /io/recovered <name>
+"""
+
+FAILURE_THRESHOLD = 3   # failed reads in a row before a peripheral is skipped
+READ_BUDGET = 0.25      # seconds a read may take before it counts as failed
+MIN_BACKOFF = 0.5       # seconds until the first probe of a faulted peripheral
+MAX_BACKOFF = 30.0
+
+
+class Breaker:
+    """Failure streak and probe schedule for one peripheral."""
+
+    def __init__(self):
+        self.failures = 0       # failed reads in a row
+        self.open = False       # True while the peripheral is faulted
+        self.backoff = MIN_BACKOFF
+        self.retry_at = 0.0     # time.monotonic() of the next probe while open
+        self.budget = READ_BUDGET
+
+
+class BreakerBank:
+    """Breakers by peripheral name."""
+
+    def __init__(self, threshold=FAILURE_THRESHOLD):
+        self.threshold = threshold
+        self.breakers = {}  # name -> Breaker
+
+    def get(self, name):
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = self.breakers[name] = Breaker()
+        return breaker
+
+    def budget(self, name):
+        return self.get(name).budget
+
+    def set_budget(self, name, seconds):
+        self.get(name).budget = max(0.001, float(seconds))
+
+    def allow(self, name, now):
+        """True if 'name' should be read now: healthy, or faulted and due for a probe."""
+        breaker = self.breakers.get(name)
+        return breaker is None or not breaker.open or now >= breaker.retry_at
+
+    def success(self, name):
+        """Record a good read. Returns True if it ended a fault."""
+        breaker = self.breakers.get(name)
+        if breaker is None or not breaker.failures:
+            return False
+        recovered = breaker.open
+        breaker.failures = 0
+        breaker.open = False
+        breaker.backoff = MIN_BACKOFF
+        return recovered
+
+    def failure(self, name, now):
+        """Record a failed read. Returns True if it started a fault."""
+        breaker = self.get(name)
+        breaker.failures += 1
+        if breaker.open:
+            breaker.backoff = min(breaker.backoff * 2, MAX_BACKOFF)
+            breaker.retry_at = now + breaker.backoff
+            return False
+        if breaker.failures >= self.threshold:
+            breaker.open = True
+            breaker.backoff = MIN_BACKOFF
+            breaker.retry_at = now + breaker.backoff
+            return True
+        return False
+
+    def faulted(self, name):
+        breaker = self.breakers.get(name)
+        return breaker is not None and breaker.open
+
+    def forget(self, name):
+        self.breakers.pop(name, None)
@@ -0,0 +1,77 @@
+# buses.py
+"""
+I2C Bus Registry
+Shares one I2C handle per physical bus and gives each bus its own worker thread.
+
+Bus ids:
+    1 (default)   board.SCL / board.SDA - the Pi's main bus, or the MCP2221A
+                  USB adapter when run with BLINKA_MCP2221=1
+    <n>           /dev/i2c-<n>, e.g. 3 or 4 from the i2c-gpio overlays on a Pi 4
+
+board/busio are only imported when a bus is first opened, so importing this
+module never touches hardware.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_BUS = 1
+
+_buses = {}     # bus id -> shared I2C handle
+_workers = {}   # bus id -> single-thread executor that owns reads on that bus
+_lock = threading.Lock()
+
+
+def bus_id(bus):
+    """Normalise a bus argument (None, int, '3') to a bus id."""
+    return DEFAULT_BUS if bus is None else int(bus)
+
+
+def get_bus(bus=None):
+    """Return the shared I2C handle for a bus, opening it on first use."""
+    key = bus_id(bus)
+    with _lock:
+        if key not in _buses:
+            _buses[key] = _open(key)
+        return _buses[key]
+
+
+def _open(key):
+    if key == DEFAULT_BUS:
+        import board
+        import busio
+        return busio.I2C(board.SCL, board.SDA)
+
+    from adafruit_extended_bus import ExtendedI2C
+    return ExtendedI2C(key)
+
+
+def get_worker(bus=None):
+    """Return the worker thread (as a 1-thread executor) for a bus."""
+    key = bus_id(bus)
+    with _lock:
+        if key not in _workers:
+            _workers[key] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"i2c-{key}")
+        return _workers[key]
+
+
+def run_on_worker(bus, function, *args):
+    """Run function on a bus's worker and return its result (directly when already on that worker)."""
+    key = bus_id(bus)
+    if threading.current_thread().name.startswith(f"i2c-{key}_"):
+        return function(*args)
+    return get_worker(key).submit(function, *args).result()
+
+
+def shutdown():
+    """Stop all bus workers and release bus handles."""
+    with _lock:
+        for worker in _workers.values():
+            worker.shutdown(wait=False)
+        _workers.clear()
+        for i2c in _buses.values():
+            try:
+                i2c.deinit()
+            except Exception:
+                pass
+        _buses.clear()
@@ -0,0 +1,95 @@
+# deadband.py
+"""
+Change-only emission
+Drops peripheral messages whose values have not moved past a deadband since
+they were last sent, and periodically sends a full keyframe so late-joining
+patches can resync.
+
+Peripherals without a deadband are sent on every read, as before.
+"""
+
+import time
+
+DEFAULT_KEYFRAME_INTERVAL = 2.0  # seconds, 0 = no keyframes
+
+
+def as_values(data):
+    """Flatten what read_data() returned (list, tuple, dict or value) to a list."""
+    if isinstance(data, dict):
+        return list(data.values())
+    if isinstance(data, (list, tuple)):
+        return list(data)
+    return [data]
+
+
+class ChangeFilter:
+    """Per-peripheral, per-channel deadbands with periodic keyframes."""
+
+    def __init__(self, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.deadbands = {}   # name -> [threshold per channel]
+        self.last_sent = {}   # name -> values last sent to PD
+        self.latest = {}      # name -> values from the latest read
+        self.next_keyframe = None
+
+    def set_deadband(self, name, thresholds):
+        """
+        Set deadband thresholds for a peripheral.
+        One threshold applies to every channel; with several, the last one
+        repeats for any remaining channels. No thresholds removes the deadband.
+        """
+        if thresholds:
+            self.deadbands[name] = [abs(float(t)) for t in thresholds]
+        else:
+            self.deadbands.pop(name, None)
+        self.last_sent.pop(name, None)
+
+    def forget(self, name):
+        """Drop all state for a peripheral (e.g. when it is replaced)."""
+        self.deadbands.pop(name, None)
+        self.last_sent.pop(name, None)
+        self.latest.pop(name, None)
+
+    def filter(self, results, now=None):
+        """
+        Return the [(name, values), ...] worth sending this tick.
+        On a keyframe tick every deadbanded peripheral is included with its
+        latest values, whether or not it changed or was read this tick.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        out = []
+        for name, data in results:
+            values = as_values(data)
+            self.latest[name] = values
+            if name not in self.deadbands or self._changed(name, values):
+                out.append((name, values))
+                self.last_sent[name] = values
+
+        if self.keyframe_interval > 0 and self.deadbands:
+            if self.next_keyframe is None or now >= self.next_keyframe:
+                self.next_keyframe = now + self.keyframe_interval
+                sending = {name for name, _ in out}
+                for name in self.deadbands:
+                    if name not in sending and name in self.latest:
+                        out.append((name, self.latest[name]))
+                        self.last_sent[name] = self.latest[name]
+
+        return out
+
+    def _changed(self, name, values):
+        last = self.last_sent.get(name)
+        if last is None or len(last) != len(values):
+            return True
+
+        thresholds = self.deadbands[name]
+        for i, (value, previous) in enumerate(zip(values, last)):
+            threshold = thresholds[min(i, len(thresholds) - 1)]
+            try:
+                if abs(value - previous) > threshold:
+                    return True
+            except TypeError:
+                if value != previous:
+                    return True
+        return False
@@ -0,0 +1,215 @@
+# filters.py
+"""
+On-device filter pipelines
+Smoothing, baseline tracking and hysteresis applied to a peripheral's values
+between read_data() and the OSC send, so PD patches get clean signals without
+re-implementing them per channel. All channels of a peripheral are processed
+together as one NumPy array.
+
+A peripheral whose reads are more than one sample of plain channels says which
+values are channels with filter_channels(values) -> (head, samples, tail):
+head and tail pass through untouched (a FIFO block header, the MPR121 touch
+bitmask) and each entry of samples is one sample's channels, filtered in
+order. A LIS3DH FIFO block of n samples is n steps of the same x/y/z filters.
+
+Configured from PD with a list of stages, applied in order:
+    /touch/filter median 3 ema 0.3 baseline 0.002 20 hysteresis 12 8
+    /touch/filter              (no stages = raw values again)
+
+Stages:
+    ema <alpha>                 y += alpha * (x - y)             (0 < alpha <= 1)
+    median <n>                  median of the last n reads        (n >= 1)
+    baseline <alpha> [hold]     output x - baseline; the baseline follows x with
+                                a slow EMA, frozen on channels more than 'hold'
+                                away so a long touch is not absorbed
+    hysteresis <on> <off>       output 1.0/0.0 per channel; turns on above 'on'
+                                and off below 'off' (on < off: on below 'on',
+                                off above 'off', for falling signals)
+"""
+
+import numpy as np
+
+from deadband import as_values
+
+
+class EMA:
+    """Exponential moving average."""
+
+    def __init__(self, alpha):
+        if not 0 < alpha <= 1:
+            raise ValueError("ema alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.y = None
+
+    def __call__(self, x):
+        if self.y is None:
+            self.y = x.copy()
+        else:
+            self.y += self.alpha * (x - self.y)
+        return self.y
+
+
+class Median:
+    """Median of the last n reads, per channel."""
+
+    def __init__(self, n):
+        n = int(n)
+        if n < 1:
+            raise ValueError("median length must be >= 1")
+        self.n = n
+        self.window = None  # (n, channels) ring buffer
+        self.index = 0
+        self.filled = 0
+
+    def __call__(self, x):
+        if self.window is None:
+            self.window = np.empty((self.n, len(x)))
+        self.window[self.index] = x
+        self.index = (self.index + 1) % self.n
+        self.filled = min(self.filled + 1, self.n)
+        return np.median(self.window[:self.filled], axis=0)
+
+
+class Baseline:
+    """Slow baseline tracking with delta (x - baseline) output."""
+
+    def __init__(self, alpha, hold=None):
+        if not 0 < alpha <= 1:
+            raise ValueError("baseline alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.hold = abs(hold) if hold is not None else None
+        self.baseline = None
+
+    def __call__(self, x):
+        if self.baseline is None:
+            self.baseline = x.copy()
+        delta = x - self.baseline
+        if self.hold is None:
+            self.baseline += self.alpha * delta
+        else:
+            self.baseline += np.where(np.abs(delta) > self.hold, 0.0, self.alpha * delta)
+        return delta
+
+
+class Hysteresis:
+    """Per-channel on/off state with separate on and off thresholds."""
+
+    def __init__(self, on, off):
+        self.on = on
+        self.off = off
+        self.state = None
+
+    def __call__(self, x):
+        if self.state is None:
+            self.state = np.zeros(len(x), dtype=bool)
+        if self.on >= self.off:
+            self.state = np.where(self.state, x >= self.off, x > self.on)
+        else:
+            self.state = np.where(self.state, x <= self.off, x < self.on)
+        return self.state.astype(float)
+
+
+STAGES = {
+    'ema': (EMA, 1, 1),                 # class, min args, max args
+    'median': (Median, 1, 1),
+    'baseline': (Baseline, 1, 2),
+    'hysteresis': (Hysteresis, 2, 2),
+}
+
+
+def parse_stages(args):
+    """
+    Build stages from ['median', 3, 'ema', 0.3, ...].
+    Raises ValueError on unknown stages or wrong argument counts.
+    """
+    stages = []
+    i = 0
+    while i < len(args):
+        kind = str(args[i])
+        if kind not in STAGES:
+            raise ValueError(f"unknown filter stage '{kind}', choose from {list(STAGES)}")
+        params = []
+        i += 1
+        while i < len(args) and str(args[i]) not in STAGES:
+            params.append(float(args[i]))
+            i += 1
+        stage_class, least, most = STAGES[kind]
+        if not least <= len(params) <= most:
+            expected = least if least == most else f"{least}-{most}"
+            raise ValueError(f"{kind} takes {expected} number(s), got {len(params)}")
+        stages.append((kind, params, stage_class(*params)))
+    return stages
+
+
+def split_channels(peripheral, values):
+    """(head, samples, tail) for a read, see filter_channels() above."""
+    split = getattr(peripheral, 'filter_channels', None)
+    return split(values) if split is not None else ([], [values], [])
+
+
+class Pipeline:
+    """Stages for one peripheral; state restarts if the channels per sample change."""
+
+    def __init__(self, stages):
+        self.stages = stages
+        self.channels = None
+
+    def __call__(self, values):
+        """Filter one sample's channels."""
+        x = np.asarray(values, dtype=float)
+        if self.channels != len(x):
+            if self.channels is not None:
+                self.stages = parse_stages(self.describe())
+            self.channels = len(x)
+        for _, _, stage in self.stages:
+            x = stage(x)
+        return x.tolist()  # Python floats, so OSC sends them as 'f'
+
+    def describe(self):
+        """The stage list as it was configured, e.g. ['ema', 0.3]."""
+        out = []
+        for kind, params, _ in self.stages:
+            out.append(kind)
+            out.extend(params)
+        return out
+
+
+class FilterBank:
+    """Filter pipelines by peripheral name."""
+
+    def __init__(self):
+        self.pipelines = {}  # name -> Pipeline
+
+    def set_filter(self, name, args):
+        """Configure a peripheral's pipeline from a stage list; no stages removes it."""
+        stages = parse_stages(args)
+        if stages:
+            self.pipelines[name] = Pipeline(stages)
+        else:
+            self.pipelines.pop(name, None)
+
+    def describe(self, name):
+        pipeline = self.pipelines.get(name)
+        return pipeline.describe() if pipeline else 'off'
+
+    def forget(self, name):
+        self.pipelines.pop(name, None)
+
+    def apply(self, results, peripherals=None):
+        """
+        Filter [(name, values), ...]; peripherals without a pipeline pass through.
+        'peripherals' (name -> peripheral) tells the channels apart from other values.
+        """
+        if not self.pipelines:
+            return results
+        out = []
+        for name, values in results:
+            pipeline = self.pipelines.get(name)
+            if pipeline is not None:
+                try:
+                    head, samples, tail = split_channels((peripherals or {}).get(name), as_values(values))
+                    values = head + [v for sample in samples for v in pipeline(sample)] + tail
+                except (TypeError, ValueError) as e:
+                    print(f"Error filtering {name}, sending raw values: {e}")
+            out.append((name, values))
+        return out
@@ -0,0 +1,115 @@
+# gpio.py
+"""
+GPIO edge sources for interrupt-driven peripherals
+Watches an active-low interrupt line (e.g. the MPR121 IRQ output) and
+calls back on every falling edge. On a Pi this uses gpiozero, which runs the
+callback on its own thread. For tests and the simulator a FakeEdge can stand in
+for any pin and be fired from code.
+
+Pins use BCM numbering (GPIO17 = 17).
+
+Usage:
+    edge = gpio.watch_falling(17, on_irq)
+    ...
+    edge.close()                # the pin is released with its last watcher
+
+    fake = gpio.fake_edge(17)   # before watch_falling(17, ...) is called
+    fake.fire()                 # calls on_irq()
+"""
+
+_fakes = {}  # pin -> FakeEdge
+_lines = {}  # pin -> GpioZeroEdge currently open
+
+
+class _Line:
+    """
+    One interrupt line and its watchers. A pin can be watched twice while a
+    peripheral is replaced by a new one on the same IRQ line; edges go to the
+    newest watcher and the line stays open until the last one closes.
+    """
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.callbacks = []
+
+    @property
+    def callback(self):
+        return self.callbacks[-1] if self.callbacks else None
+
+    def watch(self, callback):
+        watch = _Watch(self, callback)
+        self.callbacks.append(watch)
+        return watch
+
+    def _fire(self):
+        callback = self.callback
+        if callback is not None:
+            callback()
+
+    def _closed(self, watch):
+        if watch in self.callbacks:
+            self.callbacks.remove(watch)
+        if not self.callbacks:
+            self.release()
+
+    def release(self):
+        pass
+
+
+class _Watch:
+    """Handle returned by watch_falling(); close() stops the callbacks."""
+
+    def __init__(self, line, callback):
+        self.line = line
+        self.pin = line.pin
+        self.function = callback
+
+    def __call__(self):
+        self.function()
+
+    def close(self):
+        self.line._closed(self)
+
+
+class FakeEdge(_Line):
+    """Stand-in interrupt line fired from code."""
+
+    def __init__(self, pin):
+        super().__init__(pin)
+        self.fired = 0
+
+    def fire(self):
+        """Simulate a falling edge."""
+        self.fired += 1
+        self._fire()
+
+
+class GpioZeroEdge(_Line):
+    """Falling-edge watcher on a real pin, pulled up (for open-drain IRQ lines)."""
+
+    def __init__(self, pin):
+        from gpiozero import DigitalInputDevice
+        super().__init__(pin)
+        self.device = DigitalInputDevice(pin, pull_up=True)
+        self.device.when_activated = self._fire  # pulled up: active = low
+
+    def release(self):
+        _lines.pop(self.pin, None)
+        self.device.close()
+
+
+def fake_edge(pin):
+    """Replace a pin with a FakeEdge for every later watch_falling() call."""
+    pin = int(pin)
+    if pin not in _fakes:
+        _fakes[pin] = FakeEdge(pin)
+    return _fakes[pin]
+
+
+def watch_falling(pin, callback):
+    """Call callback() on every falling edge of a GPIO. Returns an object with .close()."""
+    pin = int(pin)
+    line = _fakes.get(pin) or _lines.get(pin)
+    if line is None:
+        line = _lines[pin] = GpioZeroEdge(pin)
+    return line.watch(callback)
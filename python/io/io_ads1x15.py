@@ -0,0 +1,193 @@
+# io_ads1x15.py
+"""
+ADS1x15 Analog-to-Digital Converter (shared by io_ads1015 and io_ads1115)
+Reads 4 analog channels (A0-A3) and returns voltages
+
+Conversion modes:
+    single      Each read converts all 4 channels one after another and waits
+                for every conversion (default, the original behaviour)
+    continuous  The chip converts one channel back-to-back; each read is a
+                single register fetch with no waiting
+    scan        Pipelined round-robin: each read collects the channel that has
+                finished converting and starts the next one, so a read never
+                waits on a conversion. One channel is refreshed per read, so
+                set the peripheral rate to 4x the per-channel rate you want.
+
+In scan mode the ALERT/RDY pin can be wired to a GPIO and used to tell when a
+conversion is ready; without it readiness is inferred from the data rate.
+"""
+
+import time
+from buses import get_bus
+import adafruit_ads1x15.ads1x15 as ADS
+from adafruit_ads1x15.analog_in import AnalogIn
+
+# Registers and config bits (see ADS1115 datasheet, section 9.6)
+_CONVERSION = 0x00
+_CONFIG     = 0x01
+_LO_THRESH  = 0x02
+_HI_THRESH  = 0x03
+_OS_START   = 0x8000
+_MUX_SINGLE = 0x4000   # AINx vs GND, channel in bits 12-13
+_MODE_SINGLE = 0x0100
+_COMP_QUE_DISABLE = 0x0003
+_COMP_QUE_ONE = 0x0000   # ALERT/RDY asserts after every conversion
+
+# Full-scale range in volts for each PGA gain
+PGA_RANGE = {2 / 3: 6.144, 1: 4.096, 2: 2.048, 4: 1.024, 8: 0.512, 16: 0.256}
+PGA_BITS = {2 / 3: 0x0000, 1: 0x0200, 2: 0x0400, 4: 0x0600, 8: 0x0800, 16: 0x0A00}
+
+MODES = ('single', 'continuous', 'scan')
+
+
+class IO_ADS1x15:
+    """4-channel ADS1x15 ADC. Subclasses set 'chip' to the Adafruit driver class."""
+
+    chip = None
+
+    def __init__(self, bus=None, address=0x48):
+        self.bus = bus
+        self.address = address
+        self.name = "adc"
+        self.ads = None
+        self.channels = []
+        self.mode = 'single'
+        self.channel = 0           # continuous mode: the channel being converted
+        self.values = [0.0] * 4    # last voltage per channel
+        self.rdy = None            # ALERT/RDY input (digitalio), scan mode only
+        self._next = 0             # scan mode: channel whose conversion is in flight
+        self._started = None       # scan mode: when that conversion began
+
+    def setup(self):
+        """Initialize the ADC hardware."""
+        i2c = get_bus(self.bus)
+        self.ads = self.chip(i2c, address=self.address)
+
+        # Create 4 analog input channels
+        self.channels = [
+            AnalogIn(self.ads, ADS.Pin.A0),
+            AnalogIn(self.ads, ADS.Pin.A1),
+            AnalogIn(self.ads, ADS.Pin.A2),
+            AnalogIn(self.ads, ADS.Pin.A3)
+        ]
+
+        print(f"  {self.name}: 4-channel ADC ready")
+
+    def read_data(self):
+        """
+        Read all 4 channels.
+        Returns: [ch0, ch1, ch2, ch3] in volts (0.0-3.3V)
+        In continuous and scan modes channels that were not converted this
+        read keep their last value.
+        """
+        if self.mode == 'continuous':
+            self.values[self.channel] = self._to_volts(self.ads.get_last_result())
+            return list(self.values)
+        if self.mode == 'scan':
+            return self._scan_step()
+        return [ch.voltage for ch in self.channels]
+
+    def _scan_step(self):
+        """Collect the finished conversion (if any) and start the next channel."""
+        if self._started is not None:
+            if not self._conversion_ready():
+                return list(self.values)  # still converting - never wait
+            self.values[self._next] = self._to_volts(self.ads._read_register(_CONVERSION))
+            self._next = (self._next + 1) % 4
+
+        self.ads._write_register(_CONFIG, self._config(self._next))
+        self._started = time.monotonic()
+        return list(self.values)
+
+    def _conversion_ready(self):
+        if self.rdy is not None:
+            return not self.rdy.value  # ALERT/RDY is pulled low when ready
+        # Oscillator is +/-10%, allow a margin on the nominal conversion time
+        return time.monotonic() - self._started >= 1.1 / self.ads.data_rate + 0.00005
+
+    def _config(self, channel):
+        """Config word that starts a single-shot conversion on a channel."""
+        config = _OS_START | _MUX_SINGLE | (channel << 12) | _MODE_SINGLE
+        config |= PGA_BITS[self.ads.gain]
+        config |= self.ads.rate_config[self.ads.data_rate]
+        config |= _COMP_QUE_ONE if self.rdy is not None else _COMP_QUE_DISABLE
+        return config
+
+    def _to_volts(self, raw):
+        """Convert a raw conversion register value to volts (ADS1015 data is left-justified)."""
+        if raw & 0x8000:
+            raw -= 1 << 16
+        return raw * PGA_RANGE[self.ads.gain] / 32768
+
+    def set_mode(self, mode, channel=0):
+        """Switch conversion mode; 'channel' selects the continuous-mode channel."""
+        self.mode = mode
+        self._started = None
+        if mode == 'continuous':
+            self.channel = channel
+            self.ads.mode = ADS.Mode.CONTINUOUS
+            self.ads.read(channel + 0x04)  # start converting (single-ended mux)
+        else:
+            self.ads.mode = ADS.Mode.SINGLE
+
+    def set_rdy_pin(self, gpio):
+        """Use ALERT/RDY on a GPIO (BCM number) as the conversion-ready signal; 0 disables."""
+        if self.rdy is not None:
+            self.rdy.deinit()
+            self.rdy = None
+        if gpio:
+            import board
+            import digitalio
+            self.rdy = digitalio.DigitalInOut(getattr(board, f"D{gpio}"))
+            self.rdy.direction = digitalio.Direction.INPUT
+            self.rdy.pull = digitalio.Pull.UP
+            # Hi_thresh MSB = 1, Lo_thresh MSB = 0 turns ALERT into a ready signal
+            self.ads._write_register(_HI_THRESH, 0x8000)
+            self.ads._write_register(_LO_THRESH, 0x0000)
+        self._started = None
+
+    def write_data(self, **kwargs):
+        """
+        Configure the ADC.
+        Expects kwargs['command'] and kwargs['args']
+
+        Commands:
+            gain: Set PGA gain (full-scale range)
+                args: [2/3 | 1 | 2 | 4 | 8 | 16]
+            datarate: Set conversions per second
+                args: [rate] (ADS1015: 128-3300, ADS1115: 8-860)
+            mode: Set conversion mode
+                args: ['single' | 'scan'] or ['continuous', channel (0-3)]
+            rdy: Use the ALERT/RDY pin in scan mode
+                args: [gpio (BCM number, 0 = off)]
+        """
+        command = kwargs.get('command', '').lower()
+        args = kwargs.get('args', [])
+
+        if command == 'gain' and len(args) >= 1:
+            gain = float(args[0])
+            gain = 2 / 3 if abs(gain - 2 / 3) < 0.01 else int(gain)
+            self.ads.gain = gain
+            print(f"  {self.name}: gain set to {gain} (+/-{PGA_RANGE[gain]} V)")
+        elif command == 'datarate' and len(args) >= 1:
+            self.ads.data_rate = int(args[0])
+            print(f"  {self.name}: data rate set to {self.ads.data_rate} SPS")
+        elif command == 'mode' and len(args) >= 1 and str(args[0]) in MODES:
+            channel = int(args[1]) if len(args) >= 2 else 0
+            if not 0 <= channel < len(self.values):
+                print(f"  {self.name}: channel {channel} out of range (0-{len(self.values) - 1}), mode unchanged")
+                return
+            self.set_mode(str(args[0]), channel)
+            print(f"  {self.name}: mode set to {self.mode}")
+        elif command == 'rdy' and len(args) >= 1:
+            self.set_rdy_pin(int(args[0]))
+            print(f"  {self.name}: ALERT/RDY {'on GPIO ' + str(int(args[0])) if self.rdy else 'off'}")
+        else:
+            print(f"  {self.name}: Unknown or malformed command '{command}' with args {args}")
+
+    def cleanup(self):
+        """Cleanup on shutdown."""
+        if self.ads is not None and self.mode == 'continuous':
+            self.ads.mode = ADS.Mode.SINGLE  # stop converting
+        if self.rdy is not None:
+            self.rdy.deinit()
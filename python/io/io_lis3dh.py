@@ -2,39 +2,221 @@
 """
 LIS3DH 3-Axis Accelerometer
 Reads tilt/acceleration in x, y, z axes
-default address: 0x19 
+default address: 0x19
+
+FIFO mode (/<name>/fifo <hz>) runs the chip's 32-sample FIFO in stream mode at
+the chosen output data rate and drains it with one burst read per tick, so
+every sample reaches PD as part of a timestamped block:
+    /tilt <index> <n> <dt_ms> <age_ms> x0 y0 z0 x1 y1 z1 ...
+index  running number of the first sample (gaps = samples lost to overrun)
+n      samples in this block
+dt_ms  sample period
+age_ms how long before the read the first sample was taken
+Values are angles in degrees or acceleration in g (/<name>/output). With
+/<name>/blob 1 the samples are one OSC blob of big-endian float32 instead.
+Poll at least at <hz> / 32 (e.g. 25 Hz for 400 Hz) or the FIFO overruns.
 """
 
+import time
+
+import numpy as np
+
 from PiicoDev_LIS3DH import PiicoDev_LIS3DH
+from buses import bus_id
+
+# Registers (LIS3DH datasheet)
+_CTRL_REG1 = 0x20   # ODR[7:4], LPen, Z/Y/X enable
+_CTRL_REG4 = 0x23   # BDU, BLE, FS[5:4], HR
+_CTRL_REG5 = 0x24   # FIFO_EN = bit 6
+_OUT_X_L = 0x28     # 6 bytes x/y/z; in FIFO mode a burst read wraps here and pops the next sample
+_FIFO_CTRL = 0x2E   # FM[7:6]: 00 bypass, 10 stream
+_FIFO_SRC = 0x2F    # OVRN = bit 6, FSS[4:0] = unread samples
+_AUTO_INCREMENT = 0x80
+_FIFO_SIZE = 32
+
+# Output data rates in high-resolution mode: Hz -> ODR code
+ODR_CODES = {1: 0x1, 10: 0x2, 25: 0x3, 50: 0x4, 100: 0x5, 200: 0x6, 400: 0x7, 1344: 0x9}
+# Full scale in g -> (FS bits, mg per 12-bit digit)
+RANGES = {2: (0, 1), 4: (1, 2), 8: (2, 4), 16: (3, 12)}
+OUTPUTS = ('angle', 'accel')
+
+
+def angles(x, y, z):
+    """Tilt angles in degrees, the same convention as PiicoDev_LIS3DH.angle (works on arrays)."""
+    return (np.degrees(np.arctan2(y, z)),
+            np.degrees(np.arctan2(z, x)),
+            np.degrees(np.arctan2(x, y)))
+
 
 class IO_LIS3DH:
     """LIS3DH accelerometer - outputs x, y, z acceleration in g-forces."""
-    
-    def __init__(self, bus=None, address=None):
+
+    def __init__(self, bus=None, address=None, fifo=None, output='angle', range=2):
+        self.bus = bus
+        self.address = address or 0x19
         self.name = "tilt"
         self.motion = None
-    
+        self.output = str(output) if str(output) in OUTPUTS else 'angle'
+        self.range = int(range) if int(range) in RANGES else 2
+        self.blob = False              # FIFO blocks as one float32 blob
+        self.fifo_rate = None          # Hz when FIFO streaming is on
+        self._fifo_request = float(fifo) if fifo else None
+        self._sample_index = 0         # running number of the next FIFO sample
+        self._next_sample_time = None  # monotonic time of the next FIFO sample
+        self.overruns = 0
+
     def setup(self):
-        """Initialize the LIS3DH hardware."""
-        self.motion = PiicoDev_LIS3DH()
+        """Initialize the LIS3DH hardware (PiicoDev opens its own handle on the bus)."""
+        self.motion = PiicoDev_LIS3DH(bus=bus_id(self.bus), address=self.address)
         print(f"  {self.name}: 3-axis accelerometer ready")
-    
+        if self._fifo_request:
+            self.start_fifo(self._fifo_request)
+
     def read_data(self):
         """
         Read angle on all 3 axes.
-        Returns: [x, y, z] in degrees
+        Returns: [x, y, z] in degrees (or g with output 'accel'),
+        or a timestamped FIFO block in FIFO mode (None if the FIFO was empty)
         """
+        if self.fifo_rate:
+            return self.read_fifo()
+        if self.output == 'accel':
+            return self._read_accel()
+
         angle = self.motion.angle # This returns a tuple: (x, y, z)
         return [
             angle[0],
             angle[1],
             angle[2]
         ]
-    
+
+    # --- Registers ---
+    def _write(self, register, value):
+        self.motion.i2c.writeto_mem(self.address, register, bytes([value]))
+
+    def _read(self, register, n):
+        # PiicoDev_Unified returns a list of ints on Linux; bytes() as its bytestring=True does
+        return bytes(self.motion.i2c.readfrom_mem(self.address, register | _AUTO_INCREMENT, n))
+
+    def _scale(self):
+        """g per raw 16-bit count (12-bit left-justified data)."""
+        return RANGES[self.range][1] / 1000.0 / 16
+
+    def _read_accel(self):
+        xyz = np.frombuffer(self._read(_OUT_X_L, 6), dtype='<i2') * self._scale()
+        return xyz.tolist()
+
+    # --- FIFO ---
+    def start_fifo(self, rate):
+        """Stream the FIFO at the lowest supported ODR >= rate (Hz)."""
+        hz = min((r for r in ODR_CODES if r >= rate), default=max(ODR_CODES))
+        fs_bits = RANGES[self.range][0]
+        self._write(_CTRL_REG1, ODR_CODES[hz] << 4 | 0x07)   # ODR, normal power, XYZ on
+        self._write(_CTRL_REG4, 0x88 | fs_bits << 4)          # BDU, high resolution, range
+        self._write(_CTRL_REG5, 0x40)                         # FIFO enable
+        self._write(_FIFO_CTRL, 0x00)                         # bypass clears the FIFO
+        self._write(_FIFO_CTRL, 0x80)                         # stream mode
+        self.fifo_rate = hz
+        self._next_sample_time = None
+        print(f"  {self.name}: FIFO streaming at {hz} Hz")
+
+    def stop_fifo(self):
+        if self.motion is not None:
+            self._write(_FIFO_CTRL, 0x00)
+            self._write(_CTRL_REG5, 0x00)
+            self._write(_CTRL_REG1, ODR_CODES[400] << 4 | 0x07)
+            self._write(_CTRL_REG4, 0x88 | RANGES[self.range][0] << 4)
+        self.fifo_rate = None
+
+    def read_fifo(self):
+        """
+        Drain the FIFO: one status read plus one burst read of every waiting sample.
+        Returns: [index, n, dt_ms, age_ms, x0, y0, z0, ...] or None if empty
+        """
+        status = self._read(_FIFO_SRC, 1)[0]
+        now = time.monotonic()
+        overrun = bool(status & 0x40)
+        n = _FIFO_SIZE if overrun else status & 0x1F
+        if n == 0:
+            return None
+
+        samples = np.frombuffer(self._read(_OUT_X_L, 6 * n), dtype='<i2').reshape(n, 3)
+        samples = samples * self._scale()
+
+        # Sample clock: continue from the last block, resync if it drifted
+        dt = 1.0 / self.fifo_rate
+        estimate = now - (n - 0.5) * dt  # newest sample is on average half a period old
+        expected = self._next_sample_time
+        first = expected
+        if expected is None or overrun or abs(expected - estimate) > 2 * dt:
+            first = estimate
+        if overrun:
+            # Stream mode overwrote the oldest samples: skip the index past them
+            if expected is not None:
+                self._sample_index += max(1, round((estimate - expected) / dt))
+            self.overruns += 1
+            if self.overruns == 1 or self.overruns % 100 == 0:
+                print(f"  {self.name}: FIFO overrun ({self.overruns}), poll faster than {self.fifo_rate / _FIFO_SIZE:.1f} Hz")
+        index = self._sample_index
+        self._sample_index += n
+        self._next_sample_time = first + n * dt
+
+        if self.output == 'angle':
+            samples = np.column_stack(angles(samples[:, 0], samples[:, 1], samples[:, 2]))
+        header = [index, n, round(dt * 1000, 3), round((now - first) * 1000, 3)]
+        if self.blob:
+            return header + [samples.astype('>f4').tobytes()]
+        return header + samples.ravel().tolist()
+
+    def filter_channels(self, values):
+        """Filters see x, y, z per sample; a FIFO header passes through and a blob is not filtered."""
+        if len(values) == 3:
+            return [], [values], []
+        if any(isinstance(value, bytes) for value in values):
+            return values, [], []
+        return values[:4], [values[i:i + 3] for i in range(4, len(values), 3)], []
+
     def write_data(self, **kwargs):
-        """Accelerometer is read-only."""
-        pass
-    
+        """
+        Configure the accelerometer.
+        Expects kwargs['command'] and kwargs['args']
+
+        Commands:
+            fifo: Stream the 32-sample FIFO at an output data rate
+                args: [hz (1-1344), 0 = off]
+            output: Values sent per sample
+                args: ['angle' | 'accel']
+            range: Full scale
+                args: [2 | 4 | 8 | 16] (g)
+            blob: FIFO samples as one float32 blob instead of separate floats
+                args: [0 | 1]
+        """
+        command = kwargs.get('command', '').lower()
+        args = kwargs.get('args', [])
+
+        if command == 'fifo' and len(args) >= 1:
+            if float(args[0]) > 0:
+                self.start_fifo(float(args[0]))
+            else:
+                self.stop_fifo()
+                print(f"  {self.name}: FIFO off")
+        elif command == 'output' and len(args) >= 1 and str(args[0]) in OUTPUTS:
+            self.output = str(args[0])
+            print(f"  {self.name}: output set to {self.output}")
+        elif command == 'range' and len(args) >= 1 and int(args[0]) in RANGES:
+            self.range = int(args[0])
+            self._write(_CTRL_REG4, 0x88 | RANGES[self.range][0] << 4)
+            print(f"  {self.name}: range set to +/-{self.range} g")
+        elif command == 'blob' and len(args) >= 1:
+            self.blob = bool(int(args[0]))
+            print(f"  {self.name}: FIFO blob {'on' if self.blob else 'off'}")
+        else:
+            print(f"  {self.name}: Unknown or malformed command '{command}' with args {args}")
+
     def cleanup(self):
         """Cleanup on shutdown."""
-        pass
+        if self.fifo_rate:
+            try:
+                self.stop_fifo()
+            except Exception:
+                pass
@@ -15,10 +15,19 @@ VDD via 10kΩ      | 0x5F
 SDA via 10kΩ      | 0x60
 SCL via 10kΩ      | 0x61
 
+Event mode: wire IRQ to a GPIO and create with `irq <gpio>`. Each falling edge
+triggers an immediate touch-status read on the bus worker, and /<name>/on <n> or
+/<name>/off <n> goes to PD straight away, separate from the periodic stream.
+Polled reads also pick up the touch status, so a missed edge is caught on the
+next read.
+
 """
 
-import board
-import busio
+import struct
+import threading
+import buses
+from buses import get_bus
+import gpio
 import adafruit_mpr121
 
 class IO_MPR121:
@@ -32,25 +41,111 @@ class IO_MPR121:
     _SFI_BASE = 0x5F   # Second Filter Iteration, per electrode (E0_SFI ... E11_SFI)
     _ESI      = 0x5B   # Electrode Sample Interval (global)
     
-    def __init__(self, bus=None, address=0x5A):
+    # --- Block read layout (registers auto-increment on read) ---
+    _TOUCH_STATUS  = 0x00   # 2 bytes, bits 0-11 = electrodes touched
+    _FILTERED_BASE = 0x04   # 2 bytes per electrode, little-endian 10-bit
+    _BASELINE_BASE = 0x1E   # 1 byte per electrode, baseline >> 2
+    _FILTERED = struct.Struct('<12H')
+    
+    # Output modes: which values read_data() returns for the 12 electrodes
+    OUTPUTS = ('filtered', 'baseline', 'delta')
+    
+    def __init__(self, bus=None, address=0x5A, irq=None):
+        self.bus = bus
         self.address = address
         self.name = "touch"
         self.mpr121 = None
         self.num_electrodes = 12
+        self.output = 'filtered'
+        self.append_touched = False   # append the 12-bit touch status bitmask
+        self._block = bytearray(self._BASELINE_BASE + 12)
+        self._span = (self._FILTERED_BASE, self._FILTERED_BASE + 24)
+        
+        # Event mode
+        self.irq_pin = int(irq) if irq is not None else None
+        self.irq = None               # edge watcher from gpio.py
+        self.emit = None              # emit(address, values), set by IOManager
+        self._status = 0              # last touch status bitmask seen
+        self._status_buffer = bytearray(2)
+        self._status_lock = threading.Lock()
     
     def setup(self):
         """Initialize the MPR121 hardware."""
-        i2c = busio.I2C(board.SCL, board.SDA)
+        i2c = get_bus(self.bus)
         self.mpr121 = adafruit_mpr121.MPR121(i2c, address=self.address)
-        print(f"  {self.name}: 12-channel capacitive touch ready")
+        if self.irq_pin is not None:
+            self._update_span()
+            self.irq = gpio.watch_falling(self.irq_pin, self._on_irq)
+            print(f"  {self.name}: 12-channel capacitive touch ready (IRQ on GPIO {self.irq_pin})")
+        else:
+            print(f"  {self.name}: 12-channel capacitive touch ready")
     
     def read_data(self):
         """
-        Read filtered capacitance from all 12 electrodes.
+        Read all 12 electrodes in a single auto-increment block read.
         Returns: [ch0, ch1, ch2, ..., ch11] values 0-1023
-        Higher values = more capacitance/closer proximity
+            filtered: filtered capacitance (default)
+            baseline: the chip's tracked baseline
+            delta:    baseline - filtered, rises on touch
+        followed by the touch status bitmask if 'touched' is enabled.
         """
-        return [self.mpr121.filtered_data(i) for i in range(self.num_electrodes)]
+        start, end = self._span
+        self.mpr121._read_register_bytes(start, memoryview(self._block)[start:end])
+        block = self._block
+        
+        if self.output == 'baseline':
+            values = [b << 2 for b in block[self._BASELINE_BASE:self._BASELINE_BASE + 12]]
+        else:
+            values = [v & 0x3FF for v in self._FILTERED.unpack_from(block, self._FILTERED_BASE)]
+            if self.output == 'delta':
+                baseline = block[self._BASELINE_BASE:self._BASELINE_BASE + 12]
+                values = [(b << 2) - v for b, v in zip(baseline, values)]
+        
+        status = (block[0] | block[1] << 8) & 0x0FFF
+        if self.irq is not None:
+            self._touch_status(status)
+        if self.append_touched:
+            values.append(status)
+        return values
+    
+    def _on_irq(self):
+        """IRQ edge (gpio thread): queue a status read behind the bus's current transaction."""
+        buses.get_worker(self.bus).submit(self._read_touch_status)
+    
+    def _read_touch_status(self):
+        try:
+            self.mpr121._read_register_bytes(self._TOUCH_STATUS, self._status_buffer)
+            self._touch_status((self._status_buffer[0] | self._status_buffer[1] << 8) & 0x0FFF)
+        except Exception as e:
+            print(f"  {self.name}: IRQ status read failed: {e}")
+    
+    def _touch_status(self, status):
+        """Emit /<name>/on and /<name>/off for every electrode whose touch state changed."""
+        with self._status_lock:
+            changed = status ^ self._status
+            self._status = status
+        if not changed or self.emit is None:
+            return
+        for electrode in range(self.num_electrodes):
+            if changed & (1 << electrode):
+                state = 'on' if status & (1 << electrode) else 'off'
+                self.emit(f"/{self.name}/{state}", [electrode])
+    
+    def _update_span(self):
+        """Work out the smallest register range covering the current output."""
+        if self.output == 'filtered':
+            start, end = self._FILTERED_BASE, self._FILTERED_BASE + 24
+        elif self.output == 'baseline':
+            start, end = self._BASELINE_BASE, self._BASELINE_BASE + 12
+        else:
+            start, end = self._FILTERED_BASE, self._BASELINE_BASE + 12
+        if self.append_touched or self.irq_pin is not None:
+            start = self._TOUCH_STATUS
+        self._span = (start, end)
+    
+    def filter_channels(self, values):
+        """Filters smooth the 12 electrodes; the touch bitmask passes through as an int."""
+        return [], [values[:12]], values[12:]
     
     def write_data(self, **kwargs):
         """
@@ -70,6 +165,10 @@ class IO_MPR121:
                 args: [electrode (0-11), value (0-255)]
             esi: Set global electrode sample interval
                 args: [value (0-255)]
+            output: Choose the values returned each read
+                args: ['filtered' | 'baseline' | 'delta']
+            touched: Append the touch status bitmask to each read
+                args: [0 | 1]
         """
         command = kwargs.get('command', '').lower()
         args = kwargs.get('args', [])
@@ -103,6 +202,14 @@ class IO_MPR121:
             value = int(args[0])
             self.set_electrode_sample_interval(value)
             print(f"  {self.name}: ESI set to {value}")
+        elif command == 'output' and len(args) >= 1 and str(args[0]) in self.OUTPUTS:
+            self.output = str(args[0])
+            self._update_span()
+            print(f"  {self.name}: output set to {self.output}")
+        elif command == 'touched' and len(args) >= 1:
+            self.append_touched = bool(int(args[0]))
+            self._update_span()
+            print(f"  {self.name}: touch bitmask {'on' if self.append_touched else 'off'}")
         else:
             print(f"  {self.name}: Unknown or malformed command '{command}' with args {args}")
 
@@ -141,4 +248,6 @@ class IO_MPR121:
 
     def cleanup(self):
         """Cleanup on shutdown."""
-        pass
+        if self.irq is not None:
+            self.irq.close()
+            self.irq = None
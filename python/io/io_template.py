@@ -15,9 +15,10 @@ class PeripheralTemplate:
     def __init__(self, bus=None, address=0x00):
         """
         Args:
-            bus: Not used (kept for compatibility)
+            bus: I2C bus id from /create (None = default bus, see buses.py)
             address: I2C address of your device
         """
+        self.bus = bus
         self.address = address
         self.name = "mydevice"  # Used in OSC paths: /mydevice/data
         
@@ -34,11 +35,10 @@ class PeripheralTemplate:
         - Perform calibration
         """
         # Example using Adafruit library:
-        # import board
-        # import busio
+        # from buses import get_bus
         # import adafruit_yourdevice
         # 
-        # i2c = busio.I2C(board.SCL, board.SDA)
+        # i2c = get_bus(self.bus)  # shared handle for this bus
         # self.device = adafruit_yourdevice.YourDevice(i2c, address=self.address)
         
         print(f"  {self.name}: initialized at 0x{self.address:02X}")
@@ -52,6 +52,7 @@ class PeripheralTemplate:
             - A list/tuple: [value1, value2, value3]
             - A dict: {"temperature": 25.3, "humidity": 60}
             - A single value: 123
+            - None: nothing new this tick, nothing is sent
         
         The data will be sent to PD as: /mydevice/data [values...]
         """
@@ -107,18 +108,18 @@ class PeripheralTemplate:
 # EXAMPLE: Temperature Sensor
 # ============================================================
 # 
-# import board
-# import busio
+# from buses import get_bus
 # import adafruit_tmp102
 # 
 # class Temperature:
 #     def __init__(self, bus=None, address=0x48):
+#         self.bus = bus
 #         self.address = address
 #         self.name = "temp"
 #         self.sensor = None
 #     
 #     def setup(self):
-#         i2c = busio.I2C(board.SCL, board.SDA)
+#         i2c = get_bus(self.bus)
 #         self.sensor = adafruit_tmp102.TMP102(i2c, address=self.address)
 #         print(f"  {self.name}: temperature sensor ready")
 #     
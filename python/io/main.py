@@ -7,12 +7,27 @@ Simple interface between I2C sensors and Pure Data via OSC
 import time
 import threading
 import signal
+import socket
+import concurrent.futures
+import queue
 from pyOSC3 import OSCClient, OSCMessage, OSCBundle, OSCServer
+from scheduler import DeadlineScheduler, MAX_SLEEP
+import buses
+from deadband import ChangeFilter
+from filters import FilterBank
+from stats import IOStats
+from breaker import BreakerBank
+from osc_encoder import BundleEncoder
+from scan import ScanCache, DEFAULT_NAMES
+from subscribers import Subscribers
 
 # Settings
 PYTHON_PORT = 8880      # This script listens here for commands from Pure Data
 PD_PORT = 6662          # Pure Data listens here for messages from this script
 DEFAULT_POLL_RATE = 10  # Hz
+MISSED_REPORT_INTERVAL = 5.0  # seconds between missed-deadline summaries
+TELEMETRY_ADDRESS = ("255.255.255.255", 5550)  # fleet monitor / dashboards
+TELEMETRY_INTERVAL = 10.0  # seconds between /telemetry broadcasts, 0 = off
 
 # Available peripheral types
 PERIPHERAL_TYPES = {
@@ -22,17 +37,57 @@ PERIPHERAL_TYPES = {
     'mpr121': ('io_mpr121', 'IO_MPR121'), # 12-channel capacitive touch sensor
 }
 
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
 class IOManager:
-    def __init__(self):
+    def __init__(self, pd_address=("127.0.0.1", PD_PORT)):
         self.peripherals = {}  # name -> peripheral instance
         self.poll_rate = DEFAULT_POLL_RATE
+        self.scheduler = DeadlineScheduler(self.poll_rate)
+        self.filters = FilterBank()
+        self.changes = ChangeFilter()
+        self.stats = IOStats()
+        self.breakers = BreakerBank()
+        self.busy = {}  # bus id -> future of a read still running past its budget
+        self.bus_ids = set()  # buses with at least one peripheral
+        self.bus_names = {}  # bus id -> (peripheral names on that bus)
+        self.reading = {}  # bus id -> [name being read, failure already counted]
+        self.read_lock = threading.Lock()
+        self.bus_threads = {}  # bus id -> thread running poll_bus (sync mode)
+        self.outbox = queue.Queue()  # (tick, results) from the bus loops to the sender
+        self.stats_interval = 0  # seconds between pushed /io/stats reports, 0 = off
+        self.last_report = self.last_stats = time.monotonic()
+        self.telemetry_interval = TELEMETRY_INTERVAL
+        self.last_telemetry = self.last_report
+        self.last_reads = 0
+        self.telemetry_socket = None
+        
+        # Timetagged bundles (/timetag 1): sample-time timetag, /io/seq, per-message read time
+        self.timetag = False
+        self.sequence = 0
+        self.read_times = {}  # name -> time.monotonic() when its last read finished
+        self.clock_offset = time.time() - time.monotonic()
+        self.recorder = None  # recorder.Recorder while recording
+        self.scan_cache = ScanCache()
+        self.use_manifest = True
+        self.manifest_path = None  # --manifest, None = the active patch's io.json
+        self.manifest = None       # manifest.Manifest that created the current peripherals
         self.running = True
         
-        # OSC client for sending to PD
+        # OSC client for replies to PD, precompiled encoder for the sensor bundle
         self.osc_client = OSCClient()
-        self.osc_client.connect(("127.0.0.1", PD_PORT))
+        self.osc_client.connect(pd_address)
+        self.encoder = BundleEncoder(pd_address)
+        self.subscribers = Subscribers()  # other receivers of the sensor stream (/subscribe)
     
-    def create_peripheral(self, name, device_type, address):
+    def create_peripheral(self, name, device_type, address, rate=None, bus=None, options=None):
         """
         Dynamically create a peripheral.
         
@@ -40,99 +95,566 @@ class IOManager:
             name: Unique name for this peripheral (e.g., 'adc1', 'tilt')
             device_type: Type from PERIPHERAL_TYPES (e.g., 'ads1015')
             address: I2C address as int (e.g., 0x48)
+            rate: Own sample rate in Hz (None = follow the global poll rate)
+            bus: I2C bus id (None = default bus, see buses.py)
+            options: Extra keyword arguments for the peripheral (e.g. {'irq': 17})
         """
-        if name in self.peripherals:
-            print(f"Warning: {name} already exists, replacing...")
-        
         if device_type not in PERIPHERAL_TYPES:
             print(f"Error: Unknown device type '{device_type}'")
             print(f"Available types: {list(PERIPHERAL_TYPES.keys())}")
             return False
         
+        # An existing peripheral keeps running until its replacement is set up
         try:
-            # Import the peripheral class
-            module_name, class_name = PERIPHERAL_TYPES[device_type]
-            module = __import__(module_name)
-            peripheral_class = getattr(module, class_name)
-            
-            # Create instance
-            peripheral = peripheral_class(bus=None, address=address)
-            peripheral.name = name  # Override name with custom name
-            peripheral.setup()
-            
-            self.peripherals[name] = peripheral
-            print(f"✓ Created {name} ({device_type} @ 0x{address:02X})")
-            return True
-            
+            peripheral = self.build_peripheral(name, device_type, address, bus, options)
         except Exception as e:
             print(f"✗ Failed to create {name}: {e}")
             return False
+        
+        if name in self.peripherals:
+            print(f"Warning: {name} already exists, replacing...")
+            self.remove_peripheral(name)
+        self.add_peripheral(name, peripheral, device_type, address, rate, bus)
+        return True
     
-    def poll_and_send(self):
+    def build_peripheral(self, name, device_type, address, bus=None, options=None):
         """
-        Poll all peripherals and send single OSC bundle to PD.
+        Import the driver, construct and set up one peripheral without polling it yet.
+        Safe to run for several peripherals in parallel. Raises on failure.
         """
-        if not self.peripherals:
-            return
+        # Import the peripheral class
+        module_name, class_name = PERIPHERAL_TYPES[device_type]
+        module = __import__(module_name)
+        peripheral_class = getattr(module, class_name)
         
-        # Build OSC bundle
-        bundle = OSCBundle()
-        
-        # Read data from each peripheral
+        # Create instance
+        peripheral = peripheral_class(bus=bus, address=address, **(options or {}))
+        peripheral.name = name  # Override name with custom name
+        peripheral.emit = self.send_event  # for peripherals that push events (e.g. MPR121 IRQ)
+        peripheral.setup()
+        return peripheral
+    
+    def add_peripheral(self, name, peripheral, device_type, address, rate=None, bus=None):
+        """
+        Start polling a peripheral returned by build_peripheral().
+        """
+        self.scheduler.add(name, rate)
+        self.peripherals[name] = peripheral
+        self.update_buses()
+        self.filters.forget(name)
+        self.changes.forget(name)
+        self.stats.forget(name)
+        self.breakers.forget(name)
+        self.encoder.forget(name)
+        print(f"✓ Created {name} ({device_type} @ 0x{address:02X} on bus {buses.bus_id(bus)}, "
+              f"{self.scheduler.rate(name)} Hz)")
+    
+    def remove_peripheral(self, name):
+        """
+        Stop polling a peripheral and release it. Its cleanup runs on the bus
+        worker, after any read of it already in progress.
+        """
+        peripheral = self.peripherals.pop(name, None)
+        if peripheral is None:
+            return
+        self.update_buses()
+        self.scheduler.remove(name)
+        for state in (self.filters, self.changes, self.stats, self.breakers, self.encoder):
+            state.forget(name)
+        self.read_times.pop(name, None)
+        try:
+            buses.run_on_worker(getattr(peripheral, 'bus', None), peripheral.cleanup)
+        except Exception as e:
+            print(f"Error cleaning up {name}: {e}")
+        print(f"Removed {name}")
+    
+    def load_manifest(self):
+        """Create the peripherals in --manifest or the active patch's io.json (if any)."""
+        import manifest as io_manifest
+        if self.manifest is not None:
+            self.manifest.stop()  # no more retries of the old patch's peripherals
+        self.manifest = io_manifest.load(self, PERIPHERAL_TYPES, self.manifest_path)
+    
+    def reload(self):
+        """
+        Start over for a new patch: remove every peripheral, go back to the
+        default poll rate without timetags, and load the active patch's io.json
+        (unless run with --no-manifest, then PD's /create messages follow).
+        """
+        if self.manifest is not None:
+            self.manifest.stop()
+        for name in list(self.peripherals):
+            self.remove_peripheral(name)
+        self.poll_rate = DEFAULT_POLL_RATE
+        self.scheduler.set_default_rate(self.poll_rate)
+        self.timetag = False
+        self.sequence = 0
+        if self.use_manifest:
+            self.load_manifest()
+    
+    def update_buses(self):
+        """Rebuild the bus id -> peripheral names index after adding or removing a peripheral."""
+        bus_names = {}
         for name, peripheral in list(self.peripherals.items()):
+            bus_names.setdefault(buses.bus_id(getattr(peripheral, 'bus', None)), []).append(name)
+        self.bus_names = {bus: tuple(names) for bus, names in bus_names.items()}
+        self.bus_ids = set(self.bus_names)
+    
+    def send_results(self, results, tick):
+        """
+        Filter fresh reads and send whatever is left to PD as one bundle.
+        Only ever called from the sender (loop(), or the asyncio loop).
+        """
+        results = self.process(results, tick)
+        if results:
+            self.send_bundle(results, tick)
+    
+    def process(self, results, now=None):
+        """
+        Run fresh reads through the filter pipelines and the change filter.
+        Returns: [(name, values), ...] to send this tick
+        """
+        return self.changes.filter(self.filters.apply(results, self.peripherals), now)
+    
+    def due_on_bus(self, bus, now=None):
+        """
+        Names on one bus to read now: due by their own schedule, not faulted
+        (or due for a probe). Empty while the bus's worker is still stuck in
+        an earlier read; each time the stuck peripheral comes due meanwhile it
+        counts another failure, so a read that never returns still trips its
+        breaker.
+        """
+        if now is None:
+            now = time.monotonic()
+        due, lateness = self.scheduler.due(now, self.bus_names.get(bus, ()))
+        if not due:
+            return []
+        self.stats.record_jitter(lateness)
+        
+        stuck = self.busy.get(bus)
+        if stuck is not None:
+            if not stuck.done():
+                entry = self.reading.get(bus)
+                if entry is not None and entry[0] in due and self.breakers.allow(entry[0], now):
+                    self.read_failed(entry[0], "read still stuck")
+                return []
+            del self.busy[bus]
+        return [name for name in due if self.breakers.allow(name, now)]
+    
+    def read_timeout(self, names):
+        """How long a bus loop waits for its reads: the sum of their read budgets."""
+        return sum(self.breakers.budget(name) for name in names)
+    
+    def read_timed_out(self, bus, future):
+        """
+        A bus's reads ran past their budget. Counts a failure for the peripheral
+        being read right away (not when, or if, the read returns) and leaves the
+        bus out until the worker is free again.
+        """
+        self.busy[bus] = future
+        with self.read_lock:
+            entry = self.reading.get(bus)
+            if entry is None or entry[1]:
+                return
+            entry[1] = True
+        self.read_failed(entry[0], f"read took over {self.breakers.budget(entry[0]) * 1000:.0f} ms")
+    
+    def poll_bus(self, bus):
+        """
+        Deadline loop for one I2C bus (a thread per bus, started by loop()).
+        Reads run on the bus's worker thread, so they never overlap commands
+        on the same bus, and results go to the sender through self.outbox.
+        A bus never waits for another bus, so each peripheral keeps its own
+        rate however slow the others are.
+        """
+        while self.running:
+            now = time.monotonic()
+            names = self.due_on_bus(bus, now)
+            if names:
+                try:
+                    future = buses.get_worker(bus).submit(self._read_group, names, bus)
+                except RuntimeError:
+                    return  # workers shut down
+                start = time.perf_counter()
+                try:
+                    results = future.result(self.read_timeout(names))
+                    self.stats.record_round(time.perf_counter() - start)
+                except concurrent.futures.TimeoutError:
+                    self.read_timed_out(bus, future)
+                    results = []
+                if results:
+                    self.outbox.put((now, results))
+            delay = self.scheduler.delay(self.bus_names.get(bus, ()))
+            if delay > 0:
+                time.sleep(delay)
+    
+    def start_bus_loops(self):
+        """Start a poll_bus thread for every bus that has peripherals and no loop yet."""
+        for bus in self.bus_ids - set(self.bus_threads):
+            thread = threading.Thread(target=self.poll_bus, args=(bus,), name=f"poll-{bus}", daemon=True)
+            self.bus_threads[bus] = thread
+            thread.start()
+    
+    def _read_group(self, names, bus=None):
+        """
+        Read peripherals one after another (all on the same bus, on its worker).
+        A peripheral returning None had nothing new this tick and is left out.
+        A read that raises or runs over its budget counts towards a fault, once:
+        if the bus loop already counted it when the budget ran out, it is not
+        counted again when the read returns.
+        """
+        results = []
+        for name in names:
+            peripheral = self.peripherals.get(name)
+            if peripheral is None:
+                continue
+            entry = self.reading[bus] = [name, False]
             try:
+                start = time.perf_counter()
                 data = peripheral.read_data()
-                
-                # Add message to bundle
-                msg = OSCMessage(f"/{name}")
-                
-                # Handle different return types
-                if isinstance(data, dict):
-                    # Send dict values in order
-                    for value in data.values():
-                        msg.append(value)
-                elif isinstance(data, (list, tuple)):
-                    for value in data:
-                        msg.append(value)
-                else:
-                    msg.append(data)
-                
-                bundle.append(msg)
-                
+                elapsed = time.perf_counter() - start
+                self.stats.record_read(name, elapsed)
+                self.read_times[name] = time.monotonic()
+                with self.read_lock:
+                    counted, entry[1] = entry[1], True
+                if elapsed > self.breakers.budget(name):
+                    if not counted:
+                        self.read_failed(name, f"read took {elapsed * 1000:.1f} ms")
+                elif self.breakers.success(name):
+                    print(f"✓ {name} recovered")
+                    self.send_event('/io/recovered', [name])
+                if data is not None:
+                    results.append((name, data))
             except Exception as e:
-                print(f"Error reading {name}: {e}")
+                with self.read_lock:
+                    counted, entry[1] = entry[1], True
+                self.stats.record_error(name)
+                if not counted:
+                    self.read_failed(name, e)
+        self.reading.pop(bus, None)
+        return results
+    
+    def read_failed(self, name, reason):
+        """
+        Count a failed read. Prints the first error of a run only, and tells
+        PD (/io/fault <name>) when the peripheral starts being skipped.
+        """
+        breaker = self.breakers.get(name)
+        if not breaker.failures:
+            print(f"Error reading {name}: {reason}")
+        if self.breakers.failure(name, time.monotonic()):
+            print(f"✗ {name} failed {breaker.failures} reads in a row, skipping it "
+                  f"(probing again after {breaker.backoff} s, then backing off)")
+            self.send_event('/io/fault', [name])
+    
+    def send_bundle(self, results, tick=None):
+        """
+        Send [(name, values), ...] to PD as one OSC bundle.
+        Encoded by osc_encoder.py into the same bytes OSCBundle would produce.
+        
+        With timetags on, the bundle is stamped with the tick's sample time
+        (time.monotonic() mapped to wall-clock), starts with /io/seq <n>, and
+        every message gets one extra value: when its read finished, in ms
+        relative to the timetag.
+        """
+        if self.recorder is not None and tick is not None:
+            self.recorder.add(tick, results)
         
-        # Send bundle to PD
+        timetag = None
+        if self.timetag and tick is not None:
+            self.sequence += 1
+            timetag = tick + self.clock_offset
+            results = [('io/seq', [self.sequence])] + [
+                (name, list(values) + [round((self.read_times.get(name, tick) - tick) * 1000, 3)])
+                for name, values in results]
         try:
-            self.osc_client.send(bundle)
+            start = time.perf_counter()
+            if self.subscribers.active:
+                # encode once: PD first, then the same bytes go to the subscribers' thread
+                elements = []
+                bundle = self.encoder.encode(results, timetag, elements)
+                self.encoder.sock.send(bundle)
+                self.stats.record_send(time.perf_counter() - start)
+                self.subscribers.publish(bundle, elements)
+            else:
+                self.encoder.send(results, timetag)
+                self.stats.record_send(time.perf_counter() - start)
         except Exception as e:
+            self.stats.send_errors += 1
             print(f"Error sending OSC: {e}")
     
+    def start_recording(self, path):
+        """
+        Record every sensor bundle to 'path' (see recorder.py).
+        """
+        from recorder import Recorder
+        self.stop_recording()
+        try:
+            self.recorder = Recorder(path)
+            print(f"Recording to {path}")
+        except OSError as e:
+            print(f"Error starting recording: {e}")
+    
+    def stop_recording(self):
+        if self.recorder is not None:
+            recorder, self.recorder = self.recorder, None
+            recorder.close()
+            print(f"Recorded {recorder.ticks} ticks to {recorder.path}")
+    
+    def send_event(self, address, values):
+        """
+        Send one event message to PD right away, outside the periodic bundle.
+        Safe to call from any thread.
+        """
+        msg = OSCMessage(address)
+        for value in values:
+            msg.append(value)
+        try:
+            self.osc_client.send(msg)
+        except Exception as e:
+            print(f"Error sending {address}: {e}")
+    
+    def report_missed(self):
+        """
+        Print peripherals that missed deadlines since the last report.
+        """
+        for name, count in self.scheduler.take_missed().items():
+            print(f"Warning: {name} missed {count} deadlines (target {self.scheduler.rate(name)} Hz)")
+    
+    def send_stats(self):
+        """
+        Send timing stats for the window since the last report to PD as one bundle:
+            /io/stats/<name> target_hz achieved_hz p50 p95 p99 max errors missed
+            /io/stats/loop jitter_p50 jitter_p99 jitter_max send_p50 send_p99 send_max send_errors
+            /io/stats/subscribers subscribers sent dropped     (once anyone has subscribed)
+        Latencies are in milliseconds.
+        """
+        rates = {name: self.scheduler.rate(name) for name in self.peripherals}
+        missed = {name: s.missed for name, s in self.scheduler.schedules.items()}
+        per_peripheral, loop = self.stats.report(rates, missed)
+        
+        bundle = OSCBundle()
+        for name, values in per_peripheral.items():
+            msg = OSCMessage(f"/io/stats/{name}")
+            msg.append(values)
+            bundle.append(msg)
+        msg = OSCMessage("/io/stats/loop")
+        msg.append(loop)
+        bundle.append(msg)
+        if self.subscribers.thread is not None:
+            msg = OSCMessage("/io/stats/subscribers")
+            msg.append(self.subscribers.stats())
+            bundle.append(msg)
+        
+        try:
+            self.osc_client.send(bundle)
+        except Exception as e:
+            print(f"Error sending stats: {e}")
+    
+    def send_telemetry(self, now=None):
+        """
+        Broadcast a summary for the fleet monitor (python/fleet_monitor.py) on 5550:
+            /telemetry <hostname> io_rate <Hz> io_target <Hz> io_jitter_p99 <ms>
+                       io_jitter_max <ms> io_errors <n> io_faulted <n>
+        io_rate is reads per second across all peripherals since the last
+        broadcast, io_target what their rates add up to.
+        """
+        if now is None:
+            now = time.monotonic()
+        reads, errors, jitter_p99, jitter_max = self.stats.take_telemetry()
+        elapsed = max(now - self.last_telemetry, 1e-6)
+        rate = (reads - self.last_reads) / elapsed
+        self.last_telemetry, self.last_reads = now, reads
+        target = sum(self.scheduler.rate(name) for name in self.peripherals)
+        faulted = sum(1 for name in self.peripherals if self.breakers.faulted(name))
+        
+        msg = OSCMessage("/telemetry")
+        msg.append([socket.gethostname(), 'io_rate', round(rate, 2), 'io_target', float(target),
+                    'io_jitter_p99', jitter_p99, 'io_jitter_max', jitter_max,
+                    'io_errors', errors, 'io_faulted', faulted])
+        try:
+            if self.telemetry_socket is None:
+                self.telemetry_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                self.telemetry_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            self.telemetry_socket.sendto(msg.getBinary(), TELEMETRY_ADDRESS)
+        except OSError as e:
+            print(f"Error sending telemetry: {e}")
+    
+    def scan(self, bus_ids=(), refresh=False, create=False):
+        """
+        Find known chips on the given buses (default: bus 1 plus every bus in use).
+        Uses cached results unless refresh is set; with create, peripherals are
+        created for recognised chips whose address is not taken yet.
+        Returns [(bus, address, type), ...]
+        """
+        bus_ids = set(bus_ids) or {buses.DEFAULT_BUS} | {
+            buses.bus_id(getattr(p, 'bus', None)) for p in self.peripherals.values()}
+        found = []
+        for bus in sorted(bus_ids):
+            try:
+                devices = self.scan_cache.get(bus, refresh)
+            except Exception as e:
+                print(f"Error scanning bus {bus}: {e}")
+                continue
+            print(f"Bus {bus}: " + (", ".join(f"0x{a:02X} {t}" for a, t in devices) or "nothing found"))
+            found.extend((bus, address, device_type) for address, device_type in devices)
+        
+        if create:
+            taken = {(buses.bus_id(getattr(p, 'bus', None)), getattr(p, 'address', None))
+                     for p in self.peripherals.values()}
+            for bus, address, device_type in found:
+                if device_type not in PERIPHERAL_TYPES or (bus, address) in taken:
+                    continue
+                name = base = DEFAULT_NAMES[device_type]
+                n = 1
+                while name in self.peripherals:
+                    n += 1
+                    name = f"{base}{n}"
+                # On the bus worker, so setup never overlaps a read on the same bus
+                buses.get_worker(bus).submit(
+                    self.create_peripheral, name, device_type, address, None, bus).result()
+        return found
+    
+    def parse_create(self, args):
+        """
+        Split /create arguments into (name, type, address, rate, bus, options).
+        Up to two numbers after the address are [rate] [bus]; anything after
+        them is 'key value' pairs passed to the peripheral, e.g. irq 17.
+        """
+        name = str(args[0])
+        device_type = str(args[1])
+        i2c_addr = int(args[2], 16) if isinstance(args[2], str) else int(args[2])
+        
+        rest = list(args[3:])
+        numbers = []
+        while rest and len(numbers) < 2 and _is_number(rest[0]):
+            numbers.append(float(rest.pop(0)))
+        rate = numbers[0] if numbers and numbers[0] > 0 else None
+        bus = int(numbers[1]) if len(numbers) >= 2 else None
+        options = {str(key): value for key, value in zip(rest[0::2], rest[1::2])}
+        return name, device_type, i2c_addr, rate, bus, options
+    
     def handle_command(self, address, tags, args, source):
         """
         Handle OSC commands from PD.
         """
         parts = address.strip('/').split('/')
         
-        # /create <name> <type> <address>
+        # /create <name> <type> <address> [rate] [bus] [key value...]
         if parts[0] == 'create':
             if len(args) >= 3:
-                name = str(args[0])
-                device_type = str(args[1])
-                i2c_addr = int(args[2], 16) if isinstance(args[2], str) else int(args[2])
-                self.create_peripheral(name, device_type, i2c_addr)
+                self.create_peripheral(*self.parse_create(args))
         
         # /poll <rate>
         elif parts[0] == 'poll':
             if len(args) > 0:
                 self.poll_rate = max(0.1, float(args[0]))
+                self.scheduler.set_default_rate(self.poll_rate)
                 print(f"Poll rate set to {self.poll_rate} Hz")
         
+        # /stats [interval] - reply with timing stats, optionally push every <interval> s (0 = off)
+        elif parts[0] == 'stats':
+            if len(args) > 0:
+                self.stats_interval = max(0.0, float(args[0]))
+                print(f"Stats push interval set to {self.stats_interval} s")
+            self.send_stats()
+        
+        # /telemetry [interval] - broadcast a fleet telemetry summary now, optionally every <interval> s (0 = off)
+        elif parts[0] == 'telemetry':
+            if len(args) > 0:
+                self.telemetry_interval = max(0.0, float(args[0]))
+                print(f"Telemetry interval set to {self.telemetry_interval} s")
+            self.send_telemetry()
+        
+        # /keyframe <seconds> - full resync interval for deadbanded peripherals (0 = off)
+        elif parts[0] == 'keyframe':
+            if len(args) > 0:
+                self.changes.keyframe_interval = max(0.0, float(args[0]))
+                print(f"Keyframe interval set to {self.changes.keyframe_interval} s")
+        
+        # /timetag <0|1> - sample-time timetags, /io/seq and per-message read times
+        elif parts[0] == 'timetag':
+            if len(args) > 0:
+                self.timetag = bool(int(args[0]))
+                self.sequence = 0
+                print(f"Timetagged bundles {'on' if self.timetag else 'off'}")
+        
+        # /record <path> - record sensor bundles to a file (/record 0 or no args = stop)
+        elif parts[0] == 'record':
+            if len(args) > 0 and args[0] != 0:
+                self.start_recording(str(args[0]))
+            else:
+                self.stop_recording()
+        
+        # /reload - remove all peripherals and load the active patch's io.json (after a patch switch)
+        elif parts[0] == 'reload':
+            print("Reloading peripherals")
+            self.reload()
+        
+        # /scan [refresh] [create] [bus...] - reply /io/scan bus address type ...
+        elif parts[0] == 'scan':
+            words = [str(arg) for arg in args if not _is_number(arg)]
+            bus_ids = [int(float(arg)) for arg in args if _is_number(arg)]
+            found = self.scan(bus_ids, refresh='refresh' in words, create='create' in words)
+            self.send_event('/io/scan', [value for device in found for value in device])
+        
+        # /subscribe <host> <port> [rate] [peripheral...] - copy the sensor stream to host:port,
+        # at most <rate> bundles/s (0 = every tick); renew within SUBSCRIBER_TTL s or it expires
+        elif parts[0] == 'subscribe':
+            if len(args) >= 2:
+                host, port, rest = str(args[0]), int(float(args[1])), list(args[2:])
+                rate = float(rest.pop(0)) if rest and _is_number(rest[0]) else 0.0
+                names = [str(arg) for arg in rest]
+                if self.subscribers.subscribe(host, port, rate, names):
+                    print(f"Subscriber {host}:{port} @ {f'{rate:g} Hz' if rate else 'every tick'}: "
+                          f"{', '.join(names) or 'all peripherals'}")
+                else:
+                    print(f"Subscriber list full, {host}:{port} not added")
+            # reply /io/subscribers host port rate ...
+            self.send_event('/io/subscribers', [value for subscriber in self.subscribers.listing()
+                                                for value in subscriber[:3]])
+        
+        # /unsubscribe [host port] - stop copying the stream (no args = to everyone)
+        elif parts[0] == 'unsubscribe':
+            if len(args) >= 2:
+                removed = self.subscribers.unsubscribe(str(args[0]), int(float(args[1])))
+            else:
+                removed = self.subscribers.unsubscribe()
+            print(f"Removed {removed} subscriber{'s' if removed != 1 else ''}")
+        
         # /list
         elif parts[0] == 'report':
             print("\nActive peripherals:")
             for name, peripheral in self.peripherals.items():
-                print(f"  {name}: {peripheral.__class__.__name__}")
+                schedule = self.scheduler.schedules[name]
+                print(f"  {name}: {peripheral.__class__.__name__} "
+                      f"@ {self.scheduler.rate(name)} Hz, {schedule.missed} missed"
+                      + (", FAULTED" if self.breakers.faulted(name) else ""))
+        
+        # /<peripheral>/rate <hz> - per-peripheral sample rate (0 = follow /poll)
+        elif len(parts) == 2 and parts[0] in self.peripherals and parts[1] == 'rate':
+            if len(args) > 0:
+                self.scheduler.set_rate(parts[0], float(args[0]))
+                print(f"{parts[0]} rate set to {self.scheduler.rate(parts[0])} Hz")
+        
+        # /<peripheral>/deadband [threshold...] - only send changes (no args = send every read)
+        elif len(parts) == 2 and parts[0] in self.peripherals and parts[1] == 'deadband':
+            self.changes.set_deadband(parts[0], args)
+            print(f"{parts[0]} deadband set to {self.changes.deadbands.get(parts[0], 'off')}")
+        
+        # /<peripheral>/budget <ms> - read time before a read counts as failed
+        elif len(parts) == 2 and parts[0] in self.peripherals and parts[1] == 'budget':
+            if len(args) > 0:
+                self.breakers.set_budget(parts[0], float(args[0]) / 1000.0)
+                print(f"{parts[0]} read budget set to {self.breakers.budget(parts[0]) * 1000:.0f} ms")
+        
+        # /<peripheral>/filter [stage args...] - on-device filter pipeline (no args = raw)
+        elif len(parts) == 2 and parts[0] in self.peripherals and parts[1] == 'filter':
+            try:
+                self.filters.set_filter(parts[0], args)
+                print(f"{parts[0]} filter set to {self.filters.describe(parts[0])}")
+            except ValueError as e:
+                print(f"Bad filter for {parts[0]}: {e}")
         
         # /<peripheral>/<command> - send to specific peripheral
         elif len(parts) >= 2 and parts[0] in self.peripherals:
@@ -145,19 +667,38 @@ class IOManager:
             except Exception as e:
                 print(f"Error writing to {peripheral_name}: {e}")
     
-    def run(self):
+    def print_banner(self):
         """
-        Main loop: poll sensors and send OSC bundle.
+        Print ports and the command summary.
         """
         print(f"\nBopOS I/O Bridge Running")
         print(f"Python listening on port {PYTHON_PORT}")
         print(f"Sending to PD on port {PD_PORT}")
         print(f"Poll rate: {self.poll_rate} Hz")
         print(f"\nCommands:")
-        print(f"  /create <name> <type> <address>")
+        print(f"  /create <name> <type> <address> [rate] [bus] [key value...]")
         print(f"  /poll <rate>")
+        print(f"  /<name>/rate <rate>")
+        print(f"  /<name>/deadband [threshold...]")
+        print(f"  /<name>/budget <ms>")
+        print(f"  /<name>/filter [ema a] [median n] [baseline a hold] [hysteresis on off]")
+        print(f"  /keyframe <seconds>")
+        print(f"  /stats [interval]")
+        print(f"  /telemetry [interval]")
+        print(f"  /timetag <0|1>")
+        print(f"  /record [path]")
         print(f"  /report")
+        print(f"  /scan [refresh] [create] [bus...]")
+        print(f"  /reload")
+        print(f"  /subscribe <host> <port> [rate] [peripheral...]")
+        print(f"  /unsubscribe [host port]")
         print(f"\nPress Ctrl+C to quit\n")
+    
+    def run(self):
+        """
+        Main loop: poll sensors and send OSC bundle.
+        """
+        self.print_banner()
         
         # Setup OSC server in separate thread
         server = OSCServer(("127.0.0.1", PYTHON_PORT))
@@ -174,35 +715,120 @@ class IOManager:
         
         # Main polling loop
         try:
-            while self.running:
-                self.poll_and_send()
-                time.sleep(1.0 / self.poll_rate)
+            self.loop()
                 
         except KeyboardInterrupt:
             print("\n\nShutting down...")
-            self.running = False
             server.close()
-            
-            # Cleanup all peripherals
-            for peripheral in self.peripherals.values():
-                peripheral.cleanup()
+            self.cleanup()
+    
+    def loop(self):
+        """
+        Send what the bus loops read until stopped. Reads waiting together go
+        out as one bundle, stamped with the earliest of their ticks.
+        """
+        while self.running:
+            self.start_bus_loops()
+            try:
+                tick, results = self.outbox.get(timeout=MAX_SLEEP)
+            except queue.Empty:
+                pass
+            else:
+                results = list(results)
+                while True:
+                    try:
+                        more_tick, more = self.outbox.get_nowait()
+                    except queue.Empty:
+                        break
+                    tick = min(tick, more_tick)
+                    results.extend(more)
+                self.send_results(results, tick)
+            self.housekeeping()
+    
+    def housekeeping(self, now=None):
+        """
+        Print missed deadlines and push stats whenever their interval is up.
+        """
+        if now is None:
+            now = time.monotonic()
+        if now - self.last_report >= MISSED_REPORT_INTERVAL:
+            self.last_report = now
+            self.report_missed()
+            self.clock_offset = time.time() - time.monotonic()  # follow wall-clock (NTP) adjustments
+        if self.stats_interval and now - self.last_stats >= self.stats_interval:
+            self.last_stats = now
+            self.send_stats()
+        if self.telemetry_interval and now - self.last_telemetry >= self.telemetry_interval:
+            self.send_telemetry(now)
+    
+    def cleanup(self):
+        """
+        Release peripherals, bus workers and sockets.
+        """
+        self.running = False
+        for thread in self.bus_threads.values():
+            thread.join(timeout=1.0)
+        self.stop_recording()
+        self.encoder.close()
+        self.subscribers.close()
+        if self.telemetry_socket is not None:
+            self.telemetry_socket.close()
+        for peripheral in self.peripherals.values():
+            peripheral.cleanup()
+        buses.shutdown()
 
 
-def main():
+def main(use_async=False, record=None, manifest=None, use_manifest=True, scan=False, autocreate=False,
+         telemetry=TELEMETRY_INTERVAL):
     manager = IOManager()
+    manager.telemetry_interval = telemetry
+    manager.use_manifest = use_manifest
+    manager.manifest_path = manifest
     
-    # Optional: Auto-create some peripherals at startup
-    # manager.create_peripheral('adc', 'ads1015', 0x48)
-    # manager.create_peripheral('tilt', 'lis3dh', 0x19)
-    # manager.create_peripheral('touch', 'mpr121', 0x5A)
+    # Create the active patch's peripherals (patches/<patch>/io.json) before PD is up
+    if use_manifest:
+        manager.load_manifest()
     
-    manager.run()
+    # Probe the buses (--scan) and/or create whatever the (cached) scan found (--autocreate)
+    if scan or autocreate:
+        manager.scan(refresh=scan, create=autocreate)
+    
+    if record:
+        manager.start_recording(record)
+    
+    if use_async:
+        import aio
+        aio.run(manager, PYTHON_PORT)
+    else:
+        manager.run()
 
 
 if __name__ == "__main__":
-    import sys
-    if "--monitor" in sys.argv:
+    import argparse
+    parser = argparse.ArgumentParser(description="BopOS I2C to OSC bridge")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="run on an asyncio event loop")
+    parser.add_argument("--monitor", action="store_true", help="MPR121 debug monitor")
+    parser.add_argument("--record", metavar="FILE", help="record sensor bundles to FILE")
+    parser.add_argument("--replay", metavar="FILE", help="send a recording to PD instead of reading sensors")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed (2 = twice as fast)")
+    parser.add_argument("--loop", action="store_true", help="replay forever")
+    parser.add_argument("--manifest", metavar="FILE", help="peripheral manifest (default: active patch's io.json)")
+    parser.add_argument("--scan", action="store_true", help="probe the I2C buses at start-up (refreshes the scan cache)")
+    parser.add_argument("--autocreate", action="store_true", help="create a peripheral for every chip the scan finds")
+    parser.add_argument("--no-manifest", dest="use_manifest", action="store_false", help="wait for /create from PD only")
+    parser.add_argument("--telemetry", type=float, default=TELEMETRY_INTERVAL, metavar="SECONDS",
+                        help="seconds between fleet /telemetry broadcasts on 5550 (0 = off)")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be greater than 0")
+    
+    if args.monitor:
         from io_mpr121_debug import monitor
         monitor()
+    elif args.replay:
+        from recorder import replay
+        replay(args.replay, ("127.0.0.1", PD_PORT), args.speed, args.loop)
     else:
-        main()
+        main(use_async=args.use_async, record=args.record,
+             manifest=args.manifest, use_manifest=args.use_manifest,
+             scan=args.scan, autocreate=args.autocreate, telemetry=args.telemetry)
@@ -0,0 +1,210 @@
+# manifest.py
+"""
+Per-patch peripheral manifest
+Lets a patch list its sensors in patches/<active patch>/io.json so io/main.py
+creates them at process start, before PD is even running, instead of waiting
+for PD's /create messages.
+
+    {
+      "commands": [["poll", 50], ["timetag", 1]],
+      "peripherals": [
+        {"name": "touch", "type": "mpr121", "address": "0x5A", "options": {"irq": 17},
+         "commands": [["filter", "ema", 0.3]]},
+        {"name": "tilt", "type": "lis3dh", "address": "0x19", "rate": 100,
+         "commands": [["fifo", 400]]},
+        {"name": "knobs", "type": "ads1115", "address": "0x48", "bus": 3}
+      ]
+    }
+
+Only name, type and address are required. "commands" are sent as if PD had
+sent them: top level as /<command> args, per peripheral as /<name>/<command> args.
+
+Drivers are imported in parallel and every peripheral is set up on its bus's
+worker thread (buses.py), so peripherals on different buses start at the same
+time while each bus still sees one transaction at a time. A peripheral that
+fails is retried in the background after 1, 2, 4, 8, 16 and 30 seconds; a later
+/create of the same name from PD takes over and stops the retries.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import buses
+
+PATCHES_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../patches')
+MANIFEST_NAME = 'io.json'
+RETRY_DELAYS = (1, 2, 4, 8, 16, 30)  # seconds before each retry of a failed peripheral
+
+
+def active_manifest(patches_dir=PATCHES_DIR):
+    """Path of the active patch's io.json, or None if there is no active patch or no manifest."""
+    try:
+        with open(os.path.join(patches_dir, 'active_patch.txt')) as f:
+            patch = f.read().strip()
+    except OSError:
+        return None
+    if not patch:
+        return None
+    path = os.path.join(patches_dir, patch, MANIFEST_NAME)
+    return path if os.path.isfile(path) else None
+
+
+def _address(value):
+    return int(value, 0) if isinstance(value, str) else int(value)
+
+
+def _commands(entries, where):
+    """Validate a list of [command, args...] lists."""
+    commands = []
+    for entry in entries or []:
+        if isinstance(entry, str):
+            entry = [entry]
+        if not isinstance(entry, list) or not entry or not isinstance(entry[0], str):
+            print(f"Manifest: skipping bad command {entry!r} in {where}")
+            continue
+        commands.append((entry[0].strip('/'), entry[1:]))
+    return commands
+
+
+def parse(data, peripheral_types):
+    """
+    Turn manifest JSON into (commands, peripherals).
+    Bad entries are printed and skipped so one typo does not stop the others.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("manifest must be a JSON object")
+
+    peripherals = []
+    names = set()
+    for entry in data.get('peripherals', []):
+        try:
+            name = str(entry['name'])
+            device_type = str(entry['type']).lower()
+            if device_type not in peripheral_types:
+                raise ValueError(f"unknown type '{device_type}'")
+            if name in names:
+                raise ValueError("duplicate name")
+            rate = entry.get('rate')
+            peripherals.append({
+                'name': name,
+                'type': device_type,
+                'address': _address(entry['address']),
+                'rate': float(rate) if rate else None,
+                'bus': entry.get('bus'),
+                'options': dict(entry.get('options') or {}),
+                'commands': _commands(entry.get('commands'), name),
+            })
+            names.add(name)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            print(f"Manifest: skipping peripheral {entry!r}: {e}")
+    return _commands(data.get('commands'), 'manifest'), peripherals
+
+
+class Manifest:
+    """Creates a manifest's peripherals on an IOManager and retries the ones that fail."""
+
+    def __init__(self, manager, path, peripheral_types):
+        self.manager = manager
+        self.path = path
+        self.peripheral_types = peripheral_types  # main.PERIPHERAL_TYPES
+        self.pending = []       # peripheral entries still to be set up
+        self.retry_thread = None
+        self.stopped = False    # set by stop() when the patch changes
+
+    def load(self):
+        """Run the manifest: global commands, then all peripherals in parallel. Returns False if unreadable."""
+        try:
+            with open(self.path) as f:
+                commands, peripherals = parse(json.load(f), self.peripheral_types)
+        except (OSError, ValueError) as e:
+            print(f"Manifest: cannot read {self.path}: {e}")
+            return False
+
+        print(f"Manifest: {self.path} ({len(peripherals)} peripherals)")
+        for command, args in commands:
+            self._command(f"/{command}", args)
+
+        self.pending = self._start(peripherals)
+        if self.pending:
+            self.retry_thread = threading.Thread(target=self._retry, name="manifest-retry", daemon=True)
+            self.retry_thread.start()
+        return True
+
+    def stop(self):
+        """Give up retrying (the peripherals are being replaced, e.g. by /reload)."""
+        self.stopped = True
+
+    def _start(self, peripherals):
+        """Set up peripherals at the same time (one at a time per bus); returns the ones that failed."""
+        modules = {self.peripheral_types[entry['type']][0] for entry in peripherals}
+        with ThreadPoolExecutor(max_workers=max(1, len(modules)), thread_name_prefix="import") as imports:
+            # Imports (the slow part on a Pi) run side by side; builds wait on the import lock
+            for module in modules:
+                imports.submit(__import__, module)
+            builds = [(entry, buses.get_worker(entry['bus']).submit(self._build, entry))
+                      for entry in peripherals]
+
+        failed = []
+        for entry, future in builds:
+            try:
+                peripheral = future.result()
+            except Exception as e:
+                print(f"✗ Failed to create {entry['name']}: {e}")
+                failed.append(entry)
+                continue
+            self._add(entry, peripheral)
+        return failed
+
+    def _build(self, entry):
+        return self.manager.build_peripheral(entry['name'], entry['type'], entry['address'],
+                                             entry['bus'], entry['options'])
+
+    def _add(self, entry, peripheral):
+        name = entry['name']
+        self.manager.add_peripheral(name, peripheral, entry['type'], entry['address'],
+                                    entry['rate'], entry['bus'])
+        for command, args in entry['commands']:
+            self._command(f"/{name}/{command}", args)
+
+    def _command(self, address, args):
+        try:
+            self.manager.handle_command(address, None, list(args), None)
+        except Exception as e:
+            print(f"Manifest: error running {address} {args}: {e}")
+
+    def _retry(self):
+        for delay in RETRY_DELAYS:
+            time.sleep(delay)
+            if not self.manager.running or self.stopped:
+                return
+            still_failing = []
+            for entry in self.pending:
+                if entry['name'] in self.manager.peripherals:
+                    continue  # PD created it in the meantime
+                try:
+                    peripheral = buses.get_worker(entry['bus']).submit(self._build, entry).result()
+                except Exception as e:
+                    still_failing.append(entry)
+                    last_error = e
+                    continue
+                if entry['name'] not in self.manager.peripherals and not self.stopped:
+                    self._add(entry, peripheral)
+                else:
+                    peripheral.cleanup()
+            self.pending = still_failing
+            if not still_failing:
+                return
+            print(f"Manifest: retrying {', '.join(e['name'] for e in still_failing)} ({last_error})")
+        print(f"Manifest: giving up on {', '.join(e['name'] for e in self.pending)}")
+
+
+def load(manager, peripheral_types, path=None):
+    """Load 'path' or the active patch's io.json if there is one. Returns the Manifest or None."""
+    path = path or active_manifest()
+    if path is None:
+        return None
+    manifest = Manifest(manager, path, peripheral_types)
+    return manifest if manifest.load() else None
@@ -0,0 +1,119 @@
+# osc_encoder.py
+"""
+Precompiled OSC bundle encoder for the sensor stream
+Produces byte-for-byte the same bundles as pyOSC3's OSCBundle/OSCMessage, but
+caches each peripheral's address and type-tag prefix with a struct.Struct and
+packs every tick into one reusable buffer, sent straight over a UDP socket.
+
+Types follow pyOSC3 exactly: float -> 'f', int -> 'i', anything else is sent
+the way pyOSC3 would send it (normally as a string). bytes are sent as an OSC
+blob ('b').
+"""
+
+import socket
+import struct
+
+from pyOSC3 import OSCMessage, OSCString
+
+BUNDLE_HEADER = OSCString("#bundle") + struct.pack('>LL', 0, 1)  # timetag 0,1 = immediately
+TIMETAG = struct.Struct('>LL')
+TIMETAG_OFFSET = 8   # after "#bundle\0"
+NTP_EPOCH = 2208988800  # seconds from 1900-01-01 (NTP) to 1970-01-01 (Unix)
+BUFFER_SIZE = 65536  # largest UDP datagram; the buffer grows if a bundle needs more
+MAX_LAYOUTS = 8      # per peripheral; variable-length output (e.g. FIFO blocks) cycles a few
+
+_TAGS = {float: 'f', int: 'i'}
+
+
+class _Layout:
+    """Cached encoding for one peripheral: its value types and a Struct for the whole element."""
+
+    def __init__(self, name, types):
+        self.types = types
+        prefix = OSCString(f"/{name}") + OSCString(',' + ''.join(_TAGS[t] for t in types))
+        self.prefix = prefix
+        # int32 element size, address + type tags, then the values
+        self.struct = struct.Struct(f">i{len(prefix)}s" + ''.join(_TAGS[t] for t in types))
+        self.size = self.struct.size
+        self.length = self.size - 4  # size field does not count itself
+
+
+class BundleEncoder:
+    """Encodes [(name, values), ...] into an OSC bundle and sends it over UDP."""
+
+    def __init__(self, address):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.connect(address)
+        self.buffer = bytearray(BUFFER_SIZE)
+        self.view = memoryview(self.buffer)
+        self.buffer[:len(BUNDLE_HEADER)] = BUNDLE_HEADER
+        self.layouts = {}  # name -> {value types: _Layout}
+
+    def forget(self, name):
+        """Drop the cached layouts for a peripheral (e.g. when it is replaced)."""
+        self.layouts.pop(name, None)
+
+    def _layout(self, name, values):
+        types = tuple(map(type, values))
+        cached = self.layouts.get(name)
+        if cached is None:
+            cached = self.layouts[name] = {}
+        layout = cached.get(types)
+        if layout is not None:
+            return layout
+        if not all(t in _TAGS for t in types):
+            return None  # strings and other types take the pyOSC3 path
+        if len(cached) >= MAX_LAYOUTS:
+            cached.clear()
+        layout = cached[types] = _Layout(name, types)
+        return layout
+
+    def _ensure(self, size):
+        if size > len(self.buffer):
+            # New buffer rather than extend(): the old one may still be exported via a memoryview
+            buffer = bytearray(max(size, 2 * len(self.buffer)))
+            buffer[:len(self.buffer)] = self.buffer
+            self.buffer = buffer
+            self.view = memoryview(buffer)
+
+    def encode(self, results, timetag=None, elements=None):
+        """
+        Pack [(name, values), ...] into the buffer.
+        timetag: Unix time in seconds for the bundle timetag (None = immediately)
+        elements: optional list that gets (name, start, end) of each packed
+            element (size prefix included), so the bytes can be reused
+        Returns a memoryview of the encoded bundle (valid until the next encode).
+        """
+        if timetag is None:
+            TIMETAG.pack_into(self.buffer, TIMETAG_OFFSET, 0, 1)
+        else:
+            seconds = int(timetag)
+            TIMETAG.pack_into(self.buffer, TIMETAG_OFFSET, (seconds + NTP_EPOCH) & 0xFFFFFFFF,
+                              int((timetag - seconds) * 0x100000000) & 0xFFFFFFFF)
+        offset = len(BUNDLE_HEADER)
+        for name, values in results:
+            start = offset
+            layout = self._layout(name, values)
+            if layout is None:
+                element = OSCMessage(f"/{name}")
+                for value in values:
+                    element.append(value, 'b' if type(value) is bytes else None)
+                element = element.getBinary()
+                self._ensure(offset + 4 + len(element))
+                struct.pack_into('>i', self.buffer, offset, len(element))
+                self.buffer[offset + 4:offset + 4 + len(element)] = element
+                offset += 4 + len(element)
+            else:
+                self._ensure(offset + layout.size)
+                layout.struct.pack_into(self.buffer, offset, layout.length, layout.prefix, *values)
+                offset += layout.size
+            if elements is not None:
+                elements.append((name, start, offset))
+        return self.view[:offset]
+
+    def send(self, results, timetag=None, elements=None):
+        """Encode and send one bundle. Returns the number of bytes sent."""
+        return self.sock.send(self.encode(results, timetag, elements))
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,201 @@
+# recorder.py
+"""
+Sensor stream recording and replay
+Records every bundle IOManager sends to PD into a compact append-only binary
+log, and plays a log back to PD with the original timing (or N x faster)
+without any sensors attached. Replay never imports board/busio.
+
+Recording costs the poll loop one deque append per tick; a background thread
+packs ticks into struct-packed records and appends them to the file every
+FLUSH_INTERVAL. Reading memory-maps the file.
+
+File format (little-endian):
+    b"BOPREC2\\n"
+    'L' <u16 id> <u8 len> <name> <u8 len> <types>   defines a message layout, before first use
+    'T' <f64 t> <u16 count>                         a tick, t = seconds since the first tick
+        count x (<u16 layout id> <values>)           one f32 per 'f' and one i32 per 'i' in types
+
+Usage:
+    python main.py --record rehearsal.rec        # record while running
+    [record rehearsal.rec(  /  [record 0(          # start / stop from PD
+    python main.py --replay rehearsal.rec --speed 4 [--loop]
+"""
+
+import mmap
+import struct
+import threading
+import time
+from collections import deque
+
+MAGIC = b"BOPREC2\n"
+FLUSH_INTERVAL = 0.5  # seconds between writes to disk
+TICK = struct.Struct('<cdH')
+LAYOUT_ID = struct.Struct('<H')
+MAX_LAYOUTS = 0xFFFF
+
+_TYPES = {float: 'f', int: 'i'}
+
+
+def _values_struct(types):
+    """Struct for one message's values: little-endian f32 per 'f', i32 per 'i'."""
+    return struct.Struct('<' + types)
+
+
+class Recorder:
+    """Appends ticks to a recording from a background thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+        self.pending = deque()   # (tick, results) waiting for the writer
+        self.layouts = {}        # (name, types) -> (layout id, values Struct)
+        self.skipped = set()     # names with values we cannot record (strings, blobs)
+        self.t0 = None
+        self.ticks = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self.thread.start()
+
+    def add(self, tick, results):
+        """Queue one tick's [(name, values), ...] (called from the poll loop)."""
+        self.pending.append((tick, results))
+
+    def close(self):
+        """Write everything still queued and close the file."""
+        self.stopped.set()
+        self.thread.join()
+        self.file.close()
+
+    def _run(self):
+        while not self.stopped.wait(FLUSH_INTERVAL):
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        buffer = bytearray()
+        while self.pending:
+            tick, results = self.pending.popleft()
+            self._encode(buffer, tick, results)
+        if buffer:
+            self.file.write(buffer)
+            self.file.flush()
+
+    def _layout(self, buffer, name, values):
+        types = ''.join(_TYPES.get(type(value), '?') for value in values)
+        if '?' in types:
+            if name not in self.skipped:
+                self.skipped.add(name)
+                print(f"Recorder: {name} has non-numeric values, not recorded")
+            return None
+        key = (name, types)
+        layout = self.layouts.get(key)
+        if layout is None:
+            if len(self.layouts) >= MAX_LAYOUTS:
+                return None
+            layout = self.layouts[key] = (len(self.layouts), _values_struct(types))
+            encoded_name, encoded_types = name.encode(), types.encode()
+            buffer += b'L' + LAYOUT_ID.pack(layout[0])
+            buffer += bytes([len(encoded_name)]) + encoded_name
+            buffer += bytes([len(encoded_types)]) + encoded_types
+        return layout
+
+    def _encode(self, buffer, tick, results):
+        if self.t0 is None:
+            self.t0 = tick
+        messages = []
+        for name, values in results:
+            layout = self._layout(buffer, name, values)
+            if layout is not None:
+                messages.append((layout, values))
+
+        buffer += TICK.pack(b'T', tick - self.t0, len(messages))
+        for (layout, packer), values in messages:
+            buffer += LAYOUT_ID.pack(layout)
+            try:
+                buffer += packer.pack(*values)
+            except struct.error:  # an int beyond int32, which OSC cannot send either
+                buffer += packer.pack(*(max(-0x80000000, min(0x7FFFFFFF, v)) if type(v) is int else v
+                                        for v in values))
+        self.ticks += 1
+
+
+class Recording:
+    """Memory-mapped reader for a recording."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a recording")
+
+    def ticks(self):
+        """Yield (t, [(name, values), ...]) in order; stops at a truncated last record."""
+        data = self.map
+        size = len(data)
+        layouts = {}  # id -> (name, values Struct)
+        offset = len(MAGIC)
+        try:
+            while offset < size:
+                kind = data[offset:offset + 1]
+                if kind == b'L':
+                    (layout,) = LAYOUT_ID.unpack_from(data, offset + 1)
+                    offset += 3
+                    name = data[offset + 1:offset + 1 + data[offset]].decode()
+                    offset += 1 + data[offset]
+                    types = data[offset + 1:offset + 1 + data[offset]].decode()
+                    offset += 1 + data[offset]
+                    layouts[layout] = (name, _values_struct(types))
+                elif kind == b'T':
+                    _, t, count = TICK.unpack_from(data, offset)
+                    offset += TICK.size
+                    results = []
+                    for _ in range(count):
+                        (layout,) = LAYOUT_ID.unpack_from(data, offset)
+                        name, unpacker = layouts[layout]
+                        end = offset + 2 + unpacker.size
+                        if end > size:
+                            return
+                        results.append((name, list(unpacker.unpack_from(data, offset + 2))))
+                        offset = end
+                    yield t, results
+                else:
+                    print(f"Recording {self.path}: bad record at byte {offset}, stopping")
+                    return
+        except (struct.error, IndexError, KeyError):
+            return  # truncated while recording
+
+    def close(self):
+        self.map.close()
+
+
+def replay(path, pd_address, speed=1.0, loop=False):
+    """Send a recording to PD with its original timing, 'speed' times faster."""
+    from osc_encoder import BundleEncoder
+
+    recording = Recording(path)
+    encoder = BundleEncoder(pd_address)
+    print(f"Replaying {path} to {pd_address[0]}:{pd_address[1]} at {speed}x" + (", looping" if loop else ""))
+    try:
+        while True:
+            start = time.monotonic()
+            sent = 0
+            for t, results in recording.ticks():
+                delay = start + t / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                if results:
+                    try:
+                        encoder.send(results)
+                    except ConnectionRefusedError:
+                        pass  # nothing listening on the PD port (yet)
+                sent += 1
+            print(f"Replayed {sent} ticks in {time.monotonic() - start:.1f} s")
+            if not loop:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        encoder.close()
+        recording.close()
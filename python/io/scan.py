@@ -0,0 +1,118 @@
+# scan.py
+"""
+I2C bus scan and chip detection
+Finds which addresses answer on a bus (like i2cdetect) and tells the chips we
+have drivers for apart by their registers, without writing to them:
+
+    lis3dh   0x18-0x19   WHO_AM_I (0x0F) reads 0x33
+    mpr121   0x5A-0x5D   reserved bits of the touch status and of the 10-bit
+                         filtered data registers read as 0
+    ads1x15  0x48-0x4B   config comparator bits 2-4 read 0 and the thresholds
+                         hold their power-on values (Lo 0x8000, Hi 0x7FFF or
+                         0x7FF0) or the ones io_ads1x15 writes for ALERT/RDY
+                         (0x0000, 0x8000). A conversion result with a non-zero
+                         low nibble, or Hi_thresh 0x7FFF, means ADS1115 (the
+                         ADS1015's 12-bit registers read 0 there), Hi_thresh
+                         0x7FF0 means ADS1015; otherwise it is only 'ads1x15'
+                         and is not auto-created
+
+Anything else that answers is reported as 'unknown'. Results are cached per bus
+in scan_cache.json next to this file and only probed again on request, so a
+warm start with --autocreate does not touch the bus until the drivers do.
+"""
+
+import json
+import os
+
+import buses
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'scan_cache.json')
+
+LIS3DH_ADDRESSES = (0x18, 0x19)
+MPR121_ADDRESSES = range(0x5A, 0x5E)
+ADS1X15_ADDRESSES = range(0x48, 0x4C)
+
+# Names given to auto-created peripherals (touch, touch2, ...)
+DEFAULT_NAMES = {'mpr121': 'touch', 'lis3dh': 'tilt', 'ads1015': 'adc', 'ads1115': 'adc'}
+
+
+def _read(i2c, address, register, n):
+    buffer = bytearray(n)
+    i2c.writeto_then_readfrom(address, bytes([register]), buffer)
+    return buffer
+
+
+def _is_lis3dh(i2c, address):
+    return _read(i2c, address, 0x0F, 1)[0] == 0x33
+
+
+def _is_mpr121(i2c, address):
+    data = _read(i2c, address, 0x00, 0x1E)  # touch status, out-of-range status, filtered data
+    return not data[1] & 0x60 and not any(b & 0xFC for b in data[0x05:0x1E:2])
+
+
+ADS1X15_THRESHOLDS = {(0x8000, 0x7FFF): 'ads1115', (0x8000, 0x7FF0): 'ads1015',  # power-on
+                      (0x0000, 0x8000): 'ads1x15'}                               # ALERT/RDY
+
+
+def _ads1x15(i2c, address):
+    conversion, config, lo_thresh, hi_thresh = (
+        high << 8 | low for high, low in (_read(i2c, address, register, 2) for register in range(4)))
+    chip = ADS1X15_THRESHOLDS.get((lo_thresh, hi_thresh))
+    if chip is None or config & 0x001C:  # COMP_MODE, COMP_POL, COMP_LAT are never set
+        return None
+    return 'ads1115' if conversion & 0x0F else chip
+
+
+def identify(i2c, address):
+    """Chip type at an address that answered, or None if it is not one we know."""
+    try:
+        if address in LIS3DH_ADDRESSES and _is_lis3dh(i2c, address):
+            return 'lis3dh'
+        if address in MPR121_ADDRESSES and _is_mpr121(i2c, address):
+            return 'mpr121'
+        if address in ADS1X15_ADDRESSES:
+            return _ads1x15(i2c, address)
+    except OSError:
+        pass
+    return None
+
+
+def probe(bus=None):
+    """Scan one bus. Returns [(address, type), ...] with type 'unknown' for unrecognised chips."""
+    i2c = buses.get_bus(bus)
+    while not i2c.try_lock():
+        pass
+    try:
+        return [(address, identify(i2c, address) or 'unknown') for address in i2c.scan()]
+    finally:
+        i2c.unlock()
+
+
+class ScanCache:
+    """Scan results by bus id, kept in a JSON file between runs."""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.results = {}  # bus id -> [(address, type), ...]
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+            self.results = {int(bus): [(int(a), str(t)) for a, t in found] for bus, found in saved.items()}
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+
+    def get(self, bus=None, refresh=False):
+        """Cached results for a bus, probing it (on its worker thread) if asked or never scanned."""
+        key = buses.bus_id(bus)
+        if refresh or key not in self.results:
+            self.results[key] = buses.get_worker(key).submit(probe, key).result()
+            self.save()
+        return self.results[key]
+
+    def save(self):
+        try:
+            with open(self.path, 'w') as f:
+                json.dump({str(bus): found for bus, found in sorted(self.results.items())}, f)
+        except OSError as e:
+            print(f"Could not save scan cache {self.path}: {e}")
@@ -0,0 +1,122 @@
+# scheduler.py
+"""
+Deadline Scheduler
+Keeps every peripheral on its own sample rate using absolute monotonic deadlines.
+
+Each peripheral has a next deadline on the time.monotonic() clock. After a read
+the deadline advances by exactly one period, so time spent on I2C reads never
+accumulates as drift. If the loop falls more than a period behind, the missed
+slots are counted and skipped rather than read back-to-back.
+
+Every I2C bus runs its own loop over its own peripherals (see IOManager.poll_bus),
+so due(), next_deadline() and delay() take the names to look at. Each loop only
+touches its own peripherals' schedules.
+"""
+
+import time
+
+MAX_SLEEP = 0.1  # seconds - wake at least this often to pick up new peripherals
+
+
+class Schedule:
+    """Timing state for one peripheral."""
+
+    def __init__(self, rate=None):
+        self.rate = rate        # Hz, None = follow the global poll rate
+        self.deadline = None    # next absolute deadline (time.monotonic())
+        self.missed = 0         # total deadlines skipped because we were late
+        self.reported = 0       # missed count at the last report
+
+
+class DeadlineScheduler:
+    """Tracks a Schedule per peripheral name and decides who is due."""
+
+    def __init__(self, default_rate):
+        self.default_rate = default_rate
+        self.schedules = {}  # name -> Schedule
+
+    def add(self, name, rate=None):
+        """Start scheduling a peripheral, due immediately."""
+        self.schedules[name] = Schedule(rate)
+
+    def remove(self, name):
+        self.schedules.pop(name, None)
+
+    def set_rate(self, name, rate):
+        """Set a peripheral's own rate in Hz (None or <= 0 follows the poll rate)."""
+        schedule = self.schedules[name]
+        schedule.rate = rate if rate and rate > 0 else None
+        schedule.deadline = None  # restart the phase at the new rate
+
+    def set_default_rate(self, rate):
+        """Set the global poll rate used by peripherals without their own rate."""
+        self.default_rate = rate
+        for schedule in self.schedules.values():
+            if schedule.rate is None:
+                schedule.deadline = None
+
+    def rate(self, name):
+        """Effective rate in Hz for a peripheral."""
+        schedule = self.schedules[name]
+        return schedule.rate or self.default_rate
+
+    def due(self, now=None, names=None):
+        """
+        Return (names whose deadline has passed, how late the earliest of them is)
+        and advance their deadlines. Only 'names' are looked at (None = all).
+        Deadlines move in whole periods from their previous value, never from
+        'now', so the long-run rate matches the target exactly.
+        """
+        if now is None:
+            now = time.monotonic()
+        if names is None:
+            names = list(self.schedules)
+
+        due = []
+        earliest = now
+        for name in names:
+            schedule = self.schedules.get(name)
+            if schedule is None:
+                continue
+            if schedule.deadline is None:
+                schedule.deadline = now
+            if now < schedule.deadline:
+                continue
+
+            due.append(name)
+            earliest = min(earliest, schedule.deadline)
+            period = 1.0 / (schedule.rate or self.default_rate)
+            schedule.deadline += period
+
+            # Fell behind by one or more whole periods: skip, don't burst
+            if schedule.deadline <= now:
+                skipped = int((now - schedule.deadline) / period) + 1
+                schedule.missed += skipped
+                schedule.deadline += skipped * period
+
+        return due, now - earliest
+
+    def next_deadline(self, names=None):
+        """Earliest upcoming deadline of 'names' (None = all), or None if none are scheduled."""
+        schedules = [self.schedules.get(name) for name in (list(self.schedules) if names is None else names)]
+        schedules = [schedule for schedule in schedules if schedule is not None]
+        deadlines = [s.deadline for s in schedules if s.deadline is not None]
+        if len(deadlines) < len(schedules):
+            return time.monotonic()  # a new peripheral is waiting for its first read
+        return min(deadlines) if deadlines else None
+
+    def delay(self, names=None):
+        """Seconds until the next deadline of 'names' (capped so new peripherals start promptly)."""
+        deadline = self.next_deadline(names)
+        if deadline is None:
+            return min(MAX_SLEEP, 1.0 / self.default_rate)
+        return max(0.0, min(MAX_SLEEP, deadline - time.monotonic()))
+
+    def take_missed(self):
+        """Return {name: count} of deadlines missed since the last call."""
+        missed = {}
+        for name, schedule in self.schedules.items():
+            if schedule.missed > schedule.reported:
+                missed[name] = schedule.missed - schedule.reported
+                schedule.reported = schedule.missed
+        return missed
@@ -0,0 +1,392 @@
+# sim_i2c.py
+"""
+Simulated I2C bus and sensors for running io/main.py without hardware
+
+Register-level stand-ins for the MPR121, ADS1015/ADS1115 and LIS3DH sit behind
+a fake busio.I2C, so the real Adafruit drivers (and our io_*.py modules) run
+unchanged on a laptop. Each transaction sleeps for as long as it would take on
+a real bus at the chosen clock, so timings are comparable to a Pi.
+
+Usage:
+    import sim_i2c
+    sim_i2c.install(frequency=400_000)                   # before anything imports board/busio
+    touch = sim_i2c.add_device(sim_i2c.SimMPR121(0x5A))  # bus 1
+    sim_i2c.add_device(sim_i2c.SimLIS3DH(0x19), bus=3)
+    sim_i2c.connect_irq(touch, 17)                       # touch.touch(n) fires GPIO17 (gpio.py)
+
+The Adafruit MPR121/ADS1x15 libraries still need to be installed
+(pip install -r ../requirements-laptop.txt); PiicoDev is replaced by a shim.
+"""
+
+import collections
+import math
+import struct
+import sys
+import threading
+import time
+import types
+
+TRANSACTION_OVERHEAD = 0.00005  # seconds of driver/syscall time per transaction
+
+_buses = {}  # bus id -> SimI2C
+
+
+class SimI2C:
+    """Fake busio.I2C: routes transactions to simulated devices and sleeps like a real bus."""
+
+    def __init__(self, frequency=100_000):
+        self.frequency = frequency
+        self.devices = {}  # address -> SimDevice
+        self.transactions = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def _wait(self, nbytes):
+        """Address byte + payload, 9 clocks per byte (8 data + ACK)."""
+        self.transactions += 1
+        self.bytes += nbytes
+        time.sleep(TRANSACTION_OVERHEAD + (nbytes + 1) * 9 / self.frequency)
+
+    def _device(self, address):
+        device = self.devices.get(address)
+        if device is None:
+            raise OSError(121, "Remote I/O error")  # what Linux i2c-dev raises on NACK
+        return device
+
+    # --- busio.I2C interface used by adafruit_bus_device ---
+    def try_lock(self):
+        return self._lock.acquire(blocking=False)
+
+    def unlock(self):
+        self._lock.release()
+
+    def scan(self):
+        self._wait(len(self.devices))
+        return sorted(self.devices)
+
+    def writeto(self, address, buffer, *, start=0, end=None):
+        data = bytes(buffer[start:end])
+        self._wait(len(data))
+        self._device(address).write(data)
+
+    def readfrom_into(self, address, buffer, *, start=0, end=None):
+        end = len(buffer) if end is None else end
+        self._wait(end - start)
+        buffer[start:end] = self._device(address).read(end - start)
+
+    def writeto_then_readfrom(self, address, buffer_out, buffer_in, *,
+                              out_start=0, out_end=None, in_start=0, in_end=None):
+        data = bytes(buffer_out[out_start:out_end])
+        in_end = len(buffer_in) if in_end is None else in_end
+        self._wait(len(data) + in_end - in_start)
+        device = self._device(address)
+        device.write(data)
+        buffer_in[in_start:in_end] = device.read(in_end - in_start)
+
+    def deinit(self):
+        pass
+
+
+class SimDevice:
+    """256 byte-wide registers with a register pointer that auto-increments."""
+
+    def __init__(self, address):
+        self.address = address
+        self.regs = bytearray(256)
+        self.pointer = 0
+        self.started = time.monotonic()
+
+    def write(self, data):
+        if not data:
+            return
+        self.pointer = data[0]
+        for value in data[1:]:
+            self.on_write(self.pointer, value)
+            self.pointer = (self.pointer + 1) & 0xFF
+
+    def read(self, n):
+        self.on_read(self.pointer)
+        out = bytearray(n)
+        for i in range(n):
+            out[i] = self.regs[self.pointer]
+            self.pointer = (self.pointer + 1) & 0xFF
+        return out
+
+    def on_write(self, reg, value):
+        self.regs[reg] = value
+
+    def on_read(self, reg):
+        """Refresh live registers before a read starting at 'reg'."""
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+
+class SimMPR121(SimDevice):
+    """MPR121: 12 electrodes drifting around a baseline, touchable from code."""
+
+    def __init__(self, address=0x5A):
+        super().__init__(address)
+        self.touched = 0  # bitmask of electrodes held "touched"
+        self.irq = None   # called when touch status changes (see connect_irq)
+        self._reset()
+
+    def _reset(self):
+        self.regs[:] = bytes(256)
+        self.regs[0x5C] = 0x10
+        self.regs[0x5D] = 0x24  # CONFIG2 reset value, checked by adafruit_mpr121.reset()
+
+    def touch(self, electrode, on=True):
+        before = self.touched
+        if on:
+            self.touched |= 1 << electrode
+        else:
+            self.touched &= ~(1 << electrode)
+        if self.touched != before and self.irq is not None:
+            self.irq()
+
+    def on_write(self, reg, value):
+        if reg == 0x80 and value == 0x63:
+            self._reset()
+        else:
+            self.regs[reg] = value
+
+    def on_read(self, reg):
+        if reg > 0x2A:
+            return
+        t = self.elapsed()
+        status = self.touched & 0x0FFF
+        self.regs[0x00] = status & 0xFF
+        self.regs[0x01] = status >> 8
+        for i in range(12):
+            baseline = 600 + 20 * i
+            value = baseline + int(6 * math.sin(t * (1 + i * 0.1)))
+            if self.touched & (1 << i):
+                value -= 120
+            struct.pack_into('<H', self.regs, 0x04 + 2 * i, value & 0x3FF)
+            self.regs[0x1E + i] = baseline >> 2
+
+
+class SimADS1x15(SimDevice):
+    """ADS1015/ADS1115: 16-bit registers behind a pointer, timed conversions."""
+
+    RATES = {12: (128, 250, 490, 920, 1600, 2400, 3300, 3300),
+             16: (8, 16, 32, 64, 128, 250, 475, 860)}
+    FSR = (6.144, 4.096, 2.048, 1.024, 0.512, 0.256, 0.256, 0.256)
+
+    def __init__(self, address=0x48, bits=16):
+        super().__init__(address)
+        self.bits = bits
+        self.words = {0: 0, 1: 0x8583, 2: 0x8000, 3: 0x7FFF if bits == 16 else 0x7FF0}
+        self.converting_until = 0.0
+
+    def write(self, data):
+        if not data:
+            return
+        self.pointer = data[0] & 0x03
+        if len(data) >= 3:
+            value = data[1] << 8 | data[2]
+            if self.bits == 12 and self.pointer >= 2:
+                value &= ~0x0F  # 12-bit thresholds, low nibble reads 0
+            self.words[self.pointer] = value
+            if self.pointer == 1 and (value & 0x8000 or not value & 0x0100):
+                self._start(value)
+
+    def _start(self, config):
+        rate = self.RATES[self.bits][(config >> 5) & 0x07]
+        self.converting_until = time.monotonic() + 1.0 / rate
+        self.words[1] = config & 0x7FFF  # OS reads 0 while converting
+
+    def read(self, n):
+        config = self.words[1]
+        now = time.monotonic()
+        if now >= self.converting_until and self.converting_until:
+            self._convert(config)
+            if config & 0x0100:  # single-shot: done until restarted
+                self.converting_until = 0.0
+                self.words[1] = config | 0x8000
+            else:
+                self._start(config)
+        value = self.words[self.pointer]
+        return bytearray([value >> 8, value & 0xFF, 0, 0][:n])
+
+    def _convert(self, config):
+        channel = (config >> 12) & 0x03
+        fsr = self.FSR[(config >> 9) & 0x07]
+        volts = 1.65 + 1.5 * math.sin(self.elapsed() * (0.5 + channel))
+        raw = max(-32768, min(32767, int(volts / fsr * 32768)))
+        if self.bits == 12:
+            raw &= ~0x0F
+        self.words[0] = raw & 0xFFFF
+
+
+class SimLIS3DH(SimDevice):
+    """LIS3DH: WHO_AM_I, control registers, a 32-sample FIFO and a slowly rocking acceleration vector."""
+
+    ODR = {0x1: 1, 0x2: 10, 0x3: 25, 0x4: 50, 0x5: 100, 0x6: 200, 0x7: 400, 0x9: 1344}
+    FIFO_SIZE = 32
+
+    def __init__(self, address=0x19):
+        super().__init__(address)
+        self.increment = False
+        self.regs[0x0F] = 0x33  # WHO_AM_I
+        self.regs[0x20] = 0x07
+        self.fifo = collections.deque(maxlen=self.FIFO_SIZE)
+        self.overrun = False
+        self.next_sample = None  # time of the next sample pushed into the FIFO
+
+    def write(self, data):
+        # Sub-address MSB set = auto-increment; otherwise the pointer stays put
+        if not data:
+            return
+        self.increment = bool(data[0] & 0x80)
+        self.pointer = data[0] & 0x7F
+        for value in data[1:]:
+            self.on_write(self.pointer, value)
+            if self.increment:
+                self.pointer = (self.pointer + 1) & 0x7F
+
+    def on_write(self, reg, value):
+        self.regs[reg] = value
+        if reg == 0x2E and value >> 6 == 0:  # bypass mode empties the FIFO
+            self.fifo.clear()
+            self.overrun = False
+            self.next_sample = None
+
+    def streaming(self):
+        return self.regs[0x24] & 0x40 and self.regs[0x2E] >> 6 == 0b10
+
+    def _fill(self):
+        """Push the samples the chip would have taken since the last fill."""
+        now = time.monotonic()
+        period = 1.0 / self.ODR.get(self.regs[0x20] >> 4, 400)
+        if self.next_sample is None:
+            self.next_sample = now
+        if now - self.next_sample > self.FIFO_SIZE * period:  # long gap: only the last 32 survive
+            self.overrun = True
+            self.next_sample = now - (self.FIFO_SIZE - 1) * period
+        while self.next_sample <= now:
+            if len(self.fifo) == self.FIFO_SIZE:
+                self.overrun = True
+            self.fifo.append(self.sample(self.next_sample - self.started))
+            self.next_sample += period
+
+    def read(self, n):
+        if self.streaming() and self.increment and self.pointer == 0x28:
+            # Burst reads roll over from OUT_Z_H back to OUT_X_L, popping one sample per 6 bytes
+            self._fill()
+            out = bytearray()
+            while len(out) < n:
+                x, y, z = self.fifo.popleft() if self.fifo else self.sample()
+                out += struct.pack('<hhh', *(int(v * 16000) for v in (x, y, z)))
+            self.overrun = False
+            return out[:n]
+        self.on_read(self.pointer)
+        out = bytearray(n)
+        for i in range(n):
+            out[i] = self.regs[self.pointer]
+            if self.increment:
+                self.pointer = (self.pointer + 1) & 0x7F
+        return out
+
+    def sample(self, t=None):
+        """Acceleration in g at time t."""
+        t = self.elapsed() if t is None else t
+        return (0.3 * math.sin(t), 0.3 * math.cos(t * 0.7), 0.9)
+
+    def on_read(self, reg):
+        if 0x28 <= reg <= 0x2D:
+            x, y, z = self.sample()
+            struct.pack_into('<hhh', self.regs, 0x28, *(int(v * 16000) for v in (x, y, z)))
+        elif reg == 0x2F and self.streaming():
+            self._fill()
+            count = len(self.fifo)
+            self.regs[0x2F] = (0x40 if self.overrun else 0) | (0x20 if not count else 0) | (count & 0x1F)
+
+
+class _PiicoDevI2C:
+    """The slice of PiicoDev_Unified's I2C object that drivers use."""
+
+    def __init__(self, bus):
+        self.bus = bus
+
+    def readfrom_mem(self, address, register, n):
+        buffer = bytearray(n)
+        self.bus.writeto_then_readfrom(address, bytes([register]), buffer)
+        return list(buffer)  # like PiicoDev_Unified on Linux
+
+    def writeto_mem(self, address, register, data):
+        self.bus.writeto(address, bytes([register]) + bytes(data))
+
+
+class PiicoDev_LIS3DH:
+    """Stand-in for PiicoDev_LIS3DH backed by a simulated bus."""
+
+    def __init__(self, bus=None, address=0x19, **kwargs):
+        self.address = address
+        self.i2c = _PiicoDevI2C(get_bus(bus))
+        if self.i2c.readfrom_mem(address, 0x0F, 1)[0] != 0x33:
+            raise OSError(f"No LIS3DH at 0x{address:02X}")
+        self.i2c.writeto_mem(address, 0x20, bytes([0x77]))  # 400 Hz, XYZ on
+        self.i2c.writeto_mem(address, 0x23, bytes([0x88]))  # BDU, high resolution
+
+    @property
+    def acceleration(self):
+        x, y, z = struct.unpack('<hhh', bytes(self.i2c.readfrom_mem(self.address, 0x28 | 0x80, 6)))
+        return x / 16000, y / 16000, z / 16000
+
+    @property
+    def angle(self):
+        x, y, z = self.acceleration
+        return (math.degrees(math.atan2(y, z)),
+                math.degrees(math.atan2(z, x)),
+                math.degrees(math.atan2(x, y)))
+
+
+def get_bus(bus=None):
+    bus = 1 if bus is None else int(bus)
+    if bus not in _buses:
+        _buses[bus] = SimI2C(_frequency)
+    return _buses[bus]
+
+
+def add_device(device, bus=1):
+    """Attach a simulated device to a bus."""
+    get_bus(bus).devices[device.address] = device
+    return device
+
+
+_frequency = 100_000
+
+
+def connect_irq(device, pin):
+    """Wire a simulated device's interrupt output to a fake GPIO (gpio.fake_edge)."""
+    import gpio
+    device.irq = gpio.fake_edge(pin).fire
+    return device
+
+
+def install(frequency=100_000):
+    """
+    Put fake board, busio, adafruit_extended_bus and PiicoDev_LIS3DH modules in
+    sys.modules so the io drivers open simulated buses. Call before creating
+    any peripheral.
+    """
+    global _frequency
+    _frequency = frequency
+
+    board = types.ModuleType('board')
+    board.SCL, board.SDA = 'SCL', 'SDA'
+    busio = types.ModuleType('busio')
+    busio.I2C = lambda scl, sda, frequency=None: get_bus(1)
+    extended = types.ModuleType('adafruit_extended_bus')
+    extended.ExtendedI2C = lambda bus, frequency=None: get_bus(bus)
+    piicodev = types.ModuleType('PiicoDev_LIS3DH')
+    piicodev.PiicoDev_LIS3DH = PiicoDev_LIS3DH
+
+    sys.modules.update({
+        'board': board,
+        'busio': busio,
+        'adafruit_extended_bus': extended,
+        'PiicoDev_LIS3DH': piicodev,
+    })
@@ -0,0 +1,139 @@
+# stats.py
+"""
+Hot-path timing statistics for IOManager
+Cheap enough to leave on: recording a sample is two clock reads and a bisect
+into fixed log-spaced histogram buckets. Percentiles are read off the buckets
+(to within ~12%) only when a report is requested.
+"""
+
+import time
+from bisect import bisect_left
+
+# Bucket upper bounds in seconds: 10 us .. ~10 s, 12% apart
+BOUNDS = []
+_bound = 0.00001
+while _bound < 10.0:
+    BOUNDS.append(_bound)
+    _bound *= 1.12
+BOUNDS.append(float('inf'))
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with p50/p95/p99/max."""
+
+    def __init__(self):
+        self.counts = [0] * len(BOUNDS)
+        self.total = 0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect_left(BOUNDS, seconds)] += 1
+        self.total += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (seconds)."""
+        if not self.total:
+            return 0.0
+        target = self.total * p / 100.0
+        seen = 0
+        for bound, count in zip(BOUNDS, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def summary_ms(self):
+        """[p50, p95, p99, max] in milliseconds."""
+        return [round(self.percentile(p) * 1000, 3) for p in (50, 95, 99)] + [round(self.max * 1000, 3)]
+
+
+class PeripheralStats:
+    """Read latency, read count and errors for one peripheral."""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+
+
+class IOStats:
+    """Everything IOManager measures between two reports."""
+
+    def __init__(self):
+        # Fleet telemetry keeps its own window so /stats replies don't disturb it
+        self.reads_total = 0
+        self.errors_total = 0
+        self.telemetry_jitter = LatencyHistogram()
+        self.reset()
+
+    def reset(self):
+        """Start a new measurement window."""
+        self.peripherals = {}  # name -> PeripheralStats
+        self.jitter = LatencyHistogram()   # how late a bus loop woke for a deadline
+        self.rounds = LatencyHistogram()   # one bus loop's reads, submit to result (bench.py)
+        self.send = LatencyHistogram()     # time spent in the OSC send
+        self.send_errors = 0
+        self.since = time.monotonic()
+
+    def _get(self, name):
+        stats = self.peripherals.get(name)
+        if stats is None:
+            stats = self.peripherals[name] = PeripheralStats()
+        return stats
+
+    def record_read(self, name, seconds):
+        self._get(name).latency.record(seconds)
+        self.reads_total += 1
+
+    def record_error(self, name):
+        self._get(name).errors += 1
+        self.errors_total += 1
+
+    def record_jitter(self, seconds):
+        seconds = max(0.0, seconds)
+        self.jitter.record(seconds)
+        self.telemetry_jitter.record(seconds)
+
+    def take_telemetry(self):
+        """(reads so far, errors so far, jitter p99 ms, jitter max ms) and start a new jitter window."""
+        jitter = self.telemetry_jitter.summary_ms()
+        self.telemetry_jitter = LatencyHistogram()
+        return self.reads_total, self.errors_total, jitter[2], jitter[3]
+
+    def record_round(self, seconds):
+        self.rounds.record(seconds)
+
+    def record_send(self, seconds):
+        self.send.record(seconds)
+
+    def forget(self, name):
+        self.peripherals.pop(name, None)
+
+    def report(self, target_rates, missed):
+        """
+        Summarise the window since the last report and start a new one.
+
+        Args:
+            target_rates: {name: target Hz}
+            missed: {name: total deadlines missed}
+        Returns: (per_peripheral, loop)
+            per_peripheral: {name: [target Hz, achieved Hz, p50, p95, p99, max (ms), errors, missed]}
+            loop: [jitter p50, p99, max (ms), send p50, p99, max (ms), send errors]
+        """
+        now = time.monotonic()
+        elapsed = max(now - self.since, 1e-6)
+
+        per_peripheral = {}
+        for name, target in target_rates.items():
+            stats = self._get(name)
+            achieved = round(stats.latency.total / elapsed, 2)
+            per_peripheral[name] = ([float(target), achieved] + stats.latency.summary_ms()
+                                    + [stats.errors, missed.get(name, 0)])
+
+        jitter = self.jitter.summary_ms()
+        send = self.send.summary_ms()
+        loop = [jitter[0], jitter[2], jitter[3], send[0], send[2], send[3], self.send_errors]
+
+        self.reset()
+        return per_peripheral, loop
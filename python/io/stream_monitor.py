@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Stream Monitor
+Receives the io bridge's sensor bundles in place of Pure Data and reports packet
+loss and timing jitter. Turn on timetagged bundles first ([timetag 1( in PD, or
+/io/timetag 1) so bundles carry /io/seq and sample-time timetags.
+
+Usage:
+    python stream_monitor.py                 # listen on 6662 (stop PD first)
+    python stream_monitor.py --port 6662 --interval 5
+
+Every interval it prints:
+    bundles   received, lost (gaps in /io/seq), out of order
+    latency   arrival - timetag in ms (p50/p99/max); only absolute on the same
+              machine or with synced clocks
+    jitter    p99 - p50 of that latency, which does not depend on clock offset
+    per peripheral: messages/s, interval p50/p99 between its timetags, and the
+              read-finish offset (last value of each message) p50/p99
+"""
+
+import argparse
+import socket
+import time
+
+from pyOSC3 import decodeOSC
+
+PD_PORT = 6662
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100.0))]
+
+
+class StreamStats:
+    """Loss and jitter for one reporting window."""
+
+    def __init__(self):
+        self.last_seq = None
+        self.last_times = {}  # peripheral -> timetag of its previous message
+        self.reset()
+
+    def reset(self):
+        self.since = time.time()
+        self.received = 0
+        self.lost = 0
+        self.out_of_order = 0
+        self.untagged = 0
+        self.latency = []      # ms
+        self.counts = {}       # peripheral -> messages
+        self.intervals = {}    # peripheral -> [ms between timetags]
+        self.read_offsets = {}  # peripheral -> [ms]
+
+    def add(self, decoded, arrival):
+        if not decoded or decoded[0] != '#bundle':
+            return
+        self.received += 1
+        timetag = decoded[1]
+        messages = decoded[2:]
+        if timetag <= 0 or not messages or messages[0][0] != '/io/seq':
+            self.untagged += 1
+            return
+
+        seq = messages[0][2]
+        if self.last_seq is not None:
+            if seq > self.last_seq + 1:
+                self.lost += seq - self.last_seq - 1
+            elif seq <= self.last_seq:
+                self.out_of_order += 1
+        if self.last_seq is None or seq > self.last_seq:
+            self.last_seq = seq
+        self.latency.append((arrival - timetag) * 1000)
+
+        for message in messages[1:]:
+            name = message[0].lstrip('/')
+            self.counts[name] = self.counts.get(name, 0) + 1
+            if len(message) > 2 and isinstance(message[-1], float):
+                self.read_offsets.setdefault(name, []).append(message[-1])
+            previous = self.last_times.get(name)
+            if previous is not None and timetag > previous:
+                self.intervals.setdefault(name, []).append((timetag - previous) * 1000)
+            self.last_times[name] = timetag
+
+    def report(self):
+        elapsed = max(time.time() - self.since, 1e-6)
+        expected = self.received - self.untagged + self.lost
+        loss = 100.0 * self.lost / expected if expected else 0.0
+        print(f"\n{time.strftime('%H:%M:%S')}  {self.received} bundles, {self.lost} lost ({loss:.2f}%), "
+              f"{self.out_of_order} out of order" + (f", {self.untagged} without timetag" if self.untagged else ""))
+        if self.latency:
+            p50, p99 = percentile(self.latency, 50), percentile(self.latency, 99)
+            print(f"  latency p50 {p50:.3f}  p99 {p99:.3f}  max {max(self.latency):.3f} ms   "
+                  f"jitter {p99 - p50:.3f} ms")
+        for name in sorted(self.counts):
+            intervals = self.intervals.get(name, [])
+            offsets = self.read_offsets.get(name, [])
+            print(f"  {name:<12} {self.counts[name] / elapsed:8.1f}/s  "
+                  f"interval p50 {percentile(intervals, 50):7.3f} p99 {percentile(intervals, 99):7.3f} ms  "
+                  f"read at +{percentile(offsets, 50):.3f} / +{percentile(offsets, 99):.3f} ms")
+        self.reset()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report loss and jitter of the io sensor stream")
+    parser.add_argument("--port", type=int, default=PD_PORT, help="UDP port to listen on")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between reports")
+    args = parser.parse_args()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("0.0.0.0", args.port))
+    sock.settimeout(0.5)
+    print(f"Listening on UDP {args.port}, reporting every {args.interval} s (Ctrl+C to quit)")
+
+    stats = StreamStats()
+    next_report = time.monotonic() + args.interval
+    try:
+        while True:
+            try:
+                data = sock.recv(65536)
+                stats.add(decodeOSC(data), time.time())
+            except socket.timeout:
+                pass
+            except Exception as e:
+                print(f"Bad packet: {e}")
+            if time.monotonic() >= next_report:
+                next_report += args.interval
+                stats.report()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
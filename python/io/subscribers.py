@@ -0,0 +1,180 @@
+# subscribers.py
+"""
+Extra receivers for the sensor stream
+PD on localhost always gets every bundle first, straight from the loop.
+Dashboards and recorders elsewhere subscribe for a copy:
+    /subscribe <host> <port> [rate] [peripheral...]
+    /unsubscribe [<host> <port>]            (no arguments: everyone)
+
+Each tick's elements are encoded once, for PD, and the same bytes are
+handed to a sender thread through a short queue that drops the oldest tick
+when full, so a slow or unreachable subscriber never holds up the loop.
+Per subscriber the thread keeps the newest element of each wanted peripheral
+and sends them as one bundle at most 'rate' times a second (0 = every tick),
+so a 2 Hz dashboard still sees the latest value of a deadbanded sensor that
+only changed between its sends. /io/seq always goes along.
+
+A subscription lasts SUBSCRIBER_TTL seconds; send /subscribe again to renew
+it, or it expires. /stats adds /io/stats/subscribers with the number of
+subscribers, bundles sent to them and ticks dropped because the sender thread
+fell QUEUE_TICKS behind.
+"""
+
+import socket
+import threading
+import time
+from collections import deque
+
+from osc_encoder import BUNDLE_HEADER, TIMETAG_OFFSET
+
+SUBSCRIBER_TTL = 60.0   # seconds a subscription lasts without being renewed
+MAX_SUBSCRIBERS = 8
+QUEUE_TICKS = 64        # ticks waiting for the sender thread before the oldest are dropped
+ALWAYS_SENT = ('io/seq',)
+
+
+class Subscriber:
+    def __init__(self, host, port, rate=0.0, names=(), now=None):
+        self.host = host
+        self.port = port
+        self.address = None       # (ip, port), resolved on the sender thread
+        self.renew(rate, names, now)
+        self.pending = {}         # name -> newest element bytes not sent yet
+        self.header = None        # timetag bytes of the newest pending tick
+        self.next_send = 0.0
+        self.sent = 0             # bundles
+
+    def renew(self, rate, names, now=None):
+        self.rate = max(0.0, float(rate))
+        self.names = set(names)   # empty = every peripheral
+        self.expires = (now if now is not None else time.monotonic()) + SUBSCRIBER_TTL
+
+    def wants(self, name):
+        return not self.names or name in self.names or name in ALWAYS_SENT
+
+
+class Subscribers:
+    """Subscriber list plus the thread that sends to them."""
+
+    def __init__(self):
+        self.subscribers = {}     # (host, port) -> Subscriber
+        self.ticks = deque(maxlen=QUEUE_TICKS)
+        self.dropped = 0          # ticks pushed out of the full queue
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+        self.sock = None
+        self.thread = None
+
+    @property
+    def active(self):
+        return bool(self.subscribers)
+
+    def subscribe(self, host, port, rate=0.0, names=()):
+        """Add or renew a subscriber. Returns False if the list is full."""
+        key = (str(host), int(port))
+        with self.lock:
+            subscriber = self.subscribers.get(key)
+            if subscriber is not None:
+                subscriber.renew(rate, names)
+            elif len(self.subscribers) >= MAX_SUBSCRIBERS:
+                return False
+            else:
+                self.subscribers[key] = Subscriber(key[0], key[1], rate, names)
+        if self.thread is None:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.thread = threading.Thread(target=self._run, name="subscribers", daemon=True)
+            self.thread.start()
+        return True
+
+    def unsubscribe(self, host=None, port=None):
+        """Remove one subscriber, or all of them. Returns how many were removed."""
+        with self.lock:
+            if host is None:
+                removed = len(self.subscribers)
+                self.subscribers.clear()
+            else:
+                removed = 1 if self.subscribers.pop((str(host), int(port)), None) else 0
+        return removed
+
+    def stats(self):
+        """[subscribers, bundles sent, ticks dropped]"""
+        with self.lock:
+            return [len(self.subscribers), sum(s.sent for s in self.subscribers.values()), self.dropped]
+
+    def listing(self):
+        """[(host, port, rate, [names]), ...]"""
+        with self.lock:
+            return [(s.host, s.port, s.rate, sorted(s.names)) for s in self.subscribers.values()]
+
+    def publish(self, bundle, elements):
+        """
+        Queue one tick for the subscribers (called from the loop right after
+        the PD send). bundle is the encoded bundle, elements its
+        (name, start, end) list from BundleEncoder.encode.
+        """
+        if len(self.ticks) == self.ticks.maxlen:
+            self.dropped += 1
+        header = bytes(bundle[TIMETAG_OFFSET:len(BUNDLE_HEADER)])  # timetag
+        self.ticks.append((header, [(name, bytes(bundle[start:end])) for name, start, end in elements]))
+        self.wake.set()
+
+    def _run(self):
+        timeout = 1.0
+        while not self.stopped.is_set():
+            self.wake.wait(timeout)
+            self.wake.clear()
+            if self.stopped.is_set():
+                break
+            now = time.monotonic()
+            with self.lock:
+                for key in [k for k, s in self.subscribers.items() if now > s.expires]:
+                    print(f"Subscriber {key[0]}:{key[1]} expired")
+                    del self.subscribers[key]
+                subscribers = list(self.subscribers.values())
+            while self.ticks:
+                header, elements = self.ticks.popleft()
+                for subscriber in subscribers:
+                    for name, element in elements:
+                        if subscriber.wants(name):
+                            subscriber.pending[name] = element
+                    subscriber.header = header
+            timeout = 1.0  # expiry check
+            for subscriber in subscribers:
+                if subscriber.pending and now >= subscriber.next_send:
+                    self._send(subscriber, now)
+                if subscriber.pending:
+                    timeout = min(timeout, max(0.001, subscriber.next_send - now))
+
+    def _send(self, subscriber, now):
+        if subscriber.address is None:
+            try:
+                subscriber.address = (socket.gethostbyname(subscriber.host), subscriber.port)
+            except OSError as e:
+                print(f"Subscriber {subscriber.host}:{subscriber.port} not found: {e}")
+                subscriber.expires = 0  # dropped on the next pass
+                subscriber.pending.clear()
+                return
+        data = (BUNDLE_HEADER[:TIMETAG_OFFSET] + subscriber.header
+                + b''.join(subscriber.pending.values()))
+        subscriber.pending.clear()
+        if subscriber.rate:
+            # keep the rhythm, but start a new one rather than burst to catch up after a stall
+            period = 1.0 / subscriber.rate
+            subscriber.next_send += period
+            if subscriber.next_send <= now:
+                subscriber.next_send = now + period
+        try:
+            self.sock.sendto(data, subscriber.address)
+            subscriber.sent += 1
+        except OSError as e:
+            print(f"Error sending to subscriber {subscriber.host}:{subscriber.port}: {e}")
+
+    def close(self):
+        """Stop the sender thread and close its socket."""
+        self.stopped.set()
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)  # a host lookup in progress can outlast this; it is a daemon
+        if self.sock is not None:
+            self.sock.close()
@@ -0,0 +1,137 @@
+# jobs.py
+"""
+Background jobs for helper.py
+Long admin commands (git clone/pull, sample downloads, updates) run here
+instead of in the OSC handler, so the helper keeps answering - /shutdown
+included - while they work.
+
+Jobs run one at a time in the order they were queued, so two git operations
+or scripts never overlap. At most MAX_QUEUED jobs wait; further requests are
+refused. Queuing the same command with the same arguments while it is still
+waiting or running returns the existing job instead of a second one.
+
+PD is told about every job on the helper's reply port:
+    /job <id> <name> queued
+    /job <id> <name> running
+    /job <id> <name> progress <text>      (from jobs.progress() inside the job)
+    /job <id> <name> done
+    /job <id> <name> failed [error]
+    /job 0 <name> refused queue full
+and /jobs replies /jobs <id> <name> <state> ... for every waiting or running job.
+
+A job fails if it raises or returns False.
+"""
+
+import itertools
+import threading
+import time
+import traceback
+from collections import deque
+
+MAX_QUEUED = 8  # jobs waiting to run
+
+_current = threading.local()
+
+
+class Job:
+    def __init__(self, job_id, name, function, key):
+        self.id = job_id
+        self.name = name
+        self.function = function         # called with no arguments
+        self.key = key                   # jobs with the same key are not queued twice
+        self.state = 'queued'
+        self.detail = ''
+        self.started_at = None
+        self.finished_at = None
+        self.watchers = []               # on_done(job) callbacks
+
+
+class JobQueue:
+    """Bounded queue of jobs run by one worker thread."""
+
+    def __init__(self, send, max_queued=MAX_QUEUED):
+        self.send = send                 # send(address, values) to PD
+        self.max_queued = max_queued
+        self.queue = deque()
+        self.running = None              # Job being run
+        self.ids = itertools.count(1)
+        self.lock = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="jobs", daemon=True)
+        self.thread.start()
+
+    def submit(self, name, function, key=None, on_done=None):
+        """
+        Queue function(). on_done(job) is called from the worker thread once
+        it has finished (also when this turns out to be a repeat of a waiting
+        or running job). Returns the job id, or None if the queue is full.
+        """
+        with self.lock:
+            for job in itertools.chain([self.running] if self.running else [], self.queue):
+                if key is not None and job.key == key:
+                    print(f"Job {job.id} ({name}) is already {job.state}")
+                    if on_done:
+                        job.watchers.append(on_done)
+                    self._notify(job)
+                    return job.id
+            if len(self.queue) >= self.max_queued:
+                print(f"Job queue full, refusing {name}")
+                self.send("/job", [0, name, 'refused', 'queue full'])
+                return None
+            job = Job(next(self.ids), name, function, key)
+            if on_done:
+                job.watchers.append(on_done)
+            self.queue.append(job)
+            self.lock.notify()
+        print(f"Job {job.id} ({name}) queued")
+        self._notify(job)
+        return job.id
+
+    def jobs(self):
+        """Running and waiting jobs, oldest first."""
+        with self.lock:
+            return ([self.running] if self.running else []) + list(self.queue)
+
+    def _notify(self, job):
+        values = [job.id, job.name, job.state]
+        if job.detail:
+            values.append(job.detail)
+        self.send("/job", values)
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while not self.queue:
+                    self.lock.wait()
+                job = self.running = self.queue.popleft()
+            job.state = 'running'
+            job.started_at = time.time()
+            self._notify(job)
+            _current.job, _current.queue = job, self
+            try:
+                ok = job.function() is not False
+                job.state, job.detail = ('done' if ok else 'failed'), ''
+            except Exception as e:
+                traceback.print_exc()
+                job.state, job.detail = 'failed', str(e)
+            finally:
+                _current.job = None
+            job.finished_at = time.time()
+            print(f"Job {job.id} ({job.name}) {job.state} after {job.finished_at - job.started_at:.1f} s")
+            self._notify(job)
+            with self.lock:
+                self.running = None
+                watchers, job.watchers = job.watchers, []
+            for on_done in watchers:
+                try:
+                    on_done(job)
+                except Exception:
+                    traceback.print_exc()
+
+
+def progress(text):
+    """Report progress of the job running on this thread to PD (no-op outside a job)."""
+    job = getattr(_current, 'job', None)
+    if job is None:
+        return
+    job.detail = str(text)
+    _current.queue.send("/job", [job.id, job.name, 'progress', job.detail])
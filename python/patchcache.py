@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# patchcache.py
+"""
+LAN patch cache
+One node (the laptop or any Pi) keeps mirrors of the patch repos and serves
+them to the fleet, so /addpatch, /patch and /pullpatch on twenty Pis fetch
+from GitHub once instead of twenty times.
+
+Cache node:
+    python patchcache.py serve [--dir ~/patch-cache] [--port 8766]
+serves
+    GET /refresh/github.com/<user>/<repo>   mirror the repo (and its submodules)
+                                            or update the mirror, then reply 200
+    GET /github.com/<user>/<repo>[.git]/... the mirror over git's plain HTTP protocol
+A mirror updated less than REFRESH_INTERVAL seconds ago is not fetched again,
+so a whole fleet asking at once costs one GitHub fetch. If GitHub cannot be
+reached the existing mirror is served as it is.
+
+Pis: put the cache URL in patches/patch_cache.txt, e.g.
+    http://10.0.0.5:8766
+clone(), pull() and ls_remote() then ask the cache to refresh and run git with
+url.<cache>/github.com/.insteadOf=https://github.com/, which sends submodules
+through the cache too. If the cache is not set, unreachable or fails, the
+same command runs against GitHub.
+
+    python patchcache.py clone https://github.com/user/repo.git patches/repo
+    python patchcache.py pull patches/repo
+    python patchcache.py mirror https://github.com/user/repo.git   # on the cache node
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote
+from urllib.request import urlopen
+
+CACHE_PORT = 8766
+CACHE_DIR = os.path.expanduser('~/patch-cache')
+CACHE_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../patches/patch_cache.txt')
+GITHUB = 'https://github.com/'
+REFRESH_INTERVAL = 30   # seconds a mirror counts as fresh
+REFRESH_TIMEOUT = 300   # seconds a client waits for the cache to mirror a repo
+GIT_TIMEOUT = 120       # seconds per git command
+
+
+def _git(args, cwd=None, timeout=GIT_TIMEOUT, config=None):
+    """Run git. Returns a CompletedProcess (returncode -1 on timeout or missing git)."""
+    command = ['git']
+    for key, value in (config or {}).items():
+        command += ['-c', f'{key}={value}']
+    try:
+        return subprocess.run(command + list(args), cwd=cwd, stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE, timeout=timeout)
+    except (subprocess.TimeoutExpired, OSError) as e:
+        return subprocess.CompletedProcess(command + list(args), -1, b'', str(e).encode())
+
+
+def _error(result):
+    """The most useful line of a failed git command's stderr."""
+    lines = result.stderr.decode(errors='replace').strip().splitlines()
+    for line in lines:
+        if line.startswith(('fatal:', 'error:')):
+            return line
+    return lines[-1] if lines else f"git exited with {result.returncode}"
+
+
+def repo_path(url):
+    """'https://github.com/user/repo.git' -> 'github.com/user/repo', or None for other hosts."""
+    if not url.startswith(GITHUB):
+        return None
+    parts = url[len(GITHUB):].rstrip('/').split('/')
+    if len(parts) != 2 or not all(parts) or any(p.startswith('.') for p in parts):
+        return None
+    user, repo = parts
+    if repo.endswith('.git'):
+        repo = repo[:-len('.git')]
+    return f'github.com/{user}/{repo}'
+
+
+# --- Cache node ---
+
+class Mirrors:
+    """Bare mirrors of GitHub repos under root/github.com/<user>/<repo>.git."""
+
+    def __init__(self, root=CACHE_DIR):
+        self.root = os.path.abspath(root)
+        self.refreshed = {}   # path -> time of the last successful fetch
+        self.locks = {}       # path -> Lock, one fetch per repo at a time
+        self.lock = threading.Lock()
+
+    def directory(self, path):
+        return os.path.join(self.root, path + '.git')
+
+    def refresh(self, url):
+        """
+        Mirror url and its submodules, or update the mirrors.
+        Returns (ok, message); ok is True if a usable mirror exists.
+        """
+        path = repo_path(url)
+        if path is None:
+            return False, f"not a GitHub repo: {url}"
+        ok, message = self._refresh(path, set())
+        return ok, message
+
+    def _refresh(self, path, seen):
+        seen.add(path)
+        with self.lock:
+            lock = self.locks.setdefault(path, threading.Lock())
+        with lock:
+            directory = self.directory(path)
+            exists = os.path.isdir(directory)
+            if exists and time.time() - self.refreshed.get(path, 0) < REFRESH_INTERVAL:
+                return True, f"{path} fresh"
+            url = GITHUB + path[len('github.com/'):] + '.git'
+            if exists:
+                result = _git(['remote', 'update', '--prune'], cwd=directory)
+            else:
+                os.makedirs(os.path.dirname(directory), exist_ok=True)
+                result = _git(['clone', '--mirror', url, directory])
+            if result.returncode != 0:
+                error = _error(result)
+                if not exists:
+                    shutil.rmtree(directory, ignore_errors=True)
+                    return False, error
+                print(f"Could not update {path} ({error}), serving the old mirror")
+                message = f"{path} stale: {error}"
+            else:
+                self.refreshed[path] = time.time()
+                message = f"{path} {'updated' if exists else 'mirrored'}"
+            _git(['update-server-info'], cwd=directory)  # plain-HTTP clones need info/refs
+            submodules = self._submodules(directory)
+        for sub_url in submodules:
+            sub_path = repo_path(sub_url)
+            if sub_path and sub_path not in seen:
+                ok, sub_message = self._refresh(sub_path, seen)
+                if not ok:
+                    print(f"Submodule {sub_url} of {path} not mirrored: {sub_message}")
+        return True, message
+
+    @staticmethod
+    def _submodules(directory):
+        """GitHub URLs in the .gitmodules of the mirror's default branch."""
+        result = _git(['config', '--blob', 'HEAD:.gitmodules', '--get-regexp', r'^submodule\..*\.url$'],
+                      cwd=directory)
+        if result.returncode != 0:
+            return []
+        return [line.split(None, 1)[1] for line in result.stdout.decode().splitlines() if ' ' in line]
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    mirrors = None  # set by make_server
+
+    def do_GET(self):
+        if self.path.startswith('/refresh/'):
+            url = GITHUB + self.path[len('/refresh/github.com/'):] if self.path.startswith('/refresh/github.com/') else ''
+            ok, message = self.mirrors.refresh(url) if url else (False, "expected /refresh/github.com/<user>/<repo>")
+            print(f"refresh {self.path[len('/refresh/'):]} from {self.client_address[0]}: {message}")
+            data = (message + '\n').encode()
+            self.send_response(200 if ok else 502)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            super().do_GET()
+
+    def translate_path(self, path):
+        # submodule and remote URLs often leave out the .git suffix
+        full = super().translate_path(path)
+        parts = path.split('?', 1)[0].lstrip('/').split('/')
+        if len(parts) > 3 and parts[0] == 'github.com' and not parts[2].endswith('.git'):
+            parts[2] += '.git'
+            full = super().translate_path('/' + '/'.join(parts))
+        return full
+
+    def log_message(self, format, *args):
+        pass  # a clone is dozens of requests; refreshes are printed above
+
+
+def make_server(root=CACHE_DIR, port=CACHE_PORT):
+    """HTTP server for the mirrors under root (call serve_forever() on it)."""
+    os.makedirs(root, exist_ok=True)
+    mirrors = Mirrors(root)
+    handler = type('Handler', (_Handler,), {'mirrors': mirrors})
+    server = ThreadingHTTPServer(('', port), lambda *args: handler(*args, directory=mirrors.root))
+    server.mirrors = mirrors
+    return server
+
+
+# --- Fleet side ---
+
+def cache_url(path=None):
+    """Cache URL from patches/patch_cache.txt, or None."""
+    try:
+        with open(path or CACHE_FILE) as f:
+            url = f.read().strip()
+    except OSError:
+        return None
+    if not url:
+        return None
+    if '://' not in url:
+        url = f'http://{url}' if ':' in url else f'http://{url}:{CACHE_PORT}'
+    return url.rstrip('/')
+
+
+def refresh(cache, url, timeout=REFRESH_TIMEOUT):
+    """Ask the cache to mirror url. Returns True once the cache holds it."""
+    path = repo_path(url)
+    if path is None:
+        return False
+    try:
+        with urlopen(f"{cache}/refresh/{quote(path)}", timeout=timeout) as response:
+            print(f"Patch cache: {response.read().decode().strip()}")
+            return True
+    except HTTPError as e:
+        print(f"Patch cache could not mirror {url}: {e.read().decode(errors='replace').strip()}")
+    except (URLError, OSError) as e:
+        print(f"Patch cache {cache} unreachable: {e}")
+    return False
+
+
+def run(args, url, cwd=None, timeout=GIT_TIMEOUT, before_fallback=None):
+    """
+    Run a git command that fetches url: through the cache if it can serve it,
+    otherwise (or if that fails) straight from GitHub. before_fallback() is
+    called before the GitHub attempt, e.g. to remove a half-made clone.
+    Returns a CompletedProcess.
+    """
+    cache = cache_url()
+    if cache and refresh(cache, url):
+        result = _git(args, cwd=cwd, timeout=timeout,
+                      config={f'url.{cache}/github.com/.insteadOf': GITHUB})
+        if result.returncode == 0:
+            return result
+        print(f"git {args[0]} via patch cache failed: {_error(result)}")
+        if before_fallback:
+            before_fallback()
+    if cache:
+        print(f"Falling back to GitHub for {url}")
+    return _git(args, cwd=cwd, timeout=timeout)
+
+
+def ls_remote(url):
+    return run(['ls-remote', url], url, timeout=30)
+
+
+def clone(url, dest):
+    return run(['clone', '--recursive', url, dest], url,
+               before_fallback=lambda: shutil.rmtree(dest, ignore_errors=True))
+
+
+def pull(patch_dir):
+    url = _git(['remote', 'get-url', 'origin'], cwd=patch_dir).stdout.decode().strip()
+    return run(['pull', '--recurse-submodules'], url, cwd=patch_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LAN patch cache")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('serve', help="serve mirrors to the fleet")
+    p.add_argument('--dir', default=CACHE_DIR)
+    p.add_argument('--port', type=int, default=CACHE_PORT)
+    p = sub.add_parser('mirror', help="mirror or update a repo in --dir")
+    p.add_argument('url')
+    p.add_argument('--dir', default=CACHE_DIR)
+    p = sub.add_parser('clone', help="clone through the cache, falling back to GitHub")
+    p.add_argument('url')
+    p.add_argument('dest')
+    p = sub.add_parser('pull', help="pull a patch through the cache, falling back to GitHub")
+    p.add_argument('dir')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        server = make_server(args.dir, args.port)
+        print(f"Serving patch mirrors in {args.dir} on port {args.port} (Ctrl+C to quit)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+    if args.command == 'mirror':
+        ok, message = Mirrors(args.dir).refresh(args.url)
+        print(message)
+        sys.exit(0 if ok else 1)
+    result = clone(args.url, args.dest) if args.command == 'clone' else pull(args.dir)
+    sys.stdout.write(result.stdout.decode(errors='replace'))
+    sys.stderr.write(result.stderr.decode(errors='replace'))
+    sys.exit(0 if result.returncode == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
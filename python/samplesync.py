@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+# samplesync.py
+"""
+Incremental sample pack sync
+Keeps a patch's bop/samplepacks folder in step with a source by comparing
+per-file SHA-256 hashes, so changing one sample moves one file instead of the
+whole pack.
+
+A source is any HTTP server that answers
+    GET /manifest.json        {"format": 1, "created": <unix time>,
+                               "files": {"<path>": ["<sha256>", <size>], ...}}
+    GET /files/<sha256>       the file with that hash (Range requests supported)
+which is what `samplesync.py serve` provides - on a laptop holding the master
+copy, or on any Pi that already has the pack (helper.py serves the active
+patch's samples on SERVE_PORT).
+
+Sync order:
+    1. The manifest comes from the origin (SAMPLESYNCURL in bopos.config) if it
+       answers, otherwise from the peer with the newest one.
+    2. Files whose hash already matches are left alone; a wanted hash that
+       exists locally under another name is copied instead of downloaded.
+    3. The rest are downloaded from peers first, then the origin, into
+       .samplesync-partial/ and resumed with a Range request after an
+       interruption. Every file is hash-checked before it replaces the old one.
+With no manifest source but a SAMPLEPACKSURL (the old Google Drive zip) the
+zip is downloaded with gdown --continue and only members whose size or CRC
+differ from the files on disk are extracted.
+
+Hashes of local files are cached in .samplesync-index.json by size and mtime,
+so only new or changed files are read.
+
+Usage:
+    python samplesync.py                              # sync the active patch (helper /getsamples)
+    python samplesync.py --peer 10.0.0.12 --peer voice3.local
+    python samplesync.py sync DIR SOURCE_URL...       # first URL is the origin
+    python samplesync.py serve DIR [--port 8765]
+    python samplesync.py manifest DIR                 # print DIR's manifest
+    python samplesync.py extract ZIP DIR              # extract changed members only
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+SERVE_PORT = 8765
+INDEX_FILE = '.samplesync-index.json'
+PARTIAL_DIR = '.samplesync-partial'
+CHUNK = 1 << 20
+TIMEOUT = 10  # seconds per HTTP request
+
+PATCHES_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../patches')
+
+
+# --- Local hash index ---
+
+def _hidden(path):
+    return any(part.startswith('.') for part in path.split('/'))
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Index:
+    """Hashes of the files under root, cached by (size, mtime)."""
+
+    def __init__(self, root):
+        self.root = root
+        self.path = os.path.join(root, INDEX_FILE)
+        self.entries = {}  # relpath -> [size, mtime_ns, sha256]
+        self.hashes = {}   # sha256 -> relpath
+        self.lock = threading.Lock()
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def scan(self):
+        """Bring the index up to date with the disk. Returns {relpath: (sha256, size)}."""
+        with self.lock:
+            seen = {}
+            changed = False
+            for directory, dirs, files in os.walk(self.root):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                for name in files:
+                    full = os.path.join(directory, name)
+                    rel = os.path.relpath(full, self.root).replace(os.sep, '/')
+                    if _hidden(rel):
+                        continue
+                    info = os.stat(full)
+                    entry = self.entries.get(rel)
+                    if entry is None or entry[0] != info.st_size or entry[1] != info.st_mtime_ns:
+                        entry = [info.st_size, info.st_mtime_ns, file_sha256(full)]
+                        changed = True
+                    seen[rel] = entry
+            if changed or len(seen) != len(self.entries):
+                self.entries = seen
+                self.save()
+            self.hashes = {entry[2]: rel for rel, entry in self.entries.items()}
+            return {rel: (entry[2], entry[0]) for rel, entry in self.entries.items()}
+
+    def record(self, rel, sha256):
+        """Note a file that was just written with a known hash."""
+        info = os.stat(os.path.join(self.root, rel))
+        with self.lock:
+            self.entries[rel] = [info.st_size, info.st_mtime_ns, sha256]
+            self.hashes[sha256] = rel
+
+    def save(self):
+        temporary = self.path + '.tmp'
+        try:
+            with open(temporary, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            print(f"Could not save {self.path}: {e}")
+
+
+def manifest(root, index=None):
+    files = (index or Index(root)).scan()
+    return {"format": 1, "created": time.time(),
+            "files": {rel: [sha, size] for rel, (sha, size) in sorted(files.items())}}
+
+
+# --- Serving ---
+
+class _Handler(BaseHTTPRequestHandler):
+    index = None  # set by make_server
+
+    def do_HEAD(self):
+        self.do_GET(body=False)
+
+    def do_GET(self, body=True):
+        if self.path == '/manifest.json':
+            data = json.dumps(manifest(self.index.root, self.index)).encode()
+            self._send(200, data, 'application/json', body)
+        elif self.path.startswith('/files/'):
+            self._send_file(self.path[len('/files/'):], body)
+        else:
+            self._send(404, b'not found\n', 'text/plain', body)
+
+    def _send(self, status, data, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if body:
+            self.wfile.write(data)
+
+    def _send_file(self, sha256, body):
+        rel = self.index.hashes.get(sha256)
+        if not self.index.hashes or (rel and not os.path.isfile(os.path.join(self.index.root, rel))):
+            self.index.scan()  # not scanned yet, or files changed since the manifest was made
+            rel = self.index.hashes.get(sha256)
+        if rel is None:
+            return self._send(404, b'no such file\n', 'text/plain', body)
+        full = os.path.join(self.index.root, rel)
+        size = os.path.getsize(full)
+        start, end = 0, size - 1
+        match = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        if not body:
+            return
+        with open(full, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def log_message(self, format, *args):
+        pass  # one line per file request would flood helper.py's log
+
+
+def make_server(root, port=SERVE_PORT):
+    """HTTP server for root's manifest and files (call serve_forever() on it)."""
+    handler = type('Handler', (_Handler,), {'index': Index(root)})
+    return ThreadingHTTPServer(('', port), handler)
+
+
+def set_root(server, root):
+    """Serve another folder from a running server (e.g. after a patch switch)."""
+    server.RequestHandlerClass.index = Index(root)
+
+
+def serve_in_background(root, port=SERVE_PORT):
+    """Serve root from a daemon thread. Returns the server, or None if the port is taken."""
+    try:
+        server = make_server(root, port)
+    except OSError as e:
+        print(f"Sample server not started on port {port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name="samplesync-serve", daemon=True).start()
+    return server
+
+
+# --- Fetching ---
+
+def source_url(source):
+    """'10.0.0.12', 'voice3.local:8000' or a full URL -> base URL without trailing slash."""
+    source = source.strip().rstrip('/')
+    if '://' not in source:
+        source = f"http://{source}" + ('' if re.search(r':\d+$', source) else f":{SERVE_PORT}")
+    return source
+
+
+def fetch_manifest(url):
+    with urlopen(f"{url}/manifest.json", timeout=TIMEOUT) as response:
+        data = json.load(response)
+    if not isinstance(data.get('files'), dict):
+        raise ValueError("manifest has no 'files'")
+    return data
+
+
+def _safe(rel):
+    parts = rel.split('/')
+    return rel and not rel.startswith('/') and '..' not in parts and not _hidden(rel)
+
+
+def download(url, part_path, size):
+    """Fetch url into part_path, resuming from what is already there."""
+    have = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if have > size:
+        have = 0
+    elif have == size:
+        return
+    request = Request(url, headers={'Range': f'bytes={have}-'} if have else {})
+    with urlopen(request, timeout=TIMEOUT) as response:
+        mode = 'ab' if have and response.status == 206 else 'wb'
+        with open(part_path, mode) as f:
+            shutil.copyfileobj(response, f, CHUNK)
+
+
+def _place(root, rel, source_path, index, sha256, copy=False):
+    target = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(target) or root, exist_ok=True)
+    if copy:
+        temporary = target + '.samplesync-tmp'
+        shutil.copyfile(source_path, temporary)
+        os.replace(temporary, target)
+    else:
+        os.replace(source_path, target)
+    index.record(rel, sha256)
+
+
+def _fetch(root, rel, sha, size, sources, partial, index):
+    """Download one file from the first source that has it intact. Returns True on success."""
+    part = os.path.join(partial, sha + '.part')
+    for url in sources:
+        # a resumed download may carry a bad partial; retry once from scratch
+        for attempt in range(2 if os.path.exists(part) else 1):
+            try:
+                download(f"{url}/files/{sha}", part, size)
+            except (OSError, URLError) as e:
+                print(f"{rel}: {url} failed ({e})")
+                break
+            if file_sha256(part) == sha:
+                _place(root, rel, part, index, sha)
+                return True
+            print(f"{rel}: hash mismatch from {url}, discarding")
+            os.remove(part)
+    return False
+
+
+def sync(root, origin=None, peers=(), delete=False, progress=print):
+    """
+    Make root match the manifest from origin (or the newest peer).
+    Returns True if every file is now up to date.
+    """
+    peers = [source_url(peer) for peer in peers]
+    origin = source_url(origin) if origin else None
+
+    wanted = None
+    for url in ([origin] if origin else []) + peers:
+        try:
+            candidate = fetch_manifest(url)
+        except (OSError, URLError, ValueError) as e:
+            print(f"No manifest from {url}: {e}")
+            continue
+        if url == origin:
+            wanted = candidate
+            break
+        if wanted is None or candidate.get('created', 0) > wanted.get('created', 0):
+            wanted = candidate
+    if wanted is None:
+        progress("no sample source answered")
+        return False
+
+    os.makedirs(root, exist_ok=True)
+    index = Index(root)
+    local = index.scan()
+    by_hash = {sha: rel for rel, (sha, _) in local.items()}
+    missing = [(rel, sha, size) for rel, (sha, size) in wanted['files'].items()
+               if _safe(rel) and local.get(rel) != (sha, size)]
+    total = sum(size for _, _, size in missing)
+    progress(f"{len(missing)} of {len(wanted['files'])} files to fetch ({total / 1e6:.1f} MB)")
+
+    partial = os.path.join(root, PARTIAL_DIR)
+    os.makedirs(partial, exist_ok=True)
+    sources = peers + ([origin] if origin else [])
+    failed = []
+    done_bytes = 0
+    for count, (rel, sha, size) in enumerate(missing, 1):
+        if sha in by_hash and os.path.exists(os.path.join(root, by_hash[sha])):
+            _place(root, rel, os.path.join(root, by_hash[sha]), index, sha, copy=True)
+        elif _fetch(root, rel, sha, size, sources, partial, index):
+            by_hash[sha] = rel
+        else:
+            failed.append(rel)
+        done_bytes += size
+        progress(f"{count}/{len(missing)} files, {done_bytes / 1e6:.1f}/{total / 1e6:.1f} MB")
+
+    if delete:
+        for rel in set(local) - set(wanted['files']):
+            os.remove(os.path.join(root, rel))
+            index.entries.pop(rel, None)
+            progress(f"removed {rel}")
+    index.save()
+    if failed:
+        progress(f"{len(failed)} files failed: {', '.join(failed[:5])}")
+        return False
+    shutil.rmtree(partial, ignore_errors=True)
+    progress("samples up to date")
+    return True
+
+
+# --- Zip packs (the original Google Drive download) ---
+
+def _crc32(path):
+    crc = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def extract(zip_path, root, progress=print):
+    """Extract only the members that are missing or differ (size, then CRC32) from the files in root."""
+    extracted = skipped = 0
+    with zipfile.ZipFile(zip_path) as pack:
+        for member in pack.infolist():
+            if member.is_dir():
+                continue
+            target = os.path.join(root, member.filename)
+            if (os.path.isfile(target) and os.path.getsize(target) == member.file_size
+                    and _crc32(target) == member.CRC):
+                skipped += 1
+                continue
+            pack.extract(member, root)
+            extracted += 1
+    progress(f"extracted {extracted} files, {skipped} already up to date")
+    return True
+
+
+def fetch_zip(url, root, progress=print):
+    """Download a zip pack with gdown (resumable) and extract what changed."""
+    partial = os.path.join(root, PARTIAL_DIR)
+    os.makedirs(partial, exist_ok=True)
+    zip_path = os.path.join(partial, 'samplepack.zip')
+    progress("downloading sample pack zip")
+    result = subprocess.run([sys.executable, '-m', 'gdown', '--fuzzy', '--continue', url, '-O', zip_path])
+    if result.returncode != 0:
+        progress("zip download failed")
+        return False
+    extract(zip_path, root, progress)
+    shutil.rmtree(partial, ignore_errors=True)
+    return True
+
+
+# --- Active patch ---
+
+def read_config(path):
+    """KEY="value" lines of a bopos.config."""
+    values = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                match = re.match(r'\s*([A-Za-z_]\w*)=(["\']?)(.*)\2\s*$', line)
+                if match:
+                    values[match.group(1)] = match.group(3)
+    except OSError:
+        pass
+    return values
+
+
+def active_patch_dir(patches_dir=PATCHES_DIR):
+    with open(os.path.join(patches_dir, 'active_patch.txt')) as f:
+        return os.path.join(patches_dir, f.read().strip())
+
+
+def samples_dir(patch_dir):
+    return os.path.join(patch_dir, 'bop', 'samplepacks')
+
+
+def sync_active_patch(peers=(), progress=print):
+    """
+    Sync the active patch's samples: SAMPLESYNCURL (origin) and SAMPLEPEERS
+    (space-separated hosts) from its bopos.config plus 'peers', falling back
+    to the SAMPLEPACKSURL zip when no manifest source answers.
+    """
+    patch_dir = active_patch_dir()
+    config = read_config(os.path.join(patch_dir, 'bopos.config'))
+    root = samples_dir(patch_dir)
+    peers = list(peers) + config.get('SAMPLEPEERS', '').split()
+    origin = config.get('SAMPLESYNCURL') or None
+    if origin or peers:
+        if sync(root, origin, peers, progress=progress):
+            return True
+    if config.get('SAMPLEPACKSURL'):
+        return fetch_zip(config['SAMPLEPACKSURL'], root, progress)
+    progress("no SAMPLESYNCURL, SAMPLEPEERS or SAMPLEPACKSURL in bopos.config")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental sample pack sync")
+    parser.add_argument('--peer', action='append', default=[], help="host[:port] or URL of a peer with the pack")
+    sub = parser.add_subparsers(dest='command')
+    p = sub.add_parser('sync', help="sync DIR from sources (first is the origin)")
+    p.add_argument('dir')
+    p.add_argument('sources', nargs='+')
+    p.add_argument('--delete', action='store_true', help="remove files that are not in the manifest")
+    p = sub.add_parser('serve', help="serve DIR's manifest and files")
+    p.add_argument('dir')
+    p.add_argument('--port', type=int, default=SERVE_PORT)
+    p = sub.add_parser('manifest', help="print DIR's manifest")
+    p.add_argument('dir')
+    p = sub.add_parser('extract', help="extract changed members of ZIP into DIR")
+    p.add_argument('zip')
+    p.add_argument('dir')
+    args = parser.parse_args()
+
+    if args.command == 'sync':
+        ok = sync(args.dir, args.sources[0], args.sources[1:] + args.peer, delete=args.delete)
+    elif args.command == 'serve':
+        server = make_server(args.dir, args.port)
+        print(f"Serving {args.dir} on port {args.port} (Ctrl+C to quit)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        ok = True
+    elif args.command == 'manifest':
+        json.dump(manifest(args.dir), sys.stdout, indent=1)
+        print()
+        ok = True
+    elif args.command == 'extract':
+        ok = extract(args.zip, args.dir)
+    else:
+        ok = sync_active_patch(args.peer)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()